@@ -3,6 +3,8 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.contrib.auth.admin import UserAdmin
 from .models import User, Address, Notification, OneTimePassword
+from .notifications import set_read
+from .profile_pictures import variant_urls
 
 
 @admin.register(User)
@@ -76,9 +78,13 @@ class CustomUserAdmin(UserAdmin):
 
     def profile_picture_preview(self, obj):
         if obj.profile_picture:
+            thumb = variant_urls(obj).get("thumb")
+            if not thumb:
+                return "Processing"
+            # Formats are stored in PROFILE_PICTURE["FORMATS"] order.
             return format_html(
                 '<img src="{}" width="50" height="50" style="border-radius: 50%;" />',
-                obj.profile_picture.url,
+                next(iter(thumb.values())),
             )
         return "No Image"
 
@@ -163,12 +169,12 @@ class NotificationAdmin(admin.ModelAdmin):
     user_link.short_description = "User"
 
     def mark_as_read(self, request, queryset):
-        queryset.update(is_read=True)
+        set_read(queryset, is_read=True)
 
     mark_as_read.short_description = "Mark selected notifications as read"
 
     def mark_as_unread(self, request, queryset):
-        queryset.update(is_read=False)
+        set_read(queryset, is_read=False)
 
     mark_as_unread.short_description = "Mark selected notifications as unread"
 
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from clot.pubsub import SubscriptionOverflow, get_hub
+
+from .authentication import CachedJWTAuthentication
+from .extensions import SMSMessage, generate_code, send_sms
+from .hashing import acheck_user_password, amake_password
+from .models import Notification, User
+from .otp import get_otp_store
+from .push import notification_event, user_channel
+from .serializers import (
+    CompleteProfileSerializer,
+    ForgotPasswordSerializer,
+    LoginSerializer,
+    RegisterSerializer,
+    ResetPasswordSerializer,
+    VerifyOTPSerializer,
+)
+from .throttling import IPAddressThrottle, PhoneNumberThrottle
+
+
+class AsyncAuthView(View):
+    """
+    Async counterpart of ``AuthView`` for ASGI deployments.
+
+    Queries go through the async ORM and password hashing runs in a bounded
+    thread pool, so a slow PBKDF2 round never blocks the event loop.
+    """
+
+    @staticmethod
+    def _parse(request):
+        if request.content_type == "application/json":
+            try:
+                return json.loads(request.body or b"{}")
+            except ValueError:
+                return None
+        return request.POST
+
+    @staticmethod
+    def _validate(serializer_class, data):
+        serializer = serializer_class(data=data)
+        if not serializer.is_valid():
+            return None, JsonResponse(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        return serializer.validated_data, None
+
+    @staticmethod
+    def _error(message, code):
+        return JsonResponse({"error": message}, status=code)
+
+    @staticmethod
+    @sync_to_async
+    def _generate_tokens(user):
+        refresh = RefreshToken.for_user(user)
+        return {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+    async def post(self, request, action):
+        handlers = {
+            "register": self._handle_register,
+            "verify_otp": self._handle_verify_otp,
+            "complete_profile": self._handle_complete_profile,
+            "login": self._handle_login,
+            "forgot_password": self._handle_forgot_password,
+            "reset_password": self._handle_reset_password,
+        }
+
+        handler = handlers.get(action)
+        if not handler:
+            return self._error("Invalid action", status.HTTP_400_BAD_REQUEST)
+
+        data = self._parse(request)
+        if data is None:
+            return self._error("Malformed JSON", status.HTTP_400_BAD_REQUEST)
+
+        # The throttles hit the cache, which is a network round-trip with Redis.
+        throttled = await sync_to_async(self._check_throttles)(request, data, action)
+        if throttled:
+            return throttled
+
+        return await handler(data)
+
+    @staticmethod
+    def _check_throttles(request, data, action):
+        waits = []
+        for throttle in (IPAddressThrottle(), PhoneNumberThrottle()):
+            if not throttle.allow_action(action, request, data):
+                waits.append(throttle.wait())
+        if not waits:
+            return None
+        wait = max(waits)
+        response = JsonResponse(
+            {"detail": f"Request was throttled. Expected available in {wait} seconds."},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+        response["Retry-After"] = str(wait)
+        return response
+
+    async def _handle_register(self, data):
+        validated, error = self._validate(RegisterSerializer, data)
+        if error:
+            return error
+
+        phone_number = validated["phone_number"]
+        if await User.objects.filter(phone_number=phone_number).aexists():
+            return self._error(
+                "User with this phone number already exists",
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        user = User(
+            phone_number=phone_number,
+            first_name=validated["first_name"],
+            is_active=False,
+        )
+        user.password = await amake_password(validated["password"])
+        await user.asave()
+
+        otp_code = generate_code()
+        await sync_to_async(get_otp_store().issue)(user, otp_code)
+        send_sms(
+            phone_number=user.phone_number,
+            name=user.first_name,
+            code=otp_code,
+            type=SMSMessage.REGISTRATION.value,
+        )
+
+        return JsonResponse(
+            {"message": "OTP sent successfully.", "user_slug": user.slug},
+            status=status.HTTP_201_CREATED,
+        )
+
+    async def _handle_verify_otp(self, data):
+        validated, error = self._validate(VerifyOTPSerializer, data)
+        if error:
+            return error
+
+        store = get_otp_store()
+        user = await sync_to_async(store.verify)(
+            validated["phone_number"], validated["otp_code"]
+        )
+        if not user:
+            return self._error("Invalid or expired OTP", status.HTTP_400_BAD_REQUEST)
+
+        user.is_active = True
+        await user.asave()
+        await sync_to_async(store.discard)(user)
+
+        tokens = await self._generate_tokens(user)
+        return JsonResponse(
+            {"message": "OTP verified successfully", "user_slug": user.slug, **tokens}
+        )
+
+    async def _handle_complete_profile(self, data):
+        validated, error = self._validate(CompleteProfileSerializer, data)
+        if error:
+            return error
+
+        try:
+            user = await User.objects.aget(slug=validated["user_slug"])
+        except User.DoesNotExist:
+            return JsonResponse(
+                {"detail": "No User matches the given query."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        user.age = validated["age"]
+        user.gender = validated["gender"]
+        await user.asave()
+
+        return JsonResponse(
+            {"message": "Profile completed successfully", "user_slug": user.slug}
+        )
+
+    async def _handle_login(self, data):
+        validated, error = self._validate(LoginSerializer, data)
+        if error:
+            return error
+
+        try:
+            user = await User.objects.aget(phone_number=validated["phone_number"])
+        except User.DoesNotExist:
+            # Hash anyway so response time does not reveal registered numbers,
+            # as ModelBackend does.
+            await amake_password(validated["password"])
+            user = None
+
+        if not user or not await acheck_user_password(user, validated["password"]):
+            return self._error("Invalid credentials", status.HTTP_401_UNAUTHORIZED)
+
+        if not user.is_active:
+            return self._error(
+                "User account is not active", status.HTTP_401_UNAUTHORIZED
+            )
+
+        tokens = await self._generate_tokens(user)
+        return JsonResponse(
+            {"message": "Login successful", "user_slug": user.slug, **tokens}
+        )
+
+    async def _handle_forgot_password(self, data):
+        validated, error = self._validate(ForgotPasswordSerializer, data)
+        if error:
+            return error
+
+        try:
+            user = await User.objects.aget(phone_number=validated["phone_number"])
+        except User.DoesNotExist:
+            return JsonResponse(
+                {"detail": "No User matches the given query."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        otp_code = generate_code()
+        await sync_to_async(get_otp_store().issue)(user, otp_code)
+        send_sms(
+            phone_number=user.phone_number,
+            name=user.first_name,
+            code=otp_code,
+            type=SMSMessage.FORGOT_PASSWORD.value,
+        )
+
+        return JsonResponse(
+            {"message": "OTP sent successfully", "user_slug": user.slug}
+        )
+
+    async def _handle_reset_password(self, data):
+        validated, error = self._validate(ResetPasswordSerializer, data)
+        if error:
+            return error
+
+        store = get_otp_store()
+        user = await sync_to_async(store.verify)(
+            validated["phone_number"], validated["otp_code"]
+        )
+        if not user:
+            return self._error("Invalid or expired OTP", status.HTTP_400_BAD_REQUEST)
+
+        user.password = await amake_password(validated["new_password"])
+        await user.asave()
+        await sync_to_async(store.discard)(user)
+
+        tokens = await self._generate_tokens(user)
+        return JsonResponse(
+            {"message": "Password reset successfully", "user_slug": user.slug, **tokens}
+        )
+
+
+def _sse(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class NotificationStreamView(View):
+    """
+    Server-sent events stream of the user's new notifications, meant to be
+    served by the ASGI application so an open stream costs no thread.
+
+    Authenticates with an access token in the ``Authorization`` header or,
+    for ``EventSource`` clients that cannot set headers, ``?token=``. Each
+    event's id is the notification id: a client reconnecting with
+    ``Last-Event-ID`` first receives what it missed. The stream ends when
+    the access token expires or the client falls too far behind. Under WSGI
+    it is refused, since each open stream would hold a worker thread.
+    """
+
+    @staticmethod
+    def _config():
+        return getattr(settings, "PUSH", {})
+
+    async def _authenticate(self, request):
+        authentication = CachedJWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        raw_token = raw_token or request.GET.get("token")
+        if not raw_token:
+            return None, None
+        try:
+            token = authentication.get_validated_token(raw_token)
+            user = await sync_to_async(authentication.get_user)(token)
+        except (AuthenticationFailed, InvalidToken, TokenError):
+            return None, None
+        return user, token
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"detail": "The notification stream is only served over ASGI."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        user, token = await self._authenticate(request)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided or invalid."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get(
+            "last_event_id"
+        )
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        response = StreamingHttpResponse(
+            self._stream(user.pk, token["exp"], last_event_id),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def _missed(self, user_id, last_event_id):
+        queryset = Notification.objects.filter(
+            user_id=user_id, pk__gt=last_event_id
+        ).order_by("pk")[: self._config().get("REPLAY_LIMIT", 100)]
+        return [notification_event(n) async for n in queryset]
+
+    async def _stream(self, user_id, expires_at, last_event_id):
+        heartbeat = self._config().get("HEARTBEAT", 15)
+        # Subscribe before replaying so nothing created in between is lost.
+        with get_hub().subscribe(user_channel(user_id)) as subscription:
+            yield f"retry: {self._config().get('RETRY', 5000)}\n\n"
+
+            seen = last_event_id or 0
+            if last_event_id is not None:
+                for event in await self._missed(user_id, last_event_id):
+                    seen = event["id"]
+                    yield _sse(event, "notification", event["id"])
+
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield _sse({}, "token_expired")
+                    return
+                try:
+                    event = await subscription.get(timeout=min(heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                except SubscriptionOverflow:
+                    yield _sse({}, "overflow")
+                    return
+                if event["id"] is not None and event["id"] <= seen:
+                    continue
+                yield _sse(event, "notification", event["id"])
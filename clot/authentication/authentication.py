@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+user_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _config():
+    return getattr(settings, "USER_CACHE", {})
+
+
+def _cache():
+    return caches[_config().get("CACHE_ALIAS", "default")]
+
+
+def _cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    user_cache_stats["invalidations"] += 1
+    _cache().delete(_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves the token's user from a short-TTL cache
+    instead of querying the User table on every request.
+
+    Entries are dropped whenever a User is saved or deleted, so deactivation
+    takes effect on the next request.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = _cache_key(user_id)
+        user = _cache().get(key)
+        if user is None:
+            user_cache_stats["misses"] += 1
+            user = super().get_user(validated_token)
+            _cache().set(key, user, _config().get("TTL", 60))
+            return user
+
+        user_cache_stats["hits"] += 1
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -0,0 +1,175 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(
+            8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class BlacklistFilter:
+    """
+    Per-process membership filter for blacklisted refresh-token JTIs.
+
+    A Bloom filter answers "definitely not blacklisted" without touching the
+    database; only possible hits are confirmed with a query, and confirmed hits
+    are remembered in a small exact set. The filter pulls new
+    ``BlacklistedToken`` rows at most ``sync_interval`` seconds apart, which
+    bounds how long a blacklisting made by another worker can go unnoticed.
+    """
+
+    # Rows are read past the high-water mark minus this many ids, so tokens
+    # blacklisted by transactions that committed out of id order are not missed.
+    ID_OVERLAP = 1000
+
+    def __init__(
+        self,
+        capacity=100000,
+        error_rate=0.001,
+        sync_interval=5,
+        rebuild_interval=3600,
+        max_confirmed=10000,
+        clock=time.monotonic,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.max_confirmed = max_confirmed
+        self.clock = clock
+        self.stats = {"filtered": 0, "confirmed": 0, "false_positives": 0}
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._confirmed = set()
+        self._last_id = 0
+        self._synced_at = None
+        self._built_at = None
+
+    def _rebuild(self):
+        rows = BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now()
+        ).values_list("id", "token__jti")
+        entries = list(rows.iterator(chunk_size=5000))
+        self.capacity = max(self.capacity, len(entries) * 2)
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        last_id = 0
+        for token_id, jti in entries:
+            bloom.add(jti)
+            last_id = max(last_id, token_id)
+        self._bloom = bloom
+        self._confirmed = set()
+        self._last_id = last_id
+        self._built_at = self._synced_at = self.clock()
+
+    def _pull(self):
+        rows = BlacklistedToken.objects.filter(
+            id__gt=max(0, self._last_id - self.ID_OVERLAP)
+        ).values_list("id", "token__jti")
+        for token_id, jti in rows.iterator(chunk_size=5000):
+            if jti not in self._bloom:
+                self._bloom.add(jti)
+            self._last_id = max(self._last_id, token_id)
+        self._synced_at = self.clock()
+
+    def sync(self, force=False):
+        with self._lock:
+            now = self.clock()
+            if (
+                self._bloom is None
+                or self._bloom.count > self._bloom.capacity
+                or now - self._built_at >= self.rebuild_interval
+            ):
+                self._rebuild()
+            elif force or now - self._synced_at >= self.sync_interval:
+                self._pull()
+
+    def add(self, jti):
+        """Records a blacklisting made by this process so it applies at once."""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            self._remember(jti)
+
+    def _remember(self, jti):
+        if len(self._confirmed) >= self.max_confirmed:
+            self._confirmed.clear()
+        self._confirmed.add(jti)
+
+    def is_blacklisted(self, jti):
+        self.sync()
+        if jti in self._confirmed:
+            self.stats["confirmed"] += 1
+            return True
+        if jti not in self._bloom:
+            self.stats["filtered"] += 1
+            return False
+
+        if BlacklistedToken.objects.filter(token__jti=jti).exists():
+            self.stats["confirmed"] += 1
+            with self._lock:
+                self._remember(jti)
+            return True
+        self.stats["false_positives"] += 1
+        return False
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def get_blacklist_filter():
+    """Returns the process-wide filter, or None when it is disabled."""
+    global _filter
+    config = dict(getattr(settings, "BLACKLIST_FILTER", {}))
+    if not config.pop("ENABLED", True):
+        return None
+    if _filter is None:
+        with _filter_lock:
+            if _filter is None:
+                _filter = BlacklistFilter(
+                    **{key.lower(): value for key, value in config.items()}
+                )
+    return _filter
+
+
+def reset_blacklist_filter():
+    global _filter
+    _filter = None
+
+
+@receiver(setting_changed)
+def _reset_blacklist_filter_on_setting_change(setting, **kwargs):
+    if setting == "BLACKLIST_FILTER":
+        reset_blacklist_filter()
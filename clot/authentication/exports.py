@@ -0,0 +1,26 @@
+from clot.exports import Export
+
+from .models import User
+
+
+class UserExport(Export):
+    """Account fields of every user; never passwords or tokens."""
+
+    name = "users"
+    columns = (
+        "id",
+        "slug",
+        "phone_number",
+        "first_name",
+        "last_name",
+        "gender",
+        "age",
+        "is_active",
+        "is_staff",
+        "date_joined",
+        "updated_at",
+    )
+
+    def rows(self):
+        users = User.objects.order_by("pk").values(*self.columns)
+        return users.iterator(self.chunk_size)
@@ -0,0 +1,61 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the pool that runs password hashing for async views.
+
+    PBKDF2 releases the GIL, so hashes run in parallel, while the pool size caps
+    how many CPU-bound hashes one worker process runs at a time.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "PASSWORD_HASHING_WORKERS", 4),
+                    thread_name_prefix="password-hashing",
+                )
+    return _executor
+
+
+async def run_in_hashing_pool(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def amake_password(raw_password):
+    return await run_in_hashing_pool(make_password, raw_password)
+
+
+async def acheck_user_password(user, raw_password):
+    """
+    Checks ``raw_password`` off the event loop. A hash upgrade is saved the same
+    way ``User.check_password`` would, but through the async ORM rather than on
+    the hashing pool, whose threads never close database connections.
+    """
+    upgraded = []
+
+    def setter(password):
+        user.set_password(password)
+        user._password = None
+        upgraded.append(password)
+
+    is_correct = await run_in_hashing_pool(
+        check_password, raw_password, user.password, setter
+    )
+    if upgraded:
+        await user.asave(update_fields=["password"])
+    return is_correct
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from authentication.tokens import compact_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted JWT refresh tokens in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        outstanding, blacklisted = compact_expired_tokens(
+            batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {outstanding} outstanding and {blacklisted} blacklisted tokens"
+            )
+        )
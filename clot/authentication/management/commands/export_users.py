@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from authentication.exports import UserExport
+from clot.exports import CHUNK_SIZE, ENCODERS, export_filename, write_export
+
+
+class Command(BaseCommand):
+    help = "Stream every user account to an NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(ENCODERS), default="ndjson")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--output", help="Defaults to users.<format>[.gz]")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        export = UserExport(chunk_size=options["chunk_size"])
+        fmt, gzip = options["format"], options["gzip"]
+        path = options["output"] or export_filename(export, fmt, gzip)
+        written = write_export(export, path, fmt, gzip)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {written / 2**20:.1f} MiB to {path}")
+        )
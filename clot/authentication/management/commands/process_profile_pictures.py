@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from authentication.models import User
+from authentication.profile_pictures import needs_processing, process_profile_picture
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails for profile pictures that have not been processed"
+
+    def handle(self, *args, **options):
+        processed = 0
+        users = User.objects.exclude(profile_picture="").exclude(profile_picture=None)
+        for user in users.only(
+            "profile_picture", "profile_picture_variants"
+        ).iterator():
+            if needs_processing(user):
+                process_profile_picture(user.pk, user.profile_picture.name)
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} profile pictures"))
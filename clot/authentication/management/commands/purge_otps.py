@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from authentication.otp import DatabaseOTPStore, get_otp_store
+
+
+class Command(BaseCommand):
+    help = "Delete expired one-time passwords from the otp table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        store = get_otp_store()
+        if not isinstance(store, DatabaseOTPStore):
+            store = DatabaseOTPStore(ttl=store.ttl)
+
+        deleted = store.purge_expired(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired OTPs"))
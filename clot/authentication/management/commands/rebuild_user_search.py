@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from authentication.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index used by the staff user listing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write("Full-text user search is only used on SQLite")
+            return
+
+        indexed = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} users"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import Notification, User
+from authentication.notifications import fan_out_notification
+
+
+class Command(BaseCommand):
+    help = "Send a notification to every active user (or all users)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type",
+            required=True,
+            choices=[value for value, _ in Notification.NOTIFICATION_TYPES],
+        )
+        parser.add_argument("--title", required=True)
+        parser.add_argument("--message", required=True)
+        parser.add_argument("--include-inactive", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        users = User.objects.all()
+        if not options["include_inactive"]:
+            users = users.filter(is_active=True)
+
+        created = fan_out_notification(
+            users,
+            type=options["type"],
+            title=options["title"],
+            message=options["message"],
+            chunk_size=options["chunk_size"],
+            progress=lambda created: self.stdout.write(f"Created {created}..."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Sent {created} notifications"))
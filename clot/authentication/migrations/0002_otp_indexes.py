@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="onetimepassword",
+            index=models.Index(
+                fields=["user", "passcode", "created_at"], name="otp_lookup_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="onetimepassword",
+            index=models.Index(fields=["created_at"], name="otp_created_at_idx"),
+        ),
+    ]
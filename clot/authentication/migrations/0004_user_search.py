@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+def backfill_phone_national(apps, schema_editor):
+    User = apps.get_model("authentication", "User")
+    for user in User.objects.only("pk", "phone_number").iterator(chunk_size=2000):
+        User.objects.filter(pk=user.pk).update(
+            phone_national=user.phone_number.replace("+998", "", 1)[:9]
+        )
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5("
+        "first_name, last_name, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO user_search (rowid, first_name, last_name) "
+        "SELECT id, first_name, COALESCE(last_name, '') FROM \"User\""
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS user_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0003_user_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="phone_national",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=9
+            ),
+        ),
+        migrations.RunPython(backfill_phone_national, migrations.RunPython.noop),
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
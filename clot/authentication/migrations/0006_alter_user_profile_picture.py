@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:34
+
+import media.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0005_profile_picture_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="profile_picture",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=media.storage.ContentAddressedStorage(),
+                upload_to="profile_pictures/%Y/%m/%d",
+            ),
+        ),
+    ]
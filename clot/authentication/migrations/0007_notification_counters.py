@@ -0,0 +1,63 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_unread(apps, schema_editor):
+    Notification = apps.get_model("authentication", "Notification")
+    NotificationCounter = apps.get_model("authentication", "NotificationCounter")
+    unread = (
+        Notification.objects.filter(is_read=False)
+        .order_by()
+        .values("user")
+        .annotate(count=Count("pk"))
+        .values_list("user", "count")
+    )
+    NotificationCounter.objects.bulk_create(
+        (
+            NotificationCounter(user_id=user_id, unread=count)
+            for user_id, count in unread
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0006_alter_user_profile_picture"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationCounter",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="notification_counter",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("unread", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Notification counter",
+                "verbose_name_plural": "Notification counters",
+                "db_table": "notification_counters",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="notification_feed_idx"
+            ),
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
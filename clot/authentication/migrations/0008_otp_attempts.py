@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0007_notification_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="onetimepassword",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -7,7 +7,8 @@ import re
 
 from slugify import slugify
 
-from .extensions import generate_unique_slug
+from clot.slugs import UniqueSlugMixin
+from media.storage import content_addressed_storage
 
 
 class CustomUserManager(BaseUserManager):
@@ -64,11 +65,22 @@ class User(AbstractBaseUser, PermissionsMixin):
         ],
         error_messages={"unique": "A user with this phone number already exists."},
     )
+    # National part of phone_number, kept for index-backed prefix search.
+    phone_national = models.CharField(
+        max_length=9, blank=True, default="", editable=False, db_index=True
+    )
 
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150, blank=True, null=True)
     profile_picture = models.ImageField(
-        upload_to="profile_pictures/%Y/%m/%d", blank=True, null=True
+        upload_to="profile_pictures/%Y/%m/%d",
+        storage=content_addressed_storage,
+        blank=True,
+        null=True,
+    )
+    # Thumbnails generated from profile_picture, see profile_pictures.py.
+    profile_picture_variants = models.JSONField(
+        default=dict, blank=True, editable=False
     )
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
@@ -91,6 +103,11 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name_plural = "Users"
         db_table = "User"
         ordering = ["-date_joined"]
+        indexes = [
+            models.Index(fields=["date_joined", "id"], name="user_date_joined_idx"),
+            models.Index(fields=["first_name", "id"], name="user_first_name_idx"),
+            models.Index(fields=["age", "id"], name="user_age_idx"),
+        ]
 
     def get_gender_display(self):
         return self.gender.title()
@@ -108,10 +125,11 @@ class User(AbstractBaseUser, PermissionsMixin):
         if not self.slug:
             base_slug = f"{self.phone_number}-{self.first_name}"
             self.slug = slugify(base_slug)
+        self.phone_national = str(self.phone_number).replace("+998", "", 1)[:9]
         super().save(*args, **kwargs)
 
 
-class Address(models.Model):
+class Address(UniqueSlugMixin, models.Model):
     street_address = models.CharField(max_length=255)
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=100)
@@ -123,10 +141,8 @@ class Address(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="addresses")
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(self, self.street_address)
-        super().save(*args, **kwargs)
+    def get_slug_source(self):
+        return self.street_address
 
     def __str__(self):
         return f"{self.street_address}, {self.city}"
@@ -138,7 +154,7 @@ class Address(models.Model):
         ordering = ["-created_at"]
 
 
-class Notification(models.Model):
+class Notification(UniqueSlugMixin, models.Model):
     NOTIFICATION_TYPES = [
         ("order_placed", "Order Placed"),
         ("order_confirmed", "Order Confirmed"),
@@ -156,10 +172,8 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     slug = models.CharField(unique=True, blank=True, null=True, max_length=160)
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.slug = generate_unique_slug(self, self.title)
-        super().save(*args, **kwargs)
+    def get_slug_source(self):
+        return self.title
 
     def __str__(self):
         return f"{self.title} - {self.user.phone_number}"
@@ -169,11 +183,38 @@ class Notification(models.Model):
         verbose_name_plural = "Notifications"
         db_table = "notifications"
         ordering = ["-created_at"]
+        indexes = [
+            # Backs the keyset-paginated feed and mark-all-read.
+            models.Index(
+                fields=["user", "created_at", "id"], name="notification_feed_idx"
+            ),
+        ]
+
+
+class NotificationCounter(models.Model):
+    """Unread notifications per user, so the badge is a primary-key read."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="notification_counter",
+    )
+    unread = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+    class Meta:
+        verbose_name = "Notification counter"
+        verbose_name_plural = "Notification counters"
+        db_table = "notification_counters"
 
 
 class OneTimePassword(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="otps")
     passcode = models.CharField(max_length=6)
+    attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -184,3 +225,9 @@ class OneTimePassword(models.Model):
         verbose_name_plural = "One Time Passwords"
         db_table = "otp"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "passcode", "created_at"], name="otp_lookup_idx"
+            ),
+            models.Index(fields=["created_at"], name="otp_created_at_idx"),
+        ]
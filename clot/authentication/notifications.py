@@ -0,0 +1,128 @@
+from collections import Counter, defaultdict
+from functools import partial
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from clot.slugs import SAVE_ATTEMPTS, SlugSequence
+
+from .models import Notification, NotificationCounter
+from .push import publish_notifications
+
+
+def adjust_unread(deltas):
+    """
+    Applies ``{user_id: delta}`` to the unread counters with one
+    ``UPDATE ... SET unread = unread + delta`` per distinct delta.
+    """
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    if not by_delta:
+        return
+    # Only increments create counters; a decrement with no row has nothing to
+    # correct, and may come from a user being deleted.
+    NotificationCounter.objects.bulk_create(
+        [
+            NotificationCounter(user_id=user_id)
+            for user_id, delta in deltas.items()
+            if delta > 0
+        ],
+        ignore_conflicts=True,
+    )
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread=F("unread") + delta
+        )
+
+
+def unread_count(user_id):
+    count = (
+        NotificationCounter.objects.filter(pk=user_id)
+        .values_list("unread", flat=True)
+        .first()
+    )
+    return max(count or 0, 0)
+
+
+def mark_all_read(user_id):
+    """Marks every unread notification of the user read; returns how many."""
+    with transaction.atomic():
+        marked = Notification.objects.filter(user_id=user_id, is_read=False).update(
+            is_read=True
+        )
+        # The UPDATE's row count is exact even under concurrent writers,
+        # unlike resetting the counter to zero.
+        adjust_unread({user_id: -marked})
+    return marked
+
+
+def set_read(queryset, is_read=True):
+    """
+    Marks the notifications in ``queryset`` read (or unread) and adjusts the
+    counters by the rows each per-user UPDATE actually changed.
+    """
+    user_ids = queryset.order_by().values_list("user_id", flat=True).distinct()
+    changed = 0
+    with transaction.atomic():
+        for user_id in list(user_ids):
+            count = queryset.filter(user_id=user_id, is_read=not is_read).update(
+                is_read=is_read
+            )
+            adjust_unread({user_id: -count if is_read else count})
+            changed += count
+    return changed
+
+
+def _user_ids(users, chunk_size):
+    if hasattr(users, "values_list"):
+        return (
+            users.order_by()
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=chunk_size)
+        )
+    return iter(users)
+
+
+def fan_out_notification(users, type, title, message, chunk_size=1000, progress=None):
+    """
+    Creates one notification per user and returns how many were created.
+
+    ``users`` is a ``User`` queryset, whose ids are streamed with
+    ``iterator()``, or an iterable of user ids. Rows are written with one
+    ``bulk_create`` per ``chunk_size`` users and slugs are reserved from a
+    ``SlugSequence``, so memory use and queries per row stay constant however
+    many users are targeted. ``progress(created)`` is called after each chunk,
+    and each chunk is pushed to open streams once it commits.
+    """
+    if type not in dict(Notification.NOTIFICATION_TYPES):
+        raise ValueError(f"Unknown notification type: {type!r}")
+
+    slugs = SlugSequence(Notification, title)
+    user_ids = _user_ids(users, chunk_size)
+    created = 0
+    while chunk := list(islice(user_ids, chunk_size)):
+        for attempt in range(SAVE_ATTEMPTS):
+            notifications = [
+                Notification(
+                    user_id=user_id, type=type, title=title, message=message, slug=slug
+                )
+                for user_id, slug in zip(chunk, slugs.take(len(chunk)))
+            ]
+            try:
+                with transaction.atomic():
+                    Notification.objects.bulk_create(notifications)
+                    adjust_unread(Counter(chunk))
+                    transaction.on_commit(partial(publish_notifications, notifications))
+                break
+            except IntegrityError:
+                # Another writer used a slug from this chunk's range.
+                if attempt == SAVE_ATTEMPTS - 1:
+                    raise
+                slugs.refresh()
+        created += len(chunk)
+        if progress:
+            progress(created)
+    return created
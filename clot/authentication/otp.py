@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+from .models import OneTimePassword, User
+
+
+class BaseOTPStore:
+    """Stores the passcode sent to a phone number until it is used or expires."""
+
+    def __init__(self, ttl=300, max_attempts=5, **kwargs):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+    def issue(self, user, passcode):
+        raise NotImplementedError
+
+    def verify(self, phone_number, passcode):
+        """Returns the user the passcode was issued to, or None."""
+        raise NotImplementedError
+
+    def discard(self, user):
+        raise NotImplementedError
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """
+    Keeps passcodes in the ``otp`` table. Failed attempts are counted on the row,
+    which is deleted once ``max_attempts`` is reached, as in ``CacheOTPStore``.
+    """
+
+    def issue(self, user, passcode):
+        OneTimePassword.objects.filter(user=user).delete()
+        OneTimePassword.objects.create(user=user, passcode=str(passcode))
+
+    def verify(self, phone_number, passcode):
+        otp = (
+            OneTimePassword.objects.select_related("user")
+            .filter(
+                user__phone_number=phone_number,
+                attempts__lt=self.max_attempts,
+                created_at__gte=timezone.now() - timedelta(seconds=self.ttl),
+            )
+            .first()
+        )
+        if not otp:
+            return None
+
+        if not constant_time_compare(otp.passcode, str(passcode)):
+            row = OneTimePassword.objects.filter(pk=otp.pk)
+            row.update(attempts=F("attempts") + 1)
+            row.filter(attempts__gte=self.max_attempts).delete()
+            return None
+        return otp.user
+
+    def discard(self, user):
+        OneTimePassword.objects.filter(user=user).delete()
+
+    def purge_expired(self, batch_size=1000):
+        cutoff = timezone.now() - timedelta(seconds=self.ttl)
+        deleted = 0
+        while True:
+            ids = list(
+                OneTimePassword.objects.filter(created_at__lt=cutoff).values_list(
+                    "id", flat=True
+                )[:batch_size]
+            )
+            if not ids:
+                return deleted
+            deleted += OneTimePassword.objects.filter(id__in=ids).delete()[0]
+
+
+class CacheOTPStore(BaseOTPStore):
+    """
+    Keeps passcodes in the cache under the phone number, so expiry is handled by
+    the cache TTL and verification is a single keyed read.
+
+    Failed attempts are counted with ``cache.incr``; once ``max_attempts`` is
+    reached the passcode is dropped and a new one has to be requested.
+    """
+
+    def __init__(self, cache_alias="default", key_prefix="otp", **kwargs):
+        super().__init__(**kwargs)
+        self.cache = caches[cache_alias]
+        self.key_prefix = key_prefix
+
+    def _code_key(self, phone_number):
+        return f"{self.key_prefix}:code:{phone_number}"
+
+    def _attempts_key(self, phone_number):
+        return f"{self.key_prefix}:attempts:{phone_number}"
+
+    def issue(self, user, passcode):
+        self.cache.set_many(
+            {
+                self._code_key(user.phone_number): (str(passcode), user.pk),
+                self._attempts_key(user.phone_number): 0,
+            },
+            timeout=self.ttl,
+        )
+
+    def verify(self, phone_number, passcode):
+        entry = self.cache.get(self._code_key(phone_number))
+        if entry is None:
+            return None
+
+        code, user_id = entry
+        if not constant_time_compare(code, str(passcode)):
+            try:
+                attempts = self.cache.incr(self._attempts_key(phone_number))
+            except ValueError:
+                attempts = self.max_attempts
+            if attempts >= self.max_attempts:
+                self.cache.delete_many(
+                    [self._code_key(phone_number), self._attempts_key(phone_number)]
+                )
+            return None
+
+        return User.objects.filter(pk=user_id).first()
+
+    def discard(self, user):
+        self.cache.delete_many(
+            [self._code_key(user.phone_number), self._attempts_key(user.phone_number)]
+        )
+
+
+_store = None
+
+
+def get_otp_store():
+    global _store
+    if _store is None:
+        config = dict(settings.OTP_STORE)
+        backend = import_string(config.pop("BACKEND"))
+        _store = backend(**{key.lower(): value for key, value in config.items()})
+    return _store
+
+
+def reset_otp_store():
+    global _store
+    _store = None
+
+
+@receiver(setting_changed)
+def _reset_otp_store_on_setting_change(setting, **kwargs):
+    if setting in ("OTP_STORE", "CACHES"):
+        reset_otp_store()
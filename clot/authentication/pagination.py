@@ -0,0 +1,12 @@
+from clot.pagination import KeysetPagination
+
+
+class UserPagination(KeysetPagination):
+    ordering_fields = ("date_joined", "first_name", "age", "phone_number")
+    default_ordering = "-date_joined"
+
+
+class NotificationPagination(KeysetPagination):
+    ordering_fields = ("created_at",)
+    default_ordering = "-created_at"
+    page_size = 20
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db import transaction
+
+from clot.images import (
+    cap_original,
+    encode,
+    make_variant,
+    open_image,
+    run_in_background,
+    save_file,
+    variant_name,
+)
+
+from media.references import release, retain
+
+from .authentication import invalidate_cached_user
+from .models import User
+
+
+def _config():
+    return getattr(settings, "PROFILE_PICTURE", {})
+
+
+def variant_files(variants):
+    """Returns the set of file names referenced by ``profile_picture_variants``."""
+    return {
+        path
+        for label, files in (variants or {}).items()
+        if label != "source"
+        for path in files.values()
+    }
+
+
+def needs_processing(user):
+    return bool(user.profile_picture) and (
+        user.profile_picture_variants.get("source") != user.profile_picture.name
+    )
+
+
+def schedule_processing(user):
+    run_in_background(process_profile_picture, user.pk, user.profile_picture.name)
+
+
+def process_profile_picture(user_id, name):
+    """
+    Strips metadata from the uploaded picture, caps its resolution and writes
+    square thumbnails in every configured size and format.
+    """
+    user = (
+        User.objects.filter(pk=user_id)
+        .only("profile_picture", "profile_picture_variants")
+        .first()
+    )
+    # A newer upload replaced this one while the job was queued.
+    if user is None or user.profile_picture.name != name:
+        return
+
+    storage = user.profile_picture.storage
+    image = open_image(storage, name)
+    name, image = cap_original(storage, name, image, _config().get("MAX_SIDE", 2048))
+
+    variants = {"source": name}
+    for label, size in _config().get("SIZES", {"thumb": 64}).items():
+        thumbnail = make_variant(image, size, size)
+        variants[label] = {
+            fmt: save_file(
+                storage, variant_name(name, label, fmt), encode(thumbnail, fmt)
+            )
+            for fmt in _config().get("FORMATS", ("webp", "jpeg"))
+        }
+
+    old_files = {user.profile_picture.name} | variant_files(
+        user.profile_picture_variants
+    )
+    new_files = {name} | variant_files(variants)
+    with transaction.atomic():
+        updated = User.objects.filter(
+            pk=user_id, profile_picture=user.profile_picture.name
+        ).update(profile_picture=name, profile_picture_variants=variants)
+        # update() skips the signals that keep reference counts.
+        if updated:
+            retain(new_files - old_files)
+            release(old_files - new_files)
+    invalidate_cached_user(user_id)
+
+
+def variant_urls(user):
+    """Returns ``{label: {format: url}}`` for the user's processed picture."""
+    variants = user.profile_picture_variants
+    if not user.profile_picture or variants.get("source") != user.profile_picture.name:
+        return {}
+    storage = user.profile_picture.storage
+    return {
+        label: {fmt: storage.url(path) for fmt, path in files.items()}
+        for label, files in variants.items()
+        if label != "source"
+    }
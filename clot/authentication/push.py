@@ -0,0 +1,36 @@
+import logging
+
+from clot.pubsub import get_hub
+
+logger = logging.getLogger(__name__)
+
+
+def user_channel(user_id):
+    return f"notifications:{user_id}"
+
+
+def notification_event(notification):
+    return {
+        "id": notification.pk,
+        "slug": notification.slug,
+        "type": notification.type,
+        "title": notification.title,
+        "message": notification.message,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def publish_notifications(notifications):
+    """
+    Pushes ``notifications`` to their users' open streams. Runs on commit,
+    so a failure is logged rather than raised: the notifications are saved,
+    and clients fetch what they missed on their next connection.
+    """
+    try:
+        get_hub().publish_many(
+            (user_channel(notification.user_id), notification_event(notification))
+            for notification in notifications
+        )
+    except Exception:
+        logger.exception("Publishing %d notifications failed", len(notifications))
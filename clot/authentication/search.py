@@ -0,0 +1,162 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import User
+
+
+SEARCH_TABLE = "user_search"
+# Best candidates taken from each index before filters are applied.
+MAX_CANDIDATES = 500
+
+
+def normalize_phone(value):
+    """Returns the 9-digit national part of a +998 phone number or prefix."""
+    value = (value or "").strip()
+    digits = re.sub(r"\D", "", value)
+    if digits.startswith("998") and (value.startswith("+") or len(digits) > 9):
+        digits = digits[3:]
+    return digits[:9]
+
+
+def fts_enabled():
+    return connection.vendor == "sqlite"
+
+
+def create_index(schema_editor=None):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "first_name, last_name, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+
+def index_user(user):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, first_name, last_name) "
+            "VALUES (%s, %s, %s)",
+            [user.pk, user.first_name or "", user.last_name or ""],
+        )
+
+
+def unindex_user(user_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [user_id])
+
+
+def rebuild_index(batch_size=5000):
+    if not fts_enabled():
+        return 0
+    create_index()
+    indexed = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        rows = User.objects.order_by().values_list("pk", "first_name", "last_name")
+        batch = []
+        for pk, first_name, last_name in rows.iterator(chunk_size=batch_size):
+            batch.append((pk, first_name or "", last_name or ""))
+            if len(batch) >= batch_size:
+                indexed += _insert_batch(cursor, batch)
+                batch = []
+        indexed += _insert_batch(cursor, batch)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+    return indexed
+
+
+def _insert_batch(cursor, batch):
+    if batch:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, first_name, last_name) "
+            "VALUES (%s, %s, %s)",
+            batch,
+        )
+    return len(batch)
+
+
+def _match_expression(query):
+    terms = re.findall(r"\w+", query)
+    # Every term must match; the last one as a prefix for type-ahead.
+    quoted = [f'"{term}"' for term in terms]
+    if quoted:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _phone_candidates(digits):
+    if len(digits) < 2:
+        return []
+    upper = digits[:-1] + chr(ord(digits[-1]) + 1)
+    return list(
+        User.objects.filter(phone_national__gte=digits, phone_national__lt=upper)
+        .order_by("phone_national")
+        .values_list("pk", flat=True)[:MAX_CANDIDATES]
+    )
+
+
+def _name_candidates(query):
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    with connection.cursor() as cursor:
+        # Every match is ranked, so the cost of a very common name grows with
+        # the number of users sharing it.
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            "ORDER BY rank LIMIT %s",
+            [expression, MAX_CANDIDATES],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_user_ids(query, queryset=None):
+    """
+    Returns the ids of the users of ``queryset`` matching ``query``, best
+    match first; at most ``MAX_CANDIDATES`` from each index.
+
+    Phone-number prefixes are looked up in the ``phone_national`` index and
+    names in the FTS5 index ranked by BM25. Other backends fall back to
+    ``icontains`` matching.
+    """
+    queryset = User.objects.all() if queryset is None else queryset
+    if not fts_enabled():
+        return list(
+            queryset.filter(
+                Q(phone_number__icontains=query)
+                | Q(first_name__icontains=query)
+                | Q(last_name__icontains=query)
+            ).values_list("pk", flat=True)[:MAX_CANDIDATES]
+        )
+
+    ranked = (
+        _phone_candidates(normalize_phone(query)) if re.search(r"\d", query) else []
+    )
+    seen = set(ranked)
+    ranked += [pk for pk in _name_candidates(query) if pk not in seen]
+    if not ranked:
+        return []
+
+    matching = set(queryset.filter(pk__in=ranked).values_list("pk", flat=True))
+    return [pk for pk in ranked if pk in matching]
+
+
+def users_by_id(user_ids, queryset=None):
+    """The users with ``user_ids``, in that order."""
+    queryset = User.objects.all() if queryset is None else queryset
+    users = queryset.in_bulk(user_ids)
+    return [users[pk] for pk in user_ids if pk in users]
+
+
+def search_users(query, queryset=None, limit=10):
+    """Returns up to ``limit`` users matching ``query``, best match first."""
+    return users_by_id(search_user_ids(query, queryset)[:limit], queryset)
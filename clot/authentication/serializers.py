@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.core.validators import RegexValidator
-from .models import User, Address
+from .models import User, Address, Notification
+from .profile_pictures import variant_urls
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -63,6 +64,8 @@ class AddressSerializer(serializers.ModelSerializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
+    profile_picture_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = (
@@ -71,6 +74,7 @@ class UserSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
             "profile_picture",
+            "profile_picture_variants",
             "age",
             "gender",
             "date_joined",
@@ -78,6 +82,9 @@ class UserSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("slug", "phone_number", "date_joined")
 
+    def get_profile_picture_variants(self, obj):
+        return variant_urls(obj)
+
 
 class UserUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -88,3 +95,9 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         if value < 0:
             raise serializers.ValidationError("Age cannot be negative")
         return value
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ["slug", "type", "title", "message", "is_read", "created_at"]
@@ -0,0 +1,69 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from media.references import file_name, track_files
+
+from .authentication import invalidate_cached_user
+from .models import Notification, User
+from .notifications import adjust_unread
+from .push import publish_notifications
+from .profile_pictures import needs_processing, schedule_processing, variant_files
+from .search import index_user, unindex_user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def index_user_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"first_name", "last_name"} & set(update_fields):
+        index_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def unindex_user_for_search(sender, instance, **kwargs):
+    unindex_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def process_uploaded_profile_picture(sender, instance, **kwargs):
+    if needs_processing(instance):
+        schedule_processing(instance)
+
+
+@receiver(post_init, sender=Notification)
+def remember_read_state(sender, instance, **kwargs):
+    instance._saved_is_read = instance.__dict__.get("is_read")
+
+
+@receiver(post_save, sender=Notification)
+def count_saved_notification(sender, instance, created, **kwargs):
+    if created:
+        delta = 0 if instance.is_read else 1
+    elif instance._saved_is_read is None:
+        delta = 0
+    else:
+        delta = int(instance._saved_is_read) - int(instance.is_read)
+    instance._saved_is_read = instance.is_read
+    adjust_unread({instance.user_id: delta})
+    if created:
+        transaction.on_commit(partial(publish_notifications, [instance]))
+
+
+@receiver(post_delete, sender=Notification)
+def count_deleted_notification(sender, instance, **kwargs):
+    if instance.__dict__.get("is_read") is False:
+        adjust_unread({instance.user_id: -1})
+
+
+track_files(
+    User,
+    profile_picture=file_name,
+    profile_picture_variants=variant_files,
+)
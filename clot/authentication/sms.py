@@ -0,0 +1,362 @@
+import http.client
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class SMSTransportError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class BaseSMSTransport:
+    """Delivers a batch of messages to the SMS provider in a single call."""
+
+    def send_batch(self, messages):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InfobipTransport(BaseSMSTransport):
+    """
+    Posts to ``/sms/2/text/advanced`` over one persistent connection.
+
+    ``host``/``port``/``use_https`` can point at a local fake server in tests.
+    """
+
+    path = "/sms/2/text/advanced"
+
+    def __init__(
+        self, host, api_key, sender, port=None, use_https=True, timeout=10, **kwargs
+    ):
+        self.host = host
+        self.port = port
+        self.api_key = api_key
+        self.sender = sender
+        self.use_https = use_https
+        self.timeout = timeout
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            conn_class = (
+                http.client.HTTPSConnection
+                if self.use_https
+                else http.client.HTTPConnection
+            )
+            self._conn = conn_class(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def build_payload(self, messages):
+        return json.dumps(
+            {
+                "messages": [
+                    {
+                        "destinations": [{"to": f"{message['to']}".replace("+", "")}],
+                        "from": self.sender,
+                        "text": message["text"],
+                    }
+                    for message in messages
+                ]
+            }
+        )
+
+    def send_batch(self, messages):
+        headers = {
+            "Authorization": f"App {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        try:
+            conn = self._connection()
+            conn.request("POST", self.path, self.build_payload(messages), headers)
+            res = conn.getresponse()
+            data = res.read()
+        except (OSError, http.client.HTTPException) as e:
+            # The pooled connection is unusable after a transport failure.
+            self.close()
+            raise SMSTransportError(str(e)) from e
+
+        if res.status >= 500 or res.status == 429:
+            raise SMSTransportError(f"Provider returned {res.status}")
+        if res.status >= 400:
+            raise SMSTransportError(
+                f"Provider rejected batch with {res.status}: {data[:200]!r}",
+                retryable=False,
+            )
+        return data
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class LocMemTransport(BaseSMSTransport):
+    """Keeps sent batches in memory, like Django's locmem email backend."""
+
+    def __init__(self, **kwargs):
+        self.batches = []
+
+    def send_batch(self, messages):
+        self.batches.append(list(messages))
+
+    @property
+    def messages(self):
+        return [message for batch in self.batches for message in batch]
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def retry_after(self):
+        with self._lock:
+            if self._state() != self.OPEN:
+                return 0.0
+            return self.reset_timeout - (self.clock() - self.opened_at)
+
+    def before_call(self):
+        with self._lock:
+            if self._state() == self.OPEN:
+                raise CircuitOpenError("SMS provider circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._state() == self.HALF_OPEN or (
+                self.failures >= self.failure_threshold
+            ):
+                self.opened_at = self.clock()
+
+
+class SMSDispatcher:
+    """
+    Queues outbound SMS and delivers them from a background worker.
+
+    The worker groups queued messages into batches, retries failed batches with
+    exponential backoff and stops calling the provider while the circuit breaker
+    is open. Messages older than ``message_ttl`` are dropped, since the OTP they
+    carry has expired by then.
+    """
+
+    def __init__(
+        self,
+        transport,
+        batch_size=50,
+        linger=0.05,
+        max_retries=3,
+        backoff_base=0.5,
+        backoff_max=10.0,
+        max_queue_size=10000,
+        message_ttl=300,
+        breaker=None,
+    ):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.message_ttl = message_ttl
+        self.breaker = breaker or CircuitBreaker()
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "dropped": 0}
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._stop = threading.Event()
+        self._worker = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def enqueue(self, phone_number, text):
+        self._ensure_worker()
+        item = {"to": phone_number, "text": text, "queued_at": time.monotonic()}
+        with self._idle:
+            self._pending += 1
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self._done(1, "dropped")
+            logger.error("SMS queue is full, dropping message to %s", phone_number)
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Blocks until every queued message is sent or given up on."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self._worker = None
+        self.transport.close()
+
+    def _ensure_worker(self):
+        # Workers forked by gunicorn/uwsgi do not inherit the parent's thread.
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker is None or self._pid != os.getpid():
+                self._stop.clear()
+                self._pid = os.getpid()
+                self._worker = threading.Thread(
+                    target=self._run, name="sms-dispatcher", daemon=True
+                )
+                self._worker.start()
+
+    def _done(self, count, outcome):
+        self.stats[outcome] += count
+        with self._idle:
+            self._pending -= count
+            self._idle.notify_all()
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(
+                    self.queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self.queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            now = time.monotonic()
+            fresh = [
+                item for item in batch if now - item["queued_at"] < self.message_ttl
+            ]
+            if len(fresh) < len(batch):
+                self._done(len(batch) - len(fresh), "dropped")
+            if fresh:
+                self._deliver(fresh)
+
+    def _deliver(self, batch):
+        attempt = 0
+        while True:
+            wait = self.breaker.retry_after()
+            if wait > 0:
+                if self._stop.wait(wait):
+                    break
+                continue
+            try:
+                self.breaker.before_call()
+                self.transport.send_batch(batch)
+            except CircuitOpenError:
+                continue
+            except SMSTransportError as e:
+                self.breaker.record_failure()
+                attempt += 1
+                if not e.retryable or attempt > self.max_retries:
+                    logger.error("Giving up on SMS batch of %d: %s", len(batch), e)
+                    break
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                if self._stop.wait(delay * random.uniform(0.5, 1.0)):
+                    break
+            except Exception:
+                logger.exception("Unexpected error sending SMS batch")
+                break
+            else:
+                self.breaker.record_success()
+                self._done(len(batch), "sent")
+                return
+        self._done(len(batch), "failed")
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def build_dispatcher(config=None):
+    config = dict(config or getattr(settings, "SMS_DISPATCHER", {}))
+    transport_class = import_string(
+        config.pop("TRANSPORT", "authentication.sms.InfobipTransport")
+    )
+    transport = transport_class(
+        **{key.lower(): value for key, value in config.pop("OPTIONS", {}).items()}
+    )
+    breaker = CircuitBreaker(
+        failure_threshold=config.pop("FAILURE_THRESHOLD", 5),
+        reset_timeout=config.pop("RESET_TIMEOUT", 30.0),
+    )
+    return SMSDispatcher(
+        transport,
+        breaker=breaker,
+        **{key.lower(): value for key, value in config.items()},
+    )
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = build_dispatcher()
+    return _dispatcher
+
+
+def reset_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop()
+        _dispatcher = None
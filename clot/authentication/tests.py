@@ -1 +1,1080 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from clot.images import _run_job
+from clot.pubsub import (
+    Hub,
+    LocalBackplane,
+    RedisBackplane,
+    SubscriptionOverflow,
+    get_hub,
+)
+
+from .admin import CustomUserAdmin
+from .async_views import AsyncAuthView, NotificationStreamView
+from .authentication import user_cache_stats
+from .blacklist import BlacklistFilter, BloomFilter, reset_blacklist_filter
+from .hashing import acheck_user_password
+from .models import Notification, OneTimePassword, User
+from .notifications import fan_out_notification, set_read, unread_count
+from .push import publish_notifications
+from .otp import CacheOTPStore, DatabaseOTPStore, get_otp_store
+from .search import normalize_phone, rebuild_index, search_users
+from .sms import (
+    BaseSMSTransport,
+    CircuitBreaker,
+    InfobipTransport,
+    LocMemTransport,
+    SMSDispatcher,
+    SMSTransportError,
+    get_dispatcher,
+    reset_dispatcher,
+)
+from .throttling import SlidingWindowCounter, parse_rate
+from .tokens import (
+    FilteredRefreshToken,
+    blacklist_user_tokens,
+    compact_expired_tokens,
+)
+
+LOCMEM_SMS = {"TRANSPORT": "authentication.sms.LocMemTransport", "LINGER": 0}
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+class FlakyTransport(BaseSMSTransport):
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.sent = []
+
+    def send_batch(self, messages):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise SMSTransportError("provider unavailable")
+        self.sent.extend(messages)
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    payloads = []
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.payloads.append(json.loads(self.rfile.read(length)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSMSDispatcher(SimpleTestCase):
+    def test_messages_are_batched(self):
+        transport = LocMemTransport()
+        dispatcher = SMSDispatcher(transport, batch_size=10, linger=0.2)
+        for i in range(5):
+            dispatcher.enqueue(f"+99890000000{i}", "code")
+        self.assertTrue(dispatcher.flush(timeout=5))
+        dispatcher.stop()
+
+        self.assertEqual(len(transport.messages), 5)
+        self.assertLess(len(transport.batches), 5)
+
+    def test_failed_batch_is_retried(self):
+        transport = FlakyTransport(failures=2)
+        dispatcher = SMSDispatcher(transport, max_retries=3, backoff_base=0.01)
+        dispatcher.enqueue("+998900000000", "code")
+        self.assertTrue(dispatcher.flush(timeout=5))
+        dispatcher.stop()
+
+        self.assertEqual(transport.calls, 3)
+        self.assertEqual(dispatcher.stats["sent"], 1)
+
+    def test_circuit_opens_after_threshold(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            failure_threshold=2, reset_timeout=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        now[0] = 10
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_infobip_transport_against_fake_server(self):
+        FakeProviderHandler.payloads = []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeProviderHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        transport = InfobipTransport(
+            host="127.0.0.1",
+            port=server.server_address[1],
+            api_key="test",
+            sender="clot",
+            use_https=False,
+        )
+        try:
+            transport.send_batch(
+                [
+                    {"to": "+998900000000", "text": "one"},
+                    {"to": "+998900000001", "text": "two"},
+                ]
+            )
+            transport.send_batch([{"to": "+998900000002", "text": "three"}])
+        finally:
+            transport.close()
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(len(FakeProviderHandler.payloads), 2)
+        self.assertEqual(len(FakeProviderHandler.payloads[0]["messages"]), 2)
+        self.assertEqual(
+            FakeProviderHandler.payloads[0]["messages"][0]["destinations"][0]["to"],
+            "998900000000",
+        )
+
+
+class TestOTPStores(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            phone_number="+998901234567", password="secret123", first_name="Ali"
+        )
+
+    def test_cache_store_verifies_without_queries_on_miss(self):
+        store = CacheOTPStore(ttl=60)
+        store.issue(self.user, 123456)
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(store.verify(self.user.phone_number, "000000"))
+        with self.assertNumQueries(1):
+            self.assertEqual(store.verify(self.user.phone_number, "123456"), self.user)
+
+    def test_cache_store_drops_code_after_max_attempts(self):
+        store = CacheOTPStore(ttl=60, max_attempts=3)
+        store.issue(self.user, 123456)
+        for _ in range(3):
+            store.verify(self.user.phone_number, "000000")
+
+        self.assertIsNone(store.verify(self.user.phone_number, "123456"))
+
+    def test_database_store_drops_code_after_max_attempts(self):
+        store = DatabaseOTPStore(ttl=60, max_attempts=3)
+        store.issue(self.user, 123456)
+        for _ in range(2):
+            self.assertIsNone(store.verify(self.user.phone_number, "000000"))
+        self.assertEqual(OneTimePassword.objects.get().attempts, 2)
+
+        self.assertIsNone(store.verify(self.user.phone_number, "000000"))
+        self.assertFalse(OneTimePassword.objects.exists())
+        self.assertIsNone(store.verify(self.user.phone_number, "123456"))
+
+    def test_database_store_ignores_expired_codes(self):
+        store = DatabaseOTPStore(ttl=300)
+        store.issue(self.user, 123456)
+        self.assertEqual(store.verify(self.user.phone_number, "123456"), self.user)
+
+        OneTimePassword.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNone(store.verify(self.user.phone_number, "123456"))
+        self.assertEqual(store.purge_expired(), 1)
+
+
+@override_settings(SMS_DISPATCHER=LOCMEM_SMS)
+class TestRegistrationFlow(APITestCase):
+    def setUp(self):
+        reset_dispatcher()
+        cache.clear()
+
+    def tearDown(self):
+        reset_dispatcher()
+
+    def test_register_then_verify_otp(self):
+        response = self.client.post(
+            "/api/v1/auth/user/register/",
+            {
+                "phone_number": "+998901234567",
+                "password": "secret123",
+                "first_name": "Ali",
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+
+        dispatcher = get_dispatcher()
+        self.assertTrue(dispatcher.flush(timeout=5))
+        text = dispatcher.transport.messages[0]["text"]
+        code = text.split("Your code is ")[1].split()[0]
+
+        response = self.client.post(
+            "/api/v1/auth/user/verify_otp/",
+            {"phone_number": "+998901234567", "otp_code": code},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+        self.assertTrue(User.objects.get(phone_number="+998901234567").is_active)
+
+
+class TestTokenBlacklisting(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number="+998901234567", password="secret123", first_name="Ali"
+        )
+        for _ in range(3):
+            RefreshToken.for_user(self.user)
+        RefreshToken.for_user(self.user)
+        self.expired = OutstandingToken.objects.latest("id")
+        self.expired.expires_at = timezone.now() - timedelta(days=1)
+        self.expired.save()
+
+    def test_logout_all_blacklists_unexpired_tokens(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post("/api/v1/auth/logout/all/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BlacklistedToken.objects.count(), 3)
+        self.assertFalse(BlacklistedToken.objects.filter(token=self.expired).exists())
+        # Already blacklisted tokens are skipped on a second run.
+        self.assertEqual(blacklist_user_tokens(self.user.id), 0)
+
+    def test_concurrent_blacklisting_is_not_an_error(self):
+        bulk_create = BlacklistedToken.objects.bulk_create
+
+        def racing(objs, **kwargs):
+            # Another logout blacklists one of the tokens first.
+            BlacklistedToken.objects.create(token_id=objs[0].token_id)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(BlacklistedToken.objects, "bulk_create", racing):
+            blacklist_user_tokens(self.user.id)
+        self.assertEqual(BlacklistedToken.objects.count(), 3)
+
+    def test_compaction_removes_expired_tokens(self):
+        BlacklistedToken.objects.create(token=self.expired)
+        blacklist_user_tokens(self.user.id)
+
+        self.assertEqual(compact_expired_tokens(batch_size=1), (1, 1))
+        self.assertEqual(OutstandingToken.objects.count(), 3)
+        self.assertEqual(BlacklistedToken.objects.count(), 3)
+
+
+class TestBlacklistFilter(APITestCase):
+    def setUp(self):
+        reset_blacklist_filter()
+        self.user = User.objects.create_user(
+            phone_number="+998901234567", password="secret123", first_name="Ali"
+        )
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        values = [f"jti-{i}" for i in range(1000)]
+        for value in values:
+            bloom.add(value)
+
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_unblacklisted_refresh_skips_the_database(self):
+        token = str(RefreshToken.for_user(self.user))
+        FilteredRefreshToken(token)  # builds the filter
+
+        with self.assertNumQueries(0):
+            FilteredRefreshToken(token)
+
+    def test_logout_rejects_token_on_refresh(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        self.client.force_authenticate(self.user)
+        self.client.post("/api/v1/auth/logout/", {"refresh": refresh})
+
+        response = self.client.post("/api/v1/auth/token/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_blacklistings_from_other_workers_arrive_after_sync(self):
+        now = [0.0]
+        blacklist_filter = BlacklistFilter(sync_interval=5, clock=lambda: now[0])
+        token = RefreshToken.for_user(self.user)
+        blacklist_filter.sync()
+
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get())
+        self.assertFalse(blacklist_filter.is_blacklisted(token["jti"]))
+        now[0] = 5
+        self.assertTrue(blacklist_filter.is_blacklisted(token["jti"]))
+
+
+class TestCachedJWTAuthentication(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            phone_number="+998901234567", password="secret123", first_name="Ali"
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_user_is_resolved_from_cache(self):
+        self.client.post("/api/v1/auth/logout/")
+        hits = user_cache_stats["hits"]
+
+        with self.assertNumQueries(0):
+            response = self.client.post("/api/v1/auth/logout/")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(user_cache_stats["hits"], hits + 1)
+
+    def test_deactivated_user_loses_access_immediately(self):
+        response = self.client.delete("/api/v1/auth/users/me/")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get("/api/v1/auth/users/me/")
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TestUserListPagination(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(
+            phone_number="+998900000000",
+            password="secret123",
+            first_name="Staff",
+            is_staff=True,
+        )
+        for i in range(1, 25):
+            User.objects.create_user(
+                phone_number=f"+9989000000{i:02d}",
+                password="secret123",
+                first_name=f"User {i % 5}",
+            )
+        self.client.force_authenticate(self.staff)
+
+    def test_cursor_walks_every_user_once(self):
+        seen = []
+        url = "/api/v1/auth/users/?all=1&ordering=first_name&page_size=7"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(user["phone_number"] for user in response.data["results"])
+            url = response.data["next"]
+
+        expected = User.objects.order_by("first_name", "id").values_list(
+            "phone_number", flat=True
+        )
+        self.assertEqual(seen, list(expected))
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get("/api/v1/auth/users/?all=1&page_size=5")
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+
+        self.assertEqual(back.data["results"], first.data["results"])
+        self.assertIsNone(back.data["previous"])
+
+    def test_total_is_optional(self):
+        response = self.client.get("/api/v1/auth/users/?all=1")
+        self.assertNotIn("total", response.data)
+
+        response = self.client.get("/api/v1/auth/users/?all=1&include_total=1")
+        self.assertEqual(response.data["total"], 25)
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get("/api/v1/auth/users/?all=1&ordering=password")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestUserSearch(APITestCase):
+    def setUp(self):
+        people = [
+            ("+998901112233", "Aziza", "Karimova"),
+            ("+998911234567", "Azamat", "Rahimov"),
+            ("+998935551234", "Bobur", "Azimov"),
+        ]
+        self.users = [
+            User.objects.create_user(
+                phone_number=phone,
+                password="secret123",
+                first_name=first,
+                last_name=last,
+            )
+            for phone, first, last in people
+        ]
+
+    def test_normalize_phone(self):
+        self.assertEqual(normalize_phone("+998 90 111"), "90111")
+        self.assertEqual(normalize_phone("998901112233"), "901112233")
+        self.assertEqual(normalize_phone("99 123"), "99123")
+
+    def test_name_prefix_search(self):
+        results = search_users("azi")
+        self.assertEqual({user.first_name for user in results}, {"Aziza", "Bobur"})
+        self.assertEqual(search_users("azamat rah"), [self.users[1]])
+
+    def test_ranks_every_name_match(self):
+        User.objects.bulk_create(
+            User(phone_number=f"+99890000{i:04}", first_name="Kamola", last_name="X")
+            for i in range(50)
+        )
+        rebuild_index()
+        best = User.objects.create_user(
+            phone_number="+998909999999", password="secret123", first_name="Kamola"
+        )
+        self.assertEqual(search_users("kamola", limit=1), [best])
+
+    def test_phone_prefix_search(self):
+        self.assertEqual(search_users("+998 91"), [self.users[1]])
+        self.assertEqual(search_users("935"), [self.users[2]])
+
+    def test_index_follows_renames_and_rebuild(self):
+        user = self.users[0]
+        user.first_name = "Dilnoza"
+        user.save()
+        self.assertEqual(search_users("dilno"), [user])
+        self.assertEqual(rebuild_index(), 3)
+        self.assertEqual(search_users("dilno"), [user])
+
+    def test_staff_listing_uses_search(self):
+        staff = self.users[0]
+        staff.is_staff = True
+        staff.save()
+        self.client.force_authenticate(staff)
+
+        response = self.client.get("/api/v1/auth/users/?all=1&search=Rahim")
+        self.assertEqual(
+            [user["phone_number"] for user in response.data["results"]],
+            ["+998911234567"],
+        )
+        self.assertEqual(response.data["next"], None)
+        self.assertEqual(response.data["page_size"], 10)
+
+    def test_staff_search_is_paginated(self):
+        staff = self.users[0]
+        staff.is_staff = True
+        staff.save()
+        self.client.force_authenticate(staff)
+
+        url = "/api/v1/auth/users/?all=1&search=az&page_size=2&include_total=1"
+        first = self.client.get(url).data
+        self.assertEqual((len(first["results"]), first["total"]), (2, 3))
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).data
+        self.assertEqual(len(second["results"]), 1)
+        self.assertIsNone(second["next"])
+        phones = {user["phone_number"] for user in first["results"] + second["results"]}
+        self.assertEqual(phones, {user.phone_number for user in self.users})
+        self.assertEqual(self.client.get(second["previous"]).data, first)
+
+        response = self.client.get(url + "&cursor=bogus")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SMS_DISPATCHER=LOCMEM_SMS, PASSWORD_HASHERS=FAST_HASHERS)
+class TestAsyncAuthView(TestCase):
+    def setUp(self):
+        reset_dispatcher()
+        cache.clear()
+        self.view = AsyncAuthView.as_view()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        reset_dispatcher()
+
+    async def post(self, action, data):
+        request = self.factory.post(
+            f"/api/v1/auth/user/{action}/", data, content_type="application/json"
+        )
+        response = await self.view(request, action=action)
+        return response.status_code, json.loads(response.content)
+
+    async def test_register_verify_and_login(self):
+        credentials = {"phone_number": "+998901234567", "password": "secret123"}
+        code, body = await self.post("register", {**credentials, "first_name": "Ali"})
+        self.assertEqual(code, 201)
+
+        code, body = await self.post("login", credentials)
+        self.assertEqual(body["error"], "User account is not active")
+
+        user = await User.objects.aget(phone_number="+998901234567")
+        self.assertTrue(user.check_password("secret123"))
+        otp_code = "123456"
+        await sync_to_async(get_otp_store().issue)(user, otp_code)
+        code, body = await self.post(
+            "verify_otp", {"phone_number": user.phone_number, "otp_code": otp_code}
+        )
+        self.assertEqual(code, 200)
+
+        code, body = await self.post("login", credentials)
+        self.assertEqual(code, 200)
+        self.assertIn("access", body)
+
+    async def test_invalid_input(self):
+        code, body = await self.post("login", {"phone_number": "+998901234567"})
+        self.assertEqual(code, 400)
+        self.assertIn("password", body)
+
+        code, body = await self.post(
+            "login", {"phone_number": "+998901234567", "password": "nope"}
+        )
+        self.assertEqual(code, 401)
+
+    @override_settings(
+        PASSWORD_HASHERS=[
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+        ]
+    )
+    async def test_hash_upgrade_is_saved_off_the_hashing_pool(self):
+        user = await User.objects.acreate(
+            phone_number="+998901234567",
+            password=make_password("secret123", hasher="md5"),
+        )
+        save = User.save
+        saved_on = []
+
+        def recording_save(instance, *args, **kwargs):
+            saved_on.append(threading.current_thread().name)
+            return save(instance, *args, **kwargs)
+
+        with mock.patch.object(User, "save", recording_save):
+            self.assertTrue(await acheck_user_password(user, "secret123"))
+        await user.arefresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(len(saved_on), 1)
+        self.assertFalse(saved_on[0].startswith("password-hashing"))
+
+
+class TestThrottling(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("3/10m"), (3, 600))
+        self.assertEqual(parse_rate("100/hour"), (100, 3600))
+
+    def test_sliding_window_weights_previous_window(self):
+        now = [0.0]
+        counter = SlidingWindowCounter(cache, limit=4, window=60, clock=lambda: now[0])
+        for _ in range(4):
+            self.assertTrue(counter.hit("key")[0])
+        allowed, retry_after = counter.hit("key")
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, 75)
+
+        # Halfway into the next window half of the previous count still applies.
+        now[0] = 90
+        self.assertEqual([counter.hit("key")[0] for _ in range(3)], [True, True, False])
+
+    @override_settings(AUTH_THROTTLE_RATES={"login": {"phone": "2/m"}})
+    def test_throttled_login_skips_the_database(self):
+        body = {"phone_number": "+998901234567", "password": "secret123"}
+        for _ in range(2):
+            self.client.post("/api/v1/auth/user/login/", body)
+
+        with self.assertNumQueries(0):
+            response = self.client.post("/api/v1/auth/user/login/", body)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+        other = {"phone_number": "+998901234568", "password": "secret123"}
+        response = self.client.post("/api/v1/auth/user/login/", other)
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(AUTH_THROTTLE_RATES={"login": {"ip": "2/m"}})
+    def test_forwarded_for_cannot_reset_the_ip_budget(self):
+        statuses = [
+            self.client.post(
+                "/api/v1/auth/user/login/",
+                {"phone_number": f"+99890123456{i}", "password": "secret123"},
+                HTTP_X_FORWARDED_FOR=f"10.0.0.{i}",
+            ).status_code
+            for i in range(3)
+        ]
+        self.assertEqual(statuses, [401, 401, 429])
+
+
+def make_photo(size=(3000, 2000)):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees
+    exif[0x010F] = "PhoneMaker"
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "JPEG", exif=exif)
+    return SimpleUploadedFile("photo.jpeg", buffer.getvalue(), "image/jpeg")
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS,
+    IMAGE_PROCESSING={"EAGER": True},
+    PROFILE_PICTURE={"MAX_SIDE": 1024, "SIZES": {"thumb": 64}},
+)
+class TestProfilePictureProcessing(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(
+            phone_number="+998901234567", password="secret123", first_name="Ali"
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_upload_is_capped_stripped_and_thumbnailed(self):
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                "/api/v1/auth/users/me/",
+                {"profile_picture": make_photo()},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 200)
+
+        self.user.refresh_from_db()
+        with self.user.profile_picture.open() as f:
+            original = Image.open(f)
+            self.assertEqual(original.size, (683, 1024))
+            self.assertEqual(len(original.getexif()), 0)
+
+        response = self.client.get("/api/v1/auth/users/me/")
+        variants = response.data["profile_picture_variants"]
+        self.assertEqual(set(variants["thumb"]), {"webp", "jpeg"})
+        path = self.user.profile_picture_variants["thumb"]["webp"]
+        with self.user.profile_picture.storage.open(path) as f:
+            self.assertEqual(Image.open(f).size, (64, 64))
+
+    @override_settings(PROFILE_PICTURE={"SIZES": {"thumb": 64}, "FORMATS": ("webp",)})
+    def test_admin_preview_uses_a_configured_format(self):
+        self.user.profile_picture = make_photo((100, 100))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.user.refresh_from_db()
+
+        preview = CustomUserAdmin(User, admin.site).profile_picture_preview(self.user)
+        self.assertIn(".webp", preview)
+
+    def test_failed_background_job_is_logged(self):
+        def process(user_id):
+            raise OSError("disk full")
+
+        with self.assertLogs("clot.images", "ERROR") as logs:
+            _run_job(process, self.user.pk)
+        self.assertIn("process failed", logs.output[0])
+        self.assertIn("OSError: disk full", logs.output[0])
+
+    def test_unprocessed_picture_has_no_variants(self):
+        self.user.profile_picture = make_photo((100, 100))
+        self.user.save()
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get("/api/v1/auth/users/me/")
+        self.assertEqual(response.data["profile_picture_variants"], {})
+
+
+class TestNotificationFanOut(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(
+                phone_number=f"+99890{i:07d}",
+                phone_national=f"90{i:07d}",
+                first_name="Ali",
+                slug=f"user-{i}",
+                is_active=i % 5 != 0,
+            )
+            for i in range(250)
+        )
+
+    def test_creates_one_notification_per_user_in_chunks(self):
+        Notification.objects.create(
+            user=User.objects.get(slug="user-0"),  # inactive
+            type="order_shipped",
+            title="Shipped",
+            message=".",
+        )
+        reported = []
+        with CaptureQueriesContext(connection) as queries:
+            created = fan_out_notification(
+                User.objects.filter(is_active=True),
+                "order_shipped",
+                "Shipped",
+                "Your order is on its way",
+                chunk_size=80,
+                progress=reported.append,
+            )
+
+        self.assertEqual(created, 200)
+        self.assertEqual(reported, [80, 160, 200])
+        self.assertEqual(Notification.objects.count(), 201)
+        self.assertEqual(Notification.objects.values("user").distinct().count(), 201)
+        slugs = set(Notification.objects.values_list("slug", flat=True))
+        self.assertEqual(len(slugs), 201)
+        self.assertIn("shipped-200", slugs)
+        # One suffix lookup, the streamed user ids, and a write per chunk.
+        self.assertLess(len(queries), 20)
+
+    def test_retries_chunk_when_a_slug_is_taken(self):
+        user = User.objects.first()
+
+        def steal_next_slug(created):
+            if created == 100:
+                Notification.objects.create(
+                    user=user,
+                    type="order_placed",
+                    title="x",
+                    message=".",
+                    slug="promo-150",
+                )
+
+        created = fan_out_notification(
+            list(User.objects.values_list("pk", flat=True)[:200]),
+            "order_placed",
+            "Promo",
+            "Sale",
+            chunk_size=100,
+            progress=steal_next_slug,
+        )
+
+        self.assertEqual(created, 200)
+        self.assertEqual(Notification.objects.filter(title="Promo").count(), 200)
+
+    def test_rejects_unknown_type(self):
+        with self.assertRaises(ValueError):
+            fan_out_notification([], "newsletter", "Hi", "Hello")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TestNotificationFeed(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number="+998901234567", password="secret123", first_name="Ali"
+        )
+        self.other = User.objects.create_user(
+            phone_number="+998901234568", password="secret123", first_name="Vali"
+        )
+        fan_out_notification([self.user.pk] * 25, "order_placed", "Placed", ".")
+        fan_out_notification([self.other.pk] * 3, "order_placed", "Placed", ".")
+        self.client.force_authenticate(self.user)
+
+    def test_feed_is_keyset_paginated_newest_first(self):
+        seen = []
+        url = "/api/v1/auth/notifications/?page_size=10"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [item["slug"] for item in response.data["results"]]
+            url = response.data["next"]
+
+        expected = Notification.objects.filter(user=self.user).order_by(
+            "-created_at", "-pk"
+        )
+        self.assertEqual(seen, list(expected.values_list("slug", flat=True)))
+
+    def test_badge_is_a_single_primary_key_read(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.user.pk), 25)
+
+        response = self.client.get("/api/v1/auth/notifications/unread-count/")
+        self.assertEqual(response.data, {"unread": 25})
+
+    def test_mark_read_keeps_counter_in_step(self):
+        slug = Notification.objects.filter(user=self.user).first().slug
+        response = self.client.post(f"/api/v1/auth/notifications/{slug}/read/")
+        self.assertEqual(response.data, {"marked": 1})
+        response = self.client.post(f"/api/v1/auth/notifications/{slug}/read/")
+        self.assertEqual(response.data, {"marked": 0})
+        self.assertEqual(unread_count(self.user.pk), 24)
+
+        other_slug = Notification.objects.filter(user=self.other).first().slug
+        response = self.client.post(f"/api/v1/auth/notifications/{other_slug}/read/")
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.post("/api/v1/auth/notifications/read-all/")
+        self.assertEqual(response.data, {"marked": 24})
+        self.assertEqual(unread_count(self.user.pk), 0)
+        self.assertEqual(unread_count(self.other.pk), 3)
+
+        response = self.client.get("/api/v1/auth/notifications/?unread=1")
+        self.assertEqual(response.data["results"], [])
+
+    def test_saves_deletes_and_admin_actions_update_counter(self):
+        notification = Notification.objects.create(
+            user=self.other, type="order_shipped", title="Shipped", message="."
+        )
+        self.assertEqual(unread_count(self.other.pk), 4)
+
+        notification.is_read = True
+        notification.save()
+        self.assertEqual(unread_count(self.other.pk), 3)
+        notification.delete()
+        Notification.objects.filter(user=self.other, is_read=False).first().delete()
+        self.assertEqual(unread_count(self.other.pk), 2)
+
+        set_read(Notification.objects.all())
+        self.assertEqual(unread_count(self.user.pk), 0)
+        self.assertEqual(unread_count(self.other.pk), 0)
+        set_read(Notification.objects.filter(user=self.other), is_read=False)
+        self.assertEqual(unread_count(self.other.pk), 2)
+
+        self.other.delete()
+        self.assertEqual(unread_count(self.other.pk), 0)
+
+
+class RecordingBackplane(LocalBackplane):
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, envelope):
+        self.published.append((channel, envelope["data"]))
+        super().publish(channel, envelope)
+
+
+class FakePubSub:
+    def __init__(self, messages, on_end):
+        self.messages = messages
+        self.on_end = on_end
+
+    def psubscribe(self, pattern):
+        pass
+
+    def listen(self):
+        for data in self.messages:
+            yield {"channel": b"push:news", "data": data}
+        self.on_end()
+
+    def close(self):
+        pass
+
+
+class TestPubSubHub(SimpleTestCase):
+    async def test_delivers_messages_published_from_other_threads(self):
+        hub = Hub(LocalBackplane())
+        with hub.subscribe("news") as subscription:
+            self.assertEqual(hub.snapshot()["connections"], 1)
+            await asyncio.to_thread(hub.publish, "news", {"n": 1})
+            await asyncio.to_thread(hub.publish, "sports", {"n": 2})
+
+            self.assertEqual(await subscription.get(timeout=1), {"n": 1})
+            with self.assertRaises(asyncio.TimeoutError):
+                await subscription.get(timeout=0.05)
+
+        stats = hub.snapshot()
+        self.assertEqual(stats["connections"], 0)
+        self.assertEqual(stats["delivered"], 1)
+        self.assertEqual(stats["latency"]["count"], 1)
+
+    def test_redis_listener_survives_bad_messages_and_disconnects(self):
+        backplane = RedisBackplane("redis://", reconnect_delay=0)
+        delivered = []
+        backplane.deliver = lambda channel, data: delivered.append((channel, data))
+
+        def disconnect():
+            raise ConnectionError("Connection reset by peer")
+
+        def stop():
+            backplane._stopped.set()
+            raise ValueError("I/O operation on closed file")
+
+        backplane.client = mock.Mock()
+        backplane.client.pubsub.side_effect = [
+            FakePubSub([b'{"n": 1}', b"{oops", b'{"n": 2}'], disconnect),
+            FakePubSub([b'{"n": 3}'], stop),
+        ]
+        backplane._subscribe()
+        with self.assertLogs("clot.pubsub", "ERROR") as logs:
+            backplane._listen()
+
+        self.assertEqual(delivered, [("news", {"n": n}) for n in (1, 2, 3)])
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn("Dropped push message", logs.output[0])
+        self.assertIn("lost its Redis subscription", logs.output[1])
+
+    async def test_slow_subscriber_is_cut_off_after_draining(self):
+        hub = Hub(LocalBackplane(), queue_size=2)
+        with hub.subscribe("news") as subscription:
+            hub.publish_many(("news", {"n": n}) for n in range(4))
+            await asyncio.sleep(0)
+
+            self.assertEqual(await subscription.get(timeout=1), {"n": 0})
+            self.assertEqual(await subscription.get(timeout=1), {"n": 1})
+            with self.assertRaises(SubscriptionOverflow):
+                await subscription.get(timeout=1)
+        self.assertEqual(hub.stats["dropped"], 2)
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS,
+    PUSH={"BACKPLANE": "authentication.tests.RecordingBackplane"},
+)
+class TestNotificationStream(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            phone_number="+998901234567", password="secret123", first_name="Ali"
+        )
+        self.token = str(AccessToken.for_user(self.user))
+        self.view = NotificationStreamView.as_view()
+        self.factory = AsyncRequestFactory()
+
+    def notify(self, title):
+        return Notification.objects.create(
+            user=self.user, type="order_shipped", title=title, message="."
+        )
+
+    async def open_stream(self, data=None, headers=None):
+        request = self.factory.get(
+            "/api/v1/auth/notifications/stream/", data, headers=headers
+        )
+        response = await self.view(request)
+        return response, aiter(response.streaming_content)
+
+    async def test_pushes_new_notifications(self):
+        response, stream = await self.open_stream(
+            headers={"Authorization": f"Bearer {self.token}"}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertTrue((await anext(stream)).startswith(b"retry:"))
+
+        notification = await sync_to_async(self.notify)("Shipped")
+        await sync_to_async(publish_notifications)([notification])
+        event = (await anext(stream)).decode()
+
+        self.assertIn(f"id: {notification.pk}\nevent: notification\n", event)
+        self.assertIn('"title": "Shipped"', event)
+        self.assertEqual(get_hub().snapshot()["connections"], 1)
+
+        # ASGIHandler cancels the response task when the client disconnects.
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(get_hub().snapshot()["connections"], 0)
+
+    async def test_replays_missed_notifications(self):
+        first, second, third = [
+            await sync_to_async(self.notify)(title) for title in "ABC"
+        ]
+        response, stream = await self.open_stream(
+            {"token": self.token}, headers={"Last-Event-ID": str(first.pk)}
+        )
+        await anext(stream)
+        replayed = [(await anext(stream)).decode() for _ in range(2)]
+
+        self.assertIn(f"id: {second.pk}\n", replayed[0])
+        self.assertIn(f"id: {third.pk}\n", replayed[1])
+        await stream.aclose()
+
+    async def test_rejects_missing_or_invalid_token(self):
+        response = await self.view(
+            self.factory.get("/api/v1/auth/notifications/stream/")
+        )
+        self.assertEqual(response.status_code, 401)
+        response = await self.view(
+            self.factory.get(
+                "/api/v1/auth/notifications/stream/",
+                headers={"Authorization": "Bearer x"},
+            )
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_refused_under_wsgi(self):
+        request = RequestFactory().get(
+            "/api/v1/auth/notifications/stream/",
+            HTTP_AUTHORIZATION=f"Bearer {self.token}",
+        )
+        response = await self.view(request)
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(get_hub().snapshot()["connections"], 0)
+
+    def test_created_notifications_are_published_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify("Single")
+            fan_out_notification([self.user.pk] * 3, "order_placed", "Bulk", ".")
+
+        published = get_hub().backplane.published
+        self.assertEqual(
+            [data["title"] for _, data in published], ["Single", "Bulk", "Bulk", "Bulk"]
+        )
+        self.assertEqual(
+            {channel for channel, _ in published}, {f"notifications:{self.user.pk}"}
+        )
+
+    def test_publish_failure_does_not_fail_the_fan_out(self):
+        with mock.patch.object(
+            get_hub(), "publish_many", side_effect=ConnectionError("Redis is down")
+        ), self.assertLogs("authentication.push", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                created = fan_out_notification([self.user.pk], "order_placed", "X", ".")
+        self.assertEqual(created, 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TestUserExport(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(
+            phone_number="+998900000000",
+            password="secret123",
+            first_name="Staff",
+            is_staff=True,
+        )
+        User.objects.create_user(
+            phone_number="+998900000001", password="secret123", first_name="Aziz"
+        )
+
+    def test_staff_export_streams_users_without_secrets(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get("/api/v1/auth/users/export/")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        users = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [user["phone_number"] for user in users], ["+998900000000", "+998900000001"]
+        )
+        self.assertNotIn("password", users[0])
+
+        self.client.force_authenticate(User.objects.get(first_name="Aziz"))
+        self.assertEqual(self.client.get("/api/v1/auth/users/export/").status_code, 403)
+
+    def test_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f"{directory}/users.csv"
+        call_command("export_users", format="csv", output=path, stdout=io.StringIO())
+        with open(path) as f:
+            header, *rows = f.read().splitlines()
+        self.assertTrue(header.startswith("id,slug,phone_number,"))
+        self.assertEqual(len(rows), 2)
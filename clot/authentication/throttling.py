@@ -0,0 +1,129 @@
+import math
+import re
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Parses ``"<count>/<period>"`` where period is e.g. ``s``, ``10m`` or ``h``."""
+    count, period = rate.split("/")
+    match = re.fullmatch(r"(\d*)([smhd])\w*", period)
+    if not match:
+        raise ValueError(f"Invalid throttle rate: {rate!r}")
+    return int(count), int(match.group(1) or 1) * UNITS[match.group(2)]
+
+
+class SlidingWindowCounter:
+    """
+    Approximate sliding-window limiter built from two fixed-window counters.
+
+    The request count for the last ``window`` seconds is estimated as the
+    current window's count plus the previous window's count weighted by how
+    much of it still overlaps. Each key needs two integers in the cache no
+    matter how many requests it makes.
+    """
+
+    def __init__(self, cache, limit, window, clock=time.time):
+        self.cache = cache
+        self.limit = limit
+        self.window = window
+        self.clock = clock
+
+    def hit(self, key):
+        """Counts one request for ``key``; returns ``(allowed, retry_after)``."""
+        now = self.clock()
+        index, offset = divmod(now, self.window)
+        current_key = f"{key}:{int(index)}"
+        previous_key = f"{key}:{int(index) - 1}"
+
+        counts = self.cache.get_many([current_key, previous_key])
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0)
+        weight = 1 - offset / self.window
+        if previous * weight + current + 1 > self.limit:
+            return False, self._retry_after(previous, current, offset)
+
+        if not self.cache.add(current_key, 1, timeout=self.window * 2):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                self.cache.set(current_key, 1, timeout=self.window * 2)
+        return True, 0
+
+    def _retry_after(self, previous, current, offset):
+        # Seconds until the estimate leaves room for one more request.
+        budget = self.limit - 1
+        if current > budget:
+            wait = (self.window - offset) + self.window * (1 - budget / current)
+        else:
+            wait = self.window * (1 - (budget - current) / previous) - offset
+        return max(1, math.ceil(wait))
+
+
+class AuthActionThrottle(BaseThrottle):
+    """
+    Limits ``AuthView`` actions per identifier using the rates in
+    ``AUTH_THROTTLE_RATES[action][kind]``.
+
+    Rejection happens in ``APIView.initial``, before the handler parses the
+    payload with a serializer or touches the database.
+    """
+
+    kind = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_identifier(self, request, data):
+        raise NotImplementedError
+
+    def allow_action(self, action, request, data):
+        rate = getattr(settings, "AUTH_THROTTLE_RATES", {}).get(action, {})
+        rate = rate.get(self.kind)
+        if not rate:
+            return True
+        identifier = self.get_identifier(request, data)
+        if not identifier:
+            return True
+
+        limit, window = parse_rate(rate)
+        counter = SlidingWindowCounter(
+            caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")],
+            limit,
+            window,
+        )
+        allowed, self.retry_after = counter.hit(
+            f"throttle:{action}:{self.kind}:{identifier}"
+        )
+        return allowed
+
+    def allow_request(self, request, view):
+        return self.allow_action(view.kwargs.get("action"), request, request.data)
+
+    def wait(self):
+        return self.retry_after
+
+
+class PhoneNumberThrottle(AuthActionThrottle):
+    kind = "phone"
+
+    def get_identifier(self, request, data):
+        phone_number = data.get("phone_number") if hasattr(data, "get") else None
+        if not isinstance(phone_number, str):
+            return None
+        return re.sub(r"\D", "", phone_number) or None
+
+
+class IPAddressThrottle(AuthActionThrottle):
+    kind = "ip"
+
+    def get_identifier(self, request, data):
+        return self.get_ident(request)
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import get_blacklist_filter
+
+
+class FilteredRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check goes through the in-process
+    ``BlacklistFilter``, so the database is only queried on a possible hit.
+    """
+
+    def check_blacklist(self):
+        blacklist_filter = get_blacklist_filter()
+        if blacklist_filter is None:
+            return super().check_blacklist()
+
+        if blacklist_filter.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter = get_blacklist_filter()
+        if blacklist_filter is not None:
+            blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+def blacklist_user_tokens(user_id):
+    """
+    Blacklists every unexpired outstanding token of a user with one
+    ``bulk_create``. Tokens already blacklisted, including by a concurrent
+    logout or rotation, are skipped rather than failing the insert.
+
+    Returns the number of tokens blacklisted.
+    """
+    now = timezone.now()
+    token_ids = list(
+        OutstandingToken.objects.filter(
+            user_id=user_id, expires_at__gt=now, blacklistedtoken__isnull=True
+        ).values_list("pk", flat=True)
+    )
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=pk, blacklisted_at=now) for pk in token_ids],
+        ignore_conflicts=True,
+    )
+
+    blacklist_filter = get_blacklist_filter()
+    if blacklist_filter is not None:
+        transaction.on_commit(lambda: blacklist_filter.sync(force=True))
+    return len(token_ids)
+
+
+def _delete_in_batches(queryset, batch_size):
+    model = queryset.model
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += (
+            model.objects.filter(pk__in=ids).delete()[1].get(model._meta.label, 0)
+        )
+
+
+def compact_expired_tokens(batch_size=1000):
+    """
+    Removes expired outstanding tokens and their blacklist entries in batches
+    of ``batch_size`` rows so no single transaction holds the tables for long.
+    Blacklist rows go first, so deleting outstanding tokens cascades to nothing.
+    """
+    now = timezone.now()
+    blacklisted = _delete_in_batches(
+        BlacklistedToken.objects.filter(token__expires_at__lte=now), batch_size
+    )
+    outstanding = _delete_in_batches(
+        OutstandingToken.objects.filter(expires_at__lte=now), batch_size
+    )
+    return outstanding, blacklisted
@@ -1,18 +1,54 @@
+from django.conf import settings
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 
+from .async_views import AsyncAuthView, NotificationStreamView
 from .views import (
+    AuthMetricsView,
     AuthView,
+    NotificationListView,
+    NotificationMarkReadView,
+    NotificationUnreadCountView,
     UserDetailsView,
+    UserExportView,
     LogoutView,
     LogoutAllView,
     TokenRefreshView,
 )
 
+if settings.ASYNC_AUTH_VIEWS:
+    auth_view = csrf_exempt(AsyncAuthView.as_view())
+else:
+    auth_view = AuthView.as_view()
+
 urlpatterns = [
-    path("user/<str:action>/", AuthView.as_view(), name="auth"),
+    path("user/<str:action>/", auth_view, name="auth"),
+    path("users/export/", UserExportView.as_view(), name="user-export"),
     path("users/<str:slug>/", UserDetailsView.as_view(), name="user-detail"),
     path("users/", UserDetailsView.as_view(), name="user-list"),
     path("logout/", LogoutView.as_view(), name="logout"),
     path("logout/all/", LogoutAllView.as_view(), name="logout-all"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
+    path("notifications/", NotificationListView.as_view(), name="notification-list"),
+    path(
+        "notifications/stream/",
+        NotificationStreamView.as_view(),
+        name="notification-stream",
+    ),
+    path(
+        "notifications/unread-count/",
+        NotificationUnreadCountView.as_view(),
+        name="notification-unread-count",
+    ),
+    path(
+        "notifications/read-all/",
+        NotificationMarkReadView.as_view(),
+        name="notification-read-all",
+    ),
+    path(
+        "notifications/<str:slug>/read/",
+        NotificationMarkReadView.as_view(),
+        name="notification-read",
+    ),
+    path("metrics/", AuthMetricsView.as_view(), name="auth-metrics"),
 ]
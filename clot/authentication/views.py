@@ -2,24 +2,31 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from rest_framework.permissions import AllowAny
 from django.contrib.auth import authenticate
-from django.utils import timezone
-from datetime import timedelta
 from rest_framework_simplejwt.tokens import TokenError
 from rest_framework import permissions, status
 from rest_framework.response import Response
-from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from rest_framework import views
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.token_blacklist.models import (
-    OutstandingToken,
-    BlacklistedToken,
-)
+
+from clot.exports import ExportView
+from clot.pagination import RankedPagination
+from clot.pubsub import get_hub
+
 from .extensions import SMSMessage
 
 
-from .models import OneTimePassword, User
+from .authentication import user_cache_stats
+from .blacklist import get_blacklist_filter
+from .exports import UserExport
+from .models import Notification, User
+from .notifications import mark_all_read, set_read, unread_count
+from .pagination import NotificationPagination, UserPagination
+from .search import search_user_ids, users_by_id
+from .throttling import IPAddressThrottle, PhoneNumberThrottle
+from .otp import get_otp_store
+from .tokens import FilteredRefreshToken, blacklist_user_tokens
 from .serializers import (
     RegisterSerializer,
     VerifyOTPSerializer,
@@ -29,27 +36,22 @@ from .serializers import (
     ResetPasswordSerializer,
     UserSerializer,
     UserUpdateSerializer,
+    NotificationSerializer,
 )
 from .extensions import send_sms, generate_code
 
 
 class AuthView(views.APIView):
     permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = [IPAddressThrottle, PhoneNumberThrottle]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ["phone_number", "first_name", "last_name"]
     search_fields = ["phone_number", "first_name", "last_name"]
 
     @staticmethod
     def _handle_otp_verification(phone_number, otp_code):
-        otp = OneTimePassword.objects.filter(
-            user__phone_number=phone_number,
-            passcode=otp_code,
-            created_at__gte=timezone.now() - timedelta(minutes=5),
-        ).first()
-
-        if not otp:
-            return None
-        return otp.user
+        return get_otp_store().verify(phone_number, otp_code)
 
     @staticmethod
     def _generate_tokens(user):
@@ -89,8 +91,7 @@ class AuthView(views.APIView):
         user = serializer.save(is_active=False)
 
         otp_code = generate_code()
-        OneTimePassword.objects.filter(user=user).delete()
-        OneTimePassword.objects.create(user=user, passcode=otp_code)
+        get_otp_store().issue(user, otp_code)
         send_sms(
             phone_number=user.phone_number,
             name=user.first_name,
@@ -118,7 +119,7 @@ class AuthView(views.APIView):
 
         user.is_active = True
         user.save()
-        OneTimePassword.objects.filter(user=user).delete()
+        get_otp_store().discard(user)
 
         tokens = self._generate_tokens(user)
         return Response(
@@ -176,7 +177,7 @@ class AuthView(views.APIView):
 
         # Generate and send OTP
         otp_code = generate_code()
-        OneTimePassword.objects.create(user=user, passcode=otp_code)
+        get_otp_store().issue(user, otp_code)
         send_sms(
             phone_number=user.phone_number,
             name=user.first_name,
@@ -203,7 +204,7 @@ class AuthView(views.APIView):
         # Reset password and delete OTP
         user.set_password(new_password)
         user.save()
-        OneTimePassword.objects.filter(user=user).delete()
+        get_otp_store().discard(user)
 
         tokens = self._generate_tokens(user)
         return Response(
@@ -228,14 +229,6 @@ class UserDetailsView(views.APIView):
 
                 queryset = User.objects.all()
 
-                search = request.query_params.get("search")
-                if search:
-                    queryset = queryset.filter(
-                        Q(phone_number__icontains=search)
-                        | Q(first_name__icontains=search)
-                        | Q(last_name__icontains=search)
-                    )
-
                 gender = request.query_params.get("gender")
                 if gender:
                     queryset = queryset.filter(gender=gender)
@@ -244,28 +237,21 @@ class UserDetailsView(views.APIView):
                 if age:
                     queryset = queryset.filter(age=age)
 
-                ordering = request.query_params.get("ordering", "-date_joined")
-                if ordering:
-                    queryset = queryset.order_by(ordering)
-
-                page = int(request.query_params.get("page", 1))
-                page_size = int(request.query_params.get("page_size", 10))
-                start = (page - 1) * page_size
-                end = start + page_size
-
-                users = queryset[start:end]
-                total = queryset.count()
+                search = request.query_params.get("search")
+                if search:
+                    # Ranked by relevance, so pages follow the ranking rather
+                    # than an ordering field.
+                    paginator = RankedPagination()
+                    user_ids = paginator.paginate_list(
+                        search_user_ids(search, queryset), request
+                    )
+                    serializer = UserSerializer(users_by_id(user_ids), many=True)
+                    return paginator.get_paginated_response(serializer.data)
 
+                paginator = UserPagination()
+                users = paginator.paginate_queryset(queryset, request, view=self)
                 serializer = UserSerializer(users, many=True)
-                return Response(
-                    {
-                        "results": serializer.data,
-                        "total": total,
-                        "page": page,
-                        "total_pages": (total + page_size - 1) // page_size,
-                        "page_size": page_size,
-                    }
-                )
+                return paginator.get_paginated_response(serializer.data)
 
             if slug:
                 if not request.user.is_staff:
@@ -367,7 +353,7 @@ class LogoutView(views.APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
 
             # Optional: Blacklist all tokens for this user
@@ -391,9 +377,7 @@ class LogoutAllView(views.APIView):
 
     def post(self, request):
         try:
-            tokens = OutstandingToken.objects.filter(user_id=request.user.id)
-            for token in tokens:
-                BlacklistedToken.objects.get_or_create(token=token)
+            blacklist_user_tokens(request.user.id)
 
             return Response(
                 {"message": "Successfully logged out from all devices"},
@@ -421,7 +405,7 @@ class TokenRefreshView(views.APIView):
                 )
 
             # Verify and generate new tokens
-            refresh = RefreshToken(refresh_token)
+            refresh = FilteredRefreshToken(refresh_token)
 
             data = {
                 "access": str(refresh.access_token),
@@ -437,3 +421,56 @@ class TokenRefreshView(views.APIView):
             )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NotificationListView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        queryset = Notification.objects.filter(user=request.user)
+        if request.query_params.get("unread"):
+            queryset = queryset.filter(is_read=False)
+
+        paginator = NotificationPagination()
+        notifications = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = NotificationSerializer(notifications, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class NotificationUnreadCountView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread": unread_count(request.user.id)})
+
+
+class NotificationMarkReadView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, slug=None):
+        if slug is None:
+            return Response({"marked": mark_all_read(request.user.id)})
+
+        notification = get_object_or_404(Notification, slug=slug, user=request.user)
+        marked = set_read(Notification.objects.filter(pk=notification.pk))
+        return Response({"marked": marked})
+
+
+class AuthMetricsView(views.APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        blacklist_filter = get_blacklist_filter()
+        return Response(
+            {
+                "user_cache": user_cache_stats,
+                "blacklist_filter": (
+                    blacklist_filter.stats if blacklist_filter else None
+                ),
+                "push": get_hub().snapshot(),
+            }
+        )
+
+
+class UserExportView(ExportView):
+    export_class = UserExport
@@ -0,0 +1,43 @@
+"""
+Standalone benchmarks. Run from the ``clot`` directory, e.g.::
+
+    python -m benchmarks.token_refresh
+
+Each benchmark runs against a throwaway test database, never the configured one.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup(database=None):
+    """
+    Configures Django and creates the test database: in memory, or in the
+    file ``database`` for benchmarks whose threads write concurrently, which
+    SQLite's shared in-memory databases fail instead of waiting on.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "clot.settings")
+
+    import django
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    if database:
+        connection.settings_dict["TEST"]["NAME"] = database
+    connection.creation.create_test_db(verbosity=0)
+
+
+@contextmanager
+def timer(label, operations, stdout=print):
+    started = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - started
+    stdout(
+        f"{label:<40} {operations / elapsed:>12,.0f} ops/s"
+        f" {elapsed / operations * 1e6:>10,.1f} us/op"
+    )
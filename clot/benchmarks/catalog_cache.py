@@ -0,0 +1,78 @@
+"""
+Catalog traffic with and without the response cache and conditional GET:
+bytes sent and queries run for the same mix of requests.
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks import setup
+from benchmarks.facets import populate
+
+
+def run(client, urls, conditional):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    etags = {}
+    sent = 0
+    statuses = {}
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for url in urls:
+            headers = {}
+            if conditional and url in etags:
+                headers["HTTP_IF_NONE_MATCH"] = etags[url]
+            response = client.get(url, **headers)
+            sent += len(response.content)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.has_header("ETag"):
+                etags[url] = response["ETag"]
+        elapsed = time.perf_counter() - started
+    return sent, len(queries), elapsed, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--distinct", type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+
+    from products.models import Category, Product
+
+    populate(args.products)
+    slugs = list(Product.objects.values_list("slug", flat=True)[: args.distinct])
+    categories = list(Category.objects.values_list("slug", flat=True))
+    rng = random.Random(1)
+    pool = [f"/api/v1/products/{slug}/" for slug in slugs] + [
+        f"/api/v1/products/?category={rng.choice(categories)}&page_size=20"
+        for _ in range(args.distinct)
+    ]
+    urls = [rng.choice(pool) for _ in range(args.requests)]
+    client = Client()
+
+    scenarios = [
+        ("no cache", {"ENABLED": False}, False),
+        ("response cache", {"ENABLED": True}, False),
+        ("response cache + If-None-Match", {"ENABLED": True}, True),
+    ]
+    print(f"{'':<34} {'KiB sent':>10} {'queries':>8} {'req/s':>8}  statuses")
+    for label, config, conditional in scenarios:
+        cache.clear()
+        with override_settings(CATALOG_CACHE=config):
+            sent, queries, elapsed, statuses = run(client, urls, conditional)
+        print(
+            f"{label:<34} {sent / 1024:>10,.0f} {queries:>8,}"
+            f" {len(urls) / elapsed:>8,.0f}  {statuses}"
+        )
+
+
+if __name__ == "__main__":
+    main()
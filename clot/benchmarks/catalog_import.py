@@ -0,0 +1,120 @@
+"""
+Catalog import: saving products one at a time, as the admin does, versus
+import_catalog's batched bulk inserts, in rows per second.
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from benchmarks import setup
+
+COLUMNS = ["title", "description", "price", "stock", "categories", "colors", "sizes"]
+ADJECTIVES = ["slim", "oversized", "classic", "linen", "wool", "cropped", "vintage"]
+NOUNS = ["jeans", "jacket", "shirt", "dress", "hoodie", "sneakers", "coat", "skirt"]
+
+
+def write_catalog(path, rows, seed=11):
+    rng = random.Random(seed)
+    categories = [f"Category {i}" for i in range(30)]
+    colors = [f"Color {i}" for i in range(12)]
+    sizes = ["XS", "S", "M", "L", "XL", "XXL"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            writer.writerow(
+                [
+                    f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+                    "Imported product",
+                    f"{rng.randint(100, 50000) / 100:.2f}",
+                    rng.choice([0, 1, 5, 20]),
+                    "|".join(rng.sample(categories, rng.randint(1, 2))),
+                    "|".join(rng.sample(colors, rng.randint(1, 4))),
+                    "|".join(rng.sample(sizes, rng.randint(1, 5))),
+                ]
+            )
+
+
+def save_one_by_one(path, limit):
+    """What entering products in the admin costs: save() and one add per relation."""
+    from products.importer import parse_record, read_csv
+    from products.models import Category, Colors, Product, Sizes
+
+    models = {"categories": Category, "colors": Colors, "sizes": Sizes}
+    fields = {"categories": "name", "colors": "color", "sizes": "size"}
+    with open(path, newline="") as f:
+        for _, record in read_csv(f):
+            if limit == 0:
+                break
+            limit -= 1
+            row = parse_record(record)
+            product = Product.objects.create(
+                title=row["title"],
+                description=row["description"],
+                price=row["price"],
+                stock=row["stock"],
+            )
+            for column, relation in (
+                ("categories", product.category),
+                ("colors", product.color),
+                ("sizes", product.size),
+            ):
+                for name in row["relations"][column]:
+                    value, _ = models[column].objects.get_or_create(
+                        **{fields[column]: name}
+                    )
+                    relation.add(value)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--one-by-one", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.core.management import call_command
+
+    from products.models import Product
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "catalog.csv")
+    try:
+        write_catalog(path, args.rows)
+        print(f"{args.rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MiB of CSV")
+
+        started = time.perf_counter()
+        save_one_by_one(path, args.one_by_one)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{'save() per product':<28} {args.one_by_one / elapsed:>10,.0f} rows/s"
+            f"  ({args.one_by_one:,} rows)"
+        )
+
+        before = Product.objects.count()
+        started = time.perf_counter()
+        call_command(
+            "import_catalog",
+            path,
+            batch_size=args.batch_size,
+            stdout=open(os.devnull, "w"),
+        )
+        elapsed = time.perf_counter() - started
+        imported = Product.objects.count() - before
+        print(
+            f"{'import_catalog':<28} {imported / elapsed:>10,.0f} rows/s"
+            f"  ({imported:,} rows, batches of {args.batch_size:,})"
+        )
+    finally:
+        os.remove(path)
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Streaming exports: peak Python memory and rows per second for the product
+export as the table grows, against building the whole response in memory
+as a regular JSON view would.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks import setup
+
+
+def measure(label, rows, produce):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = produce()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{label:<30} {rows / elapsed:>9,.0f} rows/s  peak {peak / 2**20:>8.1f} MiB"
+        f"  {size / 2**20:>8.1f} MiB out"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="20000,100000")
+    args = parser.parse_args()
+
+    setup()
+
+    from django.core.serializers.json import DjangoJSONEncoder
+
+    from clot.exports import stream_export
+    from products.exports import ProductExport
+
+    from benchmarks.facets import populate
+
+    def streamed(fmt, gzip=False):
+        return lambda: sum(
+            len(piece) for piece in stream_export(ProductExport(), fmt, gzip)
+        )
+
+    def in_memory():
+        return len(json.dumps(list(ProductExport().rows()), cls=DjangoJSONEncoder))
+
+    total = 0
+    for size in map(int, args.sizes.split(",")):
+        populate(size - total, first_id=total + 1)
+        total = size
+        print(f"{size:,} products")
+        measure("  whole list, json.dumps", size, in_memory)
+        measure("  stream ndjson", size, streamed("ndjson"))
+        measure("  stream csv", size, streamed("csv"))
+        measure("  stream ndjson + gzip", size, streamed("ndjson", gzip=True))
+
+
+if __name__ == "__main__":
+    main()
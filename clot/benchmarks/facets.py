@@ -0,0 +1,166 @@
+"""Facet counts: one GROUP BY query per facet versus the in-memory bitmap index."""
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks import setup, timer
+
+
+def populate(count, categories=30, colors=12, sizes=8, first_id=1):
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from products.facets import RELATIONS, FacetIndex, _revision, _through
+    from products.models import Category, Colors, Product, ProductFacets, Sizes
+
+    rng = random.Random(42)
+    values = {
+        "category": [
+            Category.objects.create(name=f"Category {i}").pk for i in range(categories)
+        ],
+        "color": [Colors.objects.create(color=f"Color {i}").pk for i in range(colors)],
+        "size": [Sizes.objects.create(size=f"Size {i}").pk for i in range(sizes)],
+    }
+    picks = {"category": (1, 2), "color": (1, 4), "size": (1, 5)}
+
+    now = timezone.now()
+    # An established catalog: older than the index's re-read window.
+    revision = _revision() - 2 * FacetIndex.REVISION_OVERLAP
+    quote = connection.ops.quote_name
+    product_sql = (
+        f"INSERT INTO {quote(Product._meta.db_table)} (id, title, description, "
+        "price, stock, created_at, updated_at, slug, rating_count, rating_sum, "
+        "rating_average, rating_1, rating_2, rating_3, rating_4, rating_5) "
+        "VALUES (%s, %s, '', %s, %s, %s, %s, %s, 0, 0, 0, 0, 0, 0, 0, 0)"
+    )
+    facets_sql = (
+        f"INSERT INTO {quote(ProductFacets._meta.db_table)} (product_id, "
+        "categories, colors, sizes, price, in_stock, deleted, revision) "
+        "VALUES (%s, %s, %s, %s, %s, %s, 0, %s)"
+    )
+    through_sql = {}
+    for facet in RELATIONS:
+        through, product_column, value_column = _through(facet)
+        through_sql[facet] = (
+            f"INSERT INTO {quote(through._meta.db_table)} "
+            f"({product_column}, {value_column}) VALUES (%s, %s)"
+        )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(first_id, first_id + count, 10000):
+            products, facet_rows = [], []
+            links = {facet: [] for facet in RELATIONS}
+            for pk in range(start, min(start + 10000, first_id + count)):
+                price = rng.randint(100, 50000) / 100
+                stock = rng.choice([0, 0, 1, 5, 20])
+                related = {}
+                for facet, (low, high) in picks.items():
+                    related[facet] = sorted(
+                        rng.sample(values[facet], rng.randint(low, high))
+                    )
+                    links[facet] += [(pk, value) for value in related[facet]]
+                products.append(
+                    (pk, f"Product {pk}", price, stock, now, now, f"product-{pk}")
+                )
+                facet_rows.append(
+                    (
+                        pk,
+                        *(json.dumps(related[facet]) for facet in RELATIONS),
+                        price,
+                        stock > 0,
+                        revision,
+                    )
+                )
+            cursor.executemany(product_sql, products)
+            cursor.executemany(facets_sql, facet_rows)
+            for facet, rows in links.items():
+                cursor.executemany(through_sql[facet], rows)
+    return values
+
+
+def naive_counts(filters, price_step=50):
+    from django.db.models import Count, F, FloatField
+    from django.db.models.functions import Cast, Floor
+
+    from products.facets import RELATIONS, _through, filter_products
+    from products.models import Product
+
+    def matching(excluded):
+        remaining = {k: v for k, v in filters.items() if k not in excluded}
+        return filter_products(Product.objects.order_by(), remaining)
+
+    facets = {}
+    for facet in RELATIONS:
+        through, product_column, value_column = _through(facet)
+        rows = through.objects.filter(
+            **{f"{product_column}__in": matching({facet}).values("pk")}
+        )
+        facets[facet] = dict(
+            rows.values_list(value_column).annotate(count=Count("pk")).order_by()
+        )
+    facets["in_stock"] = {
+        True: matching({"in_stock"}).filter(stock__gt=0).count(),
+        False: matching({"in_stock"}).filter(stock=0).count(),
+    }
+    buckets = (
+        matching({"min_price", "max_price"})
+        .annotate(bucket=Floor(Cast(F("price"), FloatField()) / price_step))
+        .values_list("bucket")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    facets["price"] = {int(bucket): count for bucket, count in buckets}
+    return {"total": matching(set()).count(), "facets": facets}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+
+    from decimal import Decimal
+
+    from products.facets import FacetIndex
+
+    started = time.perf_counter()
+    values = populate(args.products)
+    print(
+        f"inserted {args.products:,} products in {time.perf_counter() - started:.1f}s"
+    )
+
+    index = FacetIndex()
+    started = time.perf_counter()
+    index.sync()
+    print(f"loaded index in {time.perf_counter() - started:.2f}s")
+
+    filter_sets = {
+        "no filters": {},
+        "one category": {"category": {values["category"][0]}},
+        "category + colors + stock": {
+            "category": set(values["category"][:3]),
+            "color": set(values["color"][:2]),
+            "in_stock": True,
+        },
+        "size + price range": {
+            "size": {values["size"][1]},
+            "min_price": Decimal("120.50"),
+            "max_price": Decimal("260"),
+        },
+    }
+    for label, filters in filter_sets.items():
+        assert index.counts(filters) == naive_counts(filters), label
+        with timer(f"GROUP BY, {label}", args.repeat):
+            for _ in range(args.repeat):
+                naive_counts(filters)
+        with timer(f"bitmap index, {label}", args.repeat):
+            for _ in range(args.repeat):
+                index.counts(filters)
+
+
+if __name__ == "__main__":
+    main()
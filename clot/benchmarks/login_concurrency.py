@@ -0,0 +1,114 @@
+"""
+Concurrent logins through the sync AuthView (one WSGI worker with a fixed
+thread pool) and the AsyncAuthView (one ASGI worker with a bounded hashing
+pool). While logins run, a cheap request is issued every few milliseconds
+and its latency shows whether the worker stays responsive.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import setup
+
+PHONE = "+998900000000"
+PASSWORD = "benchmark-password"
+
+
+def report(label, elapsed, logins, probes):
+    probes = sorted(probes)
+    p95 = probes[int(len(probes) * 0.95) - 1] if probes else 0
+    print(
+        f"{label:<6} {logins / elapsed:>8.1f} logins/s  "
+        f"probe p50 {statistics.median(probes) * 1000 if probes else 0:>8.1f} ms  "
+        f"p95 {p95 * 1000:>8.1f} ms  ({len(probes)} probes)"
+    )
+
+
+def run_wsgi(logins, threads):
+    from rest_framework.test import APIRequestFactory
+
+    from authentication.views import AuthView
+
+    factory = APIRequestFactory()
+    view = AuthView.as_view()
+    body = {"phone_number": PHONE, "password": PASSWORD}
+
+    def login(_):
+        request = factory.post("/", body, format="json")
+        assert view(request, action="login").status_code == 200
+
+    def probe():
+        request = factory.post("/", {}, format="json")
+        started = time.perf_counter()
+        view(request, action="unknown")
+        return time.perf_counter() - started
+
+    probes = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(login, i) for i in range(logins)]
+        # Probes share the worker's thread pool, as they would in a real
+        # server, so they queue behind logins once every thread is hashing.
+        while not all(future.done() for future in futures):
+            probe_started = time.perf_counter()
+            pool.submit(probe).result()
+            probes.append(time.perf_counter() - probe_started)
+            time.sleep(0.01)
+    report("WSGI", time.perf_counter() - started, logins, probes)
+
+
+def run_asgi(logins):
+    from django.test import AsyncRequestFactory
+
+    from authentication.async_views import AsyncAuthView
+
+    factory = AsyncRequestFactory()
+    view = AsyncAuthView.as_view()
+    body = {"phone_number": PHONE, "password": PASSWORD}
+
+    async def login():
+        request = factory.post("/", body, content_type="application/json")
+        response = await view(request, action="login")
+        assert response.status_code == 200, response.content
+
+    async def main():
+        probes = []
+        tasks = [asyncio.create_task(login()) for _ in range(logins)]
+        started = time.perf_counter()
+        while not all(task.done() for task in tasks):
+            probe_started = time.perf_counter()
+            request = factory.post("/", {}, content_type="application/json")
+            await view(request, action="unknown")
+            probes.append(time.perf_counter() - probe_started)
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+        report("ASGI", time.perf_counter() - started, logins, probes)
+
+    asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.conf import settings
+
+    from authentication.models import User
+
+    settings.PASSWORD_HASHING_WORKERS = args.threads
+    User.objects.create_user(phone_number=PHONE, password=PASSWORD, first_name="B")
+
+    print(f"{args.logins} concurrent logins, {args.threads} threads per worker")
+    run_wsgi(args.logins, args.threads)
+    run_asgi(args.logins)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Notification fan-out: per-row save() versus chunked bulk_create, with peak memory."""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks import setup, timer
+from benchmarks.user_search import populate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--naive-users", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+
+    from authentication.models import Notification, User
+    from authentication.notifications import fan_out_notification
+
+    started = time.perf_counter()
+    populate(args.users)
+    print(f"inserted {args.users:,} users in {time.perf_counter() - started:.1f}s")
+
+    ids = list(User.objects.values_list("pk", flat=True)[: args.naive_users])
+    with timer("save() per notification", len(ids)):
+        for user_id in ids:
+            Notification(
+                user_id=user_id, type="order_shipped", title="Naive", message="."
+            ).save()
+
+    for count in (args.users // 100, args.users):
+        users = User.objects.filter(pk__lte=count)
+        with timer(f"fan-out to {count:,} users", count):
+            fan_out_notification(
+                users, "order_shipped", "Timed", ".", chunk_size=args.chunk_size
+            )
+        # tracemalloc slows allocation down, so memory is measured separately.
+        tracemalloc.start()
+        fan_out_notification(
+            users, "order_shipped", "Traced", ".", chunk_size=args.chunk_size
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{'':<40} peak {peak / 2**20:>8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
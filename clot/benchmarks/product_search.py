@@ -0,0 +1,74 @@
+"""Product search: icontains over the catalog versus the BM25-ranked FTS5 index."""
+
+import argparse
+import random
+import time
+
+from benchmarks import setup, timer
+from benchmarks.facets import populate as populate_catalog
+
+
+ADJECTIVES = ["slim", "oversized", "classic", "linen", "wool", "cropped", "vintage"]
+NOUNS = ["jeans", "jacket", "shirt", "dress", "hoodie", "sneakers", "coat", "skirt"]
+WORDS = ["cotton", "stretch", "soft", "warm", "summer", "winter", "relaxed", "fit"]
+QUERIES = ["jacket", "vint", "slim jea", "wool coat", "summer"]
+
+
+def populate(count):
+    from django.db import connection, transaction
+
+    from products.models import Product
+
+    populate_catalog(count)
+    rng = random.Random(7)
+    sql = (
+        f"UPDATE {connection.ops.quote_name(Product._meta.db_table)} "
+        "SET title = %s, description = %s WHERE id = %s"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(1, count + 1, 10000):
+            cursor.executemany(
+                sql,
+                [
+                    (
+                        f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {pk}",
+                        " ".join(rng.choices(WORDS, k=12)),
+                        pk,
+                    )
+                    for pk in range(start, min(start + 10000, count + 1))
+                ],
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+
+    from products.search import BasicSearchBackend, get_search_backend
+    from products.search import search_products
+
+    started = time.perf_counter()
+    populate(args.products)
+    print(
+        f"inserted {args.products:,} products in {time.perf_counter() - started:.1f}s"
+    )
+    started = time.perf_counter()
+    get_search_backend().rebuild()
+    print(f"built search index in {time.perf_counter() - started:.1f}s")
+
+    basic = BasicSearchBackend()
+    for query in QUERIES:
+        with timer(f"icontains  {query!r}", args.repeat):
+            for _ in range(args.repeat):
+                basic.search(query, limit=20)
+        with timer(f"FTS5 bm25  {query!r}", args.repeat):
+            for _ in range(args.repeat):
+                search_products(query, limit=20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Carts competing for scarce stock from many threads: a read-check-write
+decrement versus reserve_stock's conditional UPDATE, one transaction per
+cart. Reserved carts are then committed or abandoned, and the sweep returns
+what abandoned carts held. "oversold" counts units handed out that the
+stock column does not account for: sold + remaining - initial.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import setup
+
+
+def make_carts(count, product_ids, abandon, seed=3):
+    rng = random.Random(seed)
+    carts = []
+    for _ in range(count):
+        picked = rng.sample(product_ids, rng.randint(1, 3))
+        cart = {pk: rng.randint(1, 2) for pk in picked}
+        carts.append((cart, rng.random() < abandon))
+    return carts
+
+
+def naive_checkout(cart, abandon):
+    """Returns the outcome and the units taken."""
+    from django.db import connection
+
+    from products.models import Product
+
+    taken = 0
+    try:
+        for pk, quantity in cart.items():
+            stock = Product.objects.values_list("stock", flat=True).get(pk=pk)
+            if stock < quantity:
+                return "short", taken
+            time.sleep(0)  # another request runs between the read and the write
+            Product.objects.filter(pk=pk).update(stock=stock - quantity)
+            taken += quantity
+        return "sold", taken
+    finally:
+        connection.close()
+
+
+def reserving_checkout(cart, abandon):
+    from django.db import OperationalError, connection
+    from django.utils import timezone
+
+    from products.inventory import InsufficientStock, commit_reservation
+    from products.inventory import reserve_stock
+    from products.models import StockReservation
+
+    try:
+        reservation = reserve_stock(cart)
+        if abandon:
+            # Left to expire; the sweep returns its stock.
+            StockReservation.objects.filter(pk=reservation.pk).update(
+                expires_at=timezone.now()
+            )
+            return "abandoned", 0
+        commit_reservation(reservation)
+        return "sold", sum(cart.values())
+    except InsufficientStock:
+        return "short", 0
+    except OperationalError:
+        return "locked", 0
+    finally:
+        connection.close()
+
+
+def run(label, checkout, carts, threads, initial, after=None):
+    from django.db.models import Min, Sum
+
+    from products.models import Product
+
+    Product.objects.update(stock=initial // Product.objects.count())
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda args: checkout(*args), carts))
+    elapsed = time.perf_counter() - started
+    if after:
+        after()
+    outcomes = Counter(outcome for outcome, _ in results)
+    sold = sum(taken for _, taken in results)
+    stock = Product.objects.aggregate(remaining=Sum("stock"), lowest=Min("stock"))
+    print(
+        f"{label:<18} {len(carts) / elapsed:>8,.0f} carts/s"
+        f"  sold {sold:>6,}  remaining {stock['remaining']:>6,}"
+        f"  oversold {sold + stock['remaining'] - initial:>6,}"
+        f"  lowest stock {stock['lowest']}  {dict(outcomes)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--carts", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--abandon", type=float, default=0.3)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(), "stock_reservation.sqlite3")
+    setup(database)
+    try:
+        benchmark(args)
+    finally:
+        os.remove(database)
+
+
+def benchmark(args):
+    from products.inventory import sweep_expired_reservations
+    from products.models import Product
+
+    from benchmarks.facets import populate
+
+    populate(args.products)
+    product_ids = list(Product.objects.values_list("pk", flat=True))
+    carts = make_carts(args.carts, product_ids, args.abandon)
+    initial = args.products * args.stock
+    demand = sum(sum(cart.values()) for cart, _ in carts)
+    print(
+        f"{args.carts:,} carts wanting {demand:,} units of {initial:,} in stock,"
+        f" {args.threads} threads"
+    )
+    run("read-check-write", naive_checkout, carts, args.threads, initial)
+    run(
+        "reserve_stock",
+        reserving_checkout,
+        carts,
+        args.threads,
+        initial,
+        after=sweep_expired_reservations,
+    )
+
+
+if __name__ == "__main__":
+    main()
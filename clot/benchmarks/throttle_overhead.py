@@ -0,0 +1,44 @@
+"""Per-request cost of the AuthView throttles against the configured cache."""
+
+import argparse
+
+from benchmarks import setup, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--phones", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.core.cache import cache
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from authentication.throttling import IPAddressThrottle, PhoneNumberThrottle
+
+    factory = APIRequestFactory()
+    request = factory.post("/", {}, format="json")
+    bodies = [{"phone_number": f"+998900{i:06d}"} for i in range(args.phones)]
+    throttles = (IPAddressThrottle(), PhoneNumberThrottle())
+    rates = {"login": {"phone": f"{args.requests}/h", "ip": f"{args.requests}/h"}}
+
+    with override_settings(AUTH_THROTTLE_RATES=rates):
+        cache.clear()
+        with timer("allowed, ip + phone throttles", args.requests):
+            for i in range(args.requests):
+                for throttle in throttles:
+                    throttle.allow_action("login", request, bodies[i % args.phones])
+
+    rates = {"login": {"phone": "1/h", "ip": "1/h"}}
+    with override_settings(AUTH_THROTTLE_RATES=rates):
+        with timer("rejected, ip + phone throttles", args.requests):
+            for i in range(args.requests):
+                for throttle in throttles:
+                    throttle.allow_action("login", request, bodies[i % args.phones])
+
+
+if __name__ == "__main__":
+    main()
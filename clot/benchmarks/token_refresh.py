@@ -0,0 +1,75 @@
+"""Refresh throughput with and without the in-process blacklist filter."""
+
+import argparse
+
+from benchmarks import setup, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.db import connection
+    from django.test import override_settings
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.token_blacklist.models import (
+        BlacklistedToken,
+        OutstandingToken,
+    )
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from authentication.blacklist import reset_blacklist_filter
+    from authentication.models import User
+    from authentication.views import TokenRefreshView
+
+    user = User.objects.create_user(
+        phone_number="+998900000000", password="benchmark", first_name="Bench"
+    )
+    template = RefreshToken.for_user(user)
+    OutstandingToken.objects.bulk_create(
+        OutstandingToken(
+            user=user,
+            jti=f"bench-{i}",
+            token="",
+            expires_at=template.current_time.replace(year=2100),
+        )
+        for i in range(args.tokens)
+    )
+    BlacklistedToken.objects.bulk_create(
+        BlacklistedToken(token=token)
+        for token in OutstandingToken.objects.filter(jti__startswith="bench-")[
+            : args.tokens // 2
+        ]
+    )
+    refresh_tokens = [str(RefreshToken.for_user(user)) for _ in range(100)]
+
+    factory = APIRequestFactory()
+    view = TokenRefreshView.as_view()
+
+    for enabled in (False, True):
+        with override_settings(BLACKLIST_FILTER={"ENABLED": enabled}):
+            reset_blacklist_filter()
+            # Warm up, which also builds the filter.
+            view(factory.post("/", {"refresh": refresh_tokens[0]}, format="json"))
+            label = "refresh, blacklist filter " + ("on" if enabled else "off")
+            with CaptureQueriesContext(connection) as queries, timer(
+                label, args.requests
+            ):
+                for i in range(args.requests):
+                    request = factory.post(
+                        "/",
+                        {"refresh": refresh_tokens[i % len(refresh_tokens)]},
+                        format="json",
+                    )
+                    response = view(request)
+                    assert response.status_code == 200, response.data
+            print(f"{'':<40} {len(queries) / args.requests:>12.2f} queries/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Staff user search: icontains scan versus the FTS5/phone-prefix indexes."""
+
+import argparse
+import random
+import time
+
+from benchmarks import setup, timer
+
+FIRST_NAMES = ["Aziz", "Bobur", "Dilnoza", "Jasur", "Kamola", "Malika", "Otabek"]
+LAST_NAMES = ["Karimov", "Rahimova", "Azimov", "Tursunova", "Yusupov", "Saidova"]
+QUERIES = ["dilno", "karimov", "malika saido", "+998 90 12", "9355"]
+
+
+def populate(count):
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from authentication.models import User
+
+    rng = random.Random(42)
+    now = timezone.now()
+    table = connection.ops.quote_name(User._meta.db_table)
+    columns = (
+        "password, phone_number, phone_national, first_name, last_name, "
+        "is_active, is_staff, is_superuser, date_joined, updated_at, age, gender, "
+        "profile_picture_variants"
+    )
+    sql = f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * 13)})"
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, count, 10000):
+            rows = []
+            for i in range(start, min(start + 10000, count)):
+                national = f"{rng.choice(['90', '91', '93', '94', '97'])}{i:07d}"
+                rows.append(
+                    (
+                        "!",
+                        f"+998{national}",
+                        national,
+                        f"{rng.choice(FIRST_NAMES)}{i % 97 or ''}",
+                        rng.choice(LAST_NAMES),
+                        True,
+                        False,
+                        False,
+                        now,
+                        now,
+                        rng.randint(16, 70),
+                        "male",
+                        "{}",
+                    )
+                )
+            cursor.executemany(sql, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.db.models import Q
+
+    from authentication.models import User
+    from authentication.search import rebuild_index, search_users
+
+    started = time.perf_counter()
+    populate(args.users)
+    print(f"inserted {args.users:,} users in {time.perf_counter() - started:.1f}s")
+    started = time.perf_counter()
+    rebuild_index()
+    print(f"built search index in {time.perf_counter() - started:.1f}s")
+
+    for query in QUERIES:
+        with timer(f"icontains  {query!r}", args.repeat):
+            for _ in range(args.repeat):
+                list(
+                    User.objects.filter(
+                        Q(phone_number__icontains=query)
+                        | Q(first_name__icontains=query)
+                        | Q(last_name__icontains=query)
+                    )[:10]
+                )
+        with timer(f"indexed    {query!r}", args.repeat):
+            for _ in range(args.repeat):
+                search_users(query, limit=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import csv
+import io
+import zlib
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import views
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+
+
+CHUNK_SIZE = 2000
+# Encoded rows are sent in pieces of about this many bytes, not row by row.
+BUFFER_SIZE = 64 * 1024
+# Separates the names in list columns of CSV exports, as import_catalog reads them.
+LIST_SEPARATOR = "|"
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Export:
+    """
+    A dataset for ``stream_export``. ``rows()`` yields one dict per record,
+    keyed by ``columns``, reading the table ``chunk_size`` rows at a time
+    so memory use does not grow with the table.
+    """
+
+    name = None
+    columns = ()
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or self.chunk_size
+
+    def rows(self):
+        raise NotImplementedError
+
+
+def _ndjson_lines(export):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for row in export.rows():
+        yield encoder.encode(row) + "\n"
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return LIST_SEPARATOR.join(str(item) for item in value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(export):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export.columns)
+    for row in export.rows():
+        writer.writerow([_csv_value(row[column]) for column in export.columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+ENCODERS = {"ndjson": _ndjson_lines, "csv": _csv_lines}
+
+
+def _buffered(lines):
+    pending, size = [], 0
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield "".join(pending).encode()
+            pending, size = [], 0
+    if pending:
+        yield "".join(pending).encode()
+
+
+def _gzipped(pieces, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for piece in pieces:
+        if compressed := compressor.compress(piece):
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(export, fmt="ndjson", gzip=False):
+    """
+    Yields ``export`` encoded as NDJSON or CSV, in pieces of about
+    ``BUFFER_SIZE`` bytes, gzip-compressed on the fly if asked.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    pieces = _buffered(ENCODERS[fmt](export))
+    return _gzipped(pieces) if gzip else pieces
+
+
+async def _pulled_through_thread(pieces):
+    # Under ASGI, StreamingHttpResponse would consume a sync iterator with
+    # sync_to_async(list), holding the whole export in memory. Each piece is
+    # pulled on its own instead, in the one thread the queries run in.
+    pull = sync_to_async(next)
+    while (piece := await pull(pieces, None)) is not None:
+        yield piece
+
+
+def export_filename(export, fmt, gzip=False):
+    return f"{export.name}.{fmt}" + (".gz" if gzip else "")
+
+
+def write_export(export, path, fmt="ndjson", gzip=False):
+    """Streams ``export`` into the file ``path``; returns the bytes written."""
+    written = 0
+    with open(path, "wb") as f:
+        for piece in stream_export(export, fmt, gzip):
+            f.write(piece)
+            written += len(piece)
+    return written
+
+
+class ExportView(views.APIView):
+    """
+    Streams ``export_class`` as a download; ``?output=ndjson|csv`` picks the
+    format and ``?gzip=1`` compresses it.
+    """
+
+    permission_classes = [IsAdminUser]
+    export_class = None
+
+    def perform_content_negotiation(self, request, force=False):
+        # The body is not rendered; only errors are, and always as JSON.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        fmt = request.query_params.get("output", "ndjson")
+        if fmt not in ENCODERS:
+            raise ValidationError({"output": f"Expected one of {sorted(ENCODERS)}."})
+        gzip = request.query_params.get("gzip") in ("1", "true")
+        export = self.export_class()
+        content = stream_export(export, fmt, gzip)
+        if isinstance(request._request, ASGIRequest):
+            content = _pulled_through_thread(content)
+        response = StreamingHttpResponse(
+            content,
+            content_type="application/gzip" if gzip else CONTENT_TYPES[fmt],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{export_filename(export, fmt, gzip)}"'
+        )
+        return response
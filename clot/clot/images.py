@@ -0,0 +1,115 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _config():
+    return getattr(settings, "IMAGE_PROCESSING", {})
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_config().get("WORKERS", 2),
+                    thread_name_prefix="image-processing",
+                )
+    return _executor
+
+
+def _run_job(func, *args):
+    # Nobody waits on the future, so an exception left in it would be lost.
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background image job %s failed", func.__qualname__)
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args):
+    """
+    Runs ``func`` in the image worker pool once the current transaction
+    commits, or inline when ``IMAGE_PROCESSING['EAGER']`` is set (tests).
+    """
+    if _config().get("EAGER"):
+        transaction.on_commit(lambda: func(*args))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run_job, func, *args))
+
+
+def open_image(storage, name):
+    """Opens an upload with EXIF orientation applied, as RGB."""
+    with storage.open(name, "rb") as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    return image
+
+
+def encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    if pil_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    # Nothing from the source's info (EXIF, GPS, ICC) is passed on.
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def variant_name(name, label, fmt):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    extension = "jpg" if fmt == "jpeg" else fmt
+    return os.path.join(directory, "variants", f"{stem}_{label}.{extension}")
+
+
+def save_file(storage, name, content):
+    return storage.save(name, ContentFile(content))
+
+
+def cap_original(storage, name, image, max_side):
+    """
+    Re-encodes the original without metadata, downscaled so neither side
+    exceeds ``max_side``. Returns the new file and image; the old file is
+    left for the caller to release, as other rows may share it.
+    """
+    image = image.copy()
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    fmt = "webp" if name.lower().endswith(".webp") else "jpeg"
+    if fmt == "jpeg" and not name.lower().endswith((".jpg", ".jpeg")):
+        name = os.path.splitext(name)[0] + ".jpg"
+    return save_file(storage, name, encode(image, fmt)), image
+
+
+def make_variant(image, width, height=None):
+    """Scales ``image`` to ``width`` (square-cropped when ``height`` is given)."""
+    if height:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    if image.width <= width:
+        return image
+    return image.resize(
+        (width, round(image.height * width / image.width)), Image.LANCZOS
+    )
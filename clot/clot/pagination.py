@@ -0,0 +1,212 @@
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on ``(ordering field, id)`` instead of using
+    OFFSET, so every page costs the same regardless of depth.
+
+    Only orderings listed in ``ordering_fields`` are accepted; each should be
+    backed by an index on ``(field, id)``. Totals are computed only when the
+    client asks for them (``?include_total=1``) and are cached for
+    ``total_cache_timeout`` seconds.
+    """
+
+    page_size = 10
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    ordering_fields = ("created_at",)
+    default_ordering = "-created_at"
+    total_cache_timeout = 60
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(
+            self.ordering_query_param, self.default_ordering
+        )
+        if ordering.lstrip("-") not in self.ordering_fields:
+            raise ValidationError(
+                {
+                    self.ordering_query_param: (
+                        f"Invalid ordering. Choose from: "
+                        f"{', '.join(self.ordering_fields)}"
+                    )
+                }
+            )
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(
+                request.query_params.get(self.page_size_query_param, self.page_size)
+            )
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            data = None
+        if not isinstance(data, dict) or not {"o", "v", "id"} <= data.keys():
+            raise ValidationError({self.cursor_query_param: "Invalid cursor."})
+        return data
+
+    def _seek(self, queryset, field, descending, value, pk):
+        model_field = queryset.model._meta.get_field(field)
+        try:
+            value = model_field.to_python(value)
+        except Exception:
+            raise ValidationError({self.cursor_query_param: "Invalid cursor."})
+        if descending:
+            return queryset.filter(
+                Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk})
+            )
+        return queryset.filter(
+            Q(**{f"{field}__gt": value}) | Q(**{field: value, "pk__gt": pk})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(request)
+        self.field = self.ordering.lstrip("-")
+        self.page_size_value = self.get_page_size(request)
+        descending = self.ordering.startswith("-")
+        self.base_queryset = queryset
+
+        cursor = self.decode_cursor(request)
+        backwards = bool(cursor and cursor.get("r"))
+        if cursor and cursor.get("o") != self.ordering:
+            raise ValidationError(
+                {self.cursor_query_param: "Cursor does not match ordering."}
+            )
+
+        # Walking backwards means seeking in the opposite direction and then
+        # flipping the page back into display order.
+        seek_descending = descending != backwards
+        prefix = "-" if seek_descending else ""
+        queryset = queryset.order_by(f"{prefix}{self.field}", f"{prefix}pk")
+        if cursor:
+            queryset = self._seek(
+                queryset, self.field, seek_descending, cursor["v"], cursor["id"]
+            )
+
+        rows = list(queryset[: self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[: self.page_size_value]
+        if backwards:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not backwards else bool(cursor)
+        self.has_previous = bool(cursor) if not backwards else has_more
+        return rows
+
+    def _cursor_for(self, obj, reverse):
+        value = getattr(obj, self.field)
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        elif value is not None and not isinstance(value, (int, float, bool)):
+            value = str(value)
+        return self.encode_cursor(
+            {"o": self.ordering, "v": value, "id": obj.pk, "r": reverse}
+        )
+
+    def _link(self, cursor):
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = cursor
+        return (
+            f"{self.request.build_absolute_uri(self.request.path)}?{params.urlencode()}"
+        )
+
+    def get_next_link(self):
+        if not self.page or not self.has_next:
+            return None
+        return self._link(self._cursor_for(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not self.page or not self.has_previous:
+            return None
+        return self._link(self._cursor_for(self.page[0], reverse=True))
+
+    def get_total(self):
+        query = str(self.base_queryset.order_by().query)
+        key = f"pagination:total:{hashlib.md5(query.encode()).hexdigest()}"
+        total = cache.get(key)
+        if total is None:
+            total = self.base_queryset.order_by().count()
+            cache.set(key, total, self.total_cache_timeout)
+        return total
+
+    def get_paginated_response(self, data):
+        response = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "page_size": self.page_size_value,
+            "results": data,
+        }
+        if self.request.query_params.get("include_total"):
+            response["total"] = self.get_total()
+        return Response(response)
+
+
+class RankedPagination(KeysetPagination):
+    """
+    Cursor pagination over a list already in order, such as ranked search
+    results, which have no column to seek on: the cursor holds the offset
+    into the list. Searches return a bounded number of candidates, so the
+    list is small and every page is cheap.
+    """
+
+    def decode_offset(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return 0
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            data = None
+        offset = data.get("offset") if isinstance(data, dict) else None
+        if not isinstance(offset, int) or offset < 0:
+            raise ValidationError({self.cursor_query_param: "Invalid cursor."})
+        return offset
+
+    def paginate_list(self, items, request):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.offset = self.decode_offset(request)
+        self.total = len(items)
+        self.page = items[self.offset : self.offset + self.page_size_value]
+        return self.page
+
+    def get_next_link(self):
+        end = self.offset + self.page_size_value
+        if end >= self.total:
+            return None
+        return self._link(self.encode_cursor({"offset": end}))
+
+    def get_previous_link(self):
+        if not self.offset:
+            return None
+        start = max(0, self.offset - self.page_size_value)
+        return self._link(self.encode_cursor({"offset": start}))
+
+    def get_total(self):
+        return self.total
@@ -0,0 +1,315 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionOverflow(Exception):
+    """The subscriber fell ``queue_size`` messages behind and was cut off."""
+
+
+class BaseBackplane:
+    """
+    Carries published messages to the ``Hub`` of every worker process.
+    ``deliver(channel, envelope)`` is set by the hub and may be called from
+    any thread.
+    """
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, channel, envelope):
+        raise NotImplementedError
+
+    def publish_many(self, items):
+        for channel, envelope in items:
+            self.publish(channel, envelope)
+
+    def stop(self):
+        pass
+
+
+class LocalBackplane(BaseBackplane):
+    """Delivers within this process only; for tests and single-worker setups."""
+
+    def publish(self, channel, envelope):
+        self.deliver(channel, envelope)
+
+
+class RedisBackplane(BaseBackplane):
+    """
+    Redis pub/sub, so a message published by any worker reaches them all.
+    A lost subscription is renewed after ``reconnect_delay`` seconds,
+    doubling up to ``max_reconnect_delay`` while Redis stays unreachable.
+    """
+
+    def __init__(self, url, prefix="push:", reconnect_delay=1, max_reconnect_delay=30):
+        self.url = url
+        self.prefix = prefix
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._pubsub = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self, deliver):
+        import redis
+
+        super().start(deliver)
+        self.client = redis.Redis.from_url(self.url)
+        self._stopped.clear()
+        self._subscribe()
+        self._thread = threading.Thread(
+            target=self._listen, name="push-backplane", daemon=True
+        )
+        self._thread.start()
+
+    def _subscribe(self):
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(f"{self.prefix}*")
+
+    def _listen(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            try:
+                if self._pubsub is None:
+                    self._subscribe()
+                for message in self._pubsub.listen():
+                    delay = self.reconnect_delay
+                    self._receive(message)
+            except Exception:
+                if self._stopped.is_set():
+                    # Raised by close() in stop(); nothing to deliver after that.
+                    return
+                logger.exception(
+                    "Push backplane lost its Redis subscription; retrying in %ss",
+                    delay,
+                )
+            self._discard_subscription()
+            if self._stopped.wait(delay):
+                return
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _receive(self, message):
+        # One bad message must not end the subscription for everyone else.
+        try:
+            channel = message["channel"].decode()[len(self.prefix) :]
+            self.deliver(channel, json.loads(message["data"]))
+        except Exception:
+            logger.exception("Dropped push message %r", message)
+
+    def _discard_subscription(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+    def publish(self, channel, envelope):
+        self.client.publish(f"{self.prefix}{channel}", json.dumps(envelope))
+
+    def publish_many(self, items):
+        pipeline = self.client.pipeline(transaction=False)
+        for channel, envelope in items:
+            pipeline.publish(f"{self.prefix}{channel}", json.dumps(envelope))
+        pipeline.execute()
+
+    def stop(self):
+        self._stopped.set()
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+class LatencyStats:
+    """Publish-to-delivery latency over the last ``size`` messages."""
+
+    def __init__(self, size=1000):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def snapshot(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0}
+
+        def percentile(p):
+            return round(
+                samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 3
+            )
+
+        return {
+            "count": self.count,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Subscription:
+    """
+    One subscriber's bounded queue, bound to the event loop that created it.
+    Use as a context manager, or call ``close()``.
+    """
+
+    def __init__(self, hub, channel, queue_size):
+        self.hub = hub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def _put(self, envelope):
+        # Runs on self.loop. After one drop nothing more is queued, so the
+        # client can resume from the last message it did get.
+        if self.overflowed or self.queue.full():
+            self.overflowed = True
+            self.hub.stats["dropped"] += 1
+            return
+        self.queue.put_nowait(envelope)
+
+    async def get(self, timeout=None):
+        """
+        Returns the next message's data. Raises ``asyncio.TimeoutError`` after
+        ``timeout`` seconds, or ``SubscriptionOverflow`` once messages were
+        dropped and the queue has drained.
+        """
+        if self.overflowed and self.queue.empty():
+            raise SubscriptionOverflow(self.channel)
+        envelope = await asyncio.wait_for(self.queue.get(), timeout)
+        self.hub.stats["delivered"] += 1
+        self.hub.latency.record(time.time() - envelope["ts"])
+        return envelope["data"]
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Hub:
+    """
+    In-process pub/sub for server push. Publishing goes through the
+    backplane; whatever the backplane delivers is handed to this process's
+    subscribers of the channel without blocking the publisher.
+    """
+
+    def __init__(self, backplane, queue_size=100):
+        self.backplane = backplane
+        self.queue_size = queue_size
+        self.latency = LatencyStats()
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0}
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        backplane.start(self.deliver)
+
+    def subscribe(self, channel):
+        """Subscribes to ``channel``; must be called from a running event loop."""
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    @staticmethod
+    def _envelope(data):
+        return {"data": data, "ts": time.time()}
+
+    def publish(self, channel, data):
+        self.stats["published"] += 1
+        self.backplane.publish(channel, self._envelope(data))
+
+    def publish_many(self, items):
+        """Publishes ``(channel, data)`` pairs in one backplane round trip."""
+        envelopes = [(channel, self._envelope(data)) for channel, data in items]
+        self.stats["published"] += len(envelopes)
+        if envelopes:
+            self.backplane.publish_many(envelopes)
+
+    def deliver(self, channel, envelope):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, envelope)
+            except RuntimeError:
+                # The subscriber's loop has closed.
+                self.unsubscribe(subscription)
+
+    def snapshot(self):
+        with self._lock:
+            connections = sum(len(s) for s in self._subscribers.values())
+            channels = len(self._subscribers)
+        return {
+            "connections": connections,
+            "channels": channels,
+            **self.stats,
+            "latency": self.latency.snapshot(),
+        }
+
+    def close(self):
+        self.backplane.stop()
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def build_hub(config=None):
+    config = dict(config or getattr(settings, "PUSH", {}))
+    backplane_class = import_string(
+        config.get("BACKPLANE", "clot.pubsub.LocalBackplane")
+    )
+    backplane = backplane_class(
+        **{key.lower(): value for key, value in config.get("OPTIONS", {}).items()}
+    )
+    return Hub(backplane, queue_size=config.get("QUEUE_SIZE", 100))
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = build_hub()
+    return _hub
+
+
+def reset_hub():
+    global _hub
+    with _hub_lock:
+        if _hub is not None:
+            _hub.close()
+        _hub = None
+
+
+@receiver(setting_changed)
+def _reset_hub_on_setting_change(setting, **kwargs):
+    if setting == "PUSH":
+        reset_hub()
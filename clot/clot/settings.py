@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     "authentication",
     "products",
     "payments",
+    "media",
 ]
 
 MIDDLEWARE = [
@@ -65,6 +66,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "clot.wsgi.application"
 
+# Serve AuthView through its async counterpart; clot/asgi.py turns this on.
+ASYNC_AUTH_VIEWS = os.getenv("ASYNC_AUTH_VIEWS", "").lower() in ("1", "true", "yes")
+
+# Threads per worker process used by async views for password hashing.
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", 4))
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -75,12 +82,41 @@ DATABASES = {
     }
 }
 
+# A shared cache is required for cache-backed features once more than one
+# worker process serves requests; set REDIS_URL in production.
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.authentication.CachedJWTAuthentication",
     ),
+    # Reverse proxies in front of the app. Per-IP throttles read the client
+    # address from X-Forwarded-For only that many hops deep; with 0 they use
+    # REMOTE_ADDR, as a client can send any X-Forwarded-For it likes.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)),
+}
+
+# Users resolved from JWTs are cached for TTL seconds. Invalidation on save is
+# only seen by every worker when CACHES points at a shared backend.
+USER_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TTL": 60,
 }
 
 SIMPLE_JWT = {
@@ -92,6 +128,55 @@ SIMPLE_JWT = {
     "UPDATE_LAST_LOGIN": False,
 }
 
+OTP_STORE = {
+    "BACKEND": (
+        "authentication.otp.CacheOTPStore"
+        if REDIS_URL
+        else "authentication.otp.DatabaseOTPStore"
+    ),
+    "TTL": 300,  # seconds
+    "MAX_ATTEMPTS": 5,
+}
+
+SMS_DISPATCHER = {
+    "TRANSPORT": os.getenv("SMS_TRANSPORT", "authentication.sms.InfobipTransport"),
+    "OPTIONS": {
+        "HOST": os.getenv("SMS_HOST", "e144zn.api.infobip.com"),
+        "API_KEY": os.getenv(
+            "SMS_API_KEY",
+            "b3e7007650143d8e54f017036763bc62-c0e39705-f634-4448-acbb-19d8626fe829",
+        ),
+        "SENDER": os.getenv("SMS_SENDER", "447491163443"),
+    },
+    "BATCH_SIZE": 50,
+    "LINGER": 0.05,  # seconds to wait for more messages before sending a batch
+    "MAX_RETRIES": 3,
+    "BACKOFF_BASE": 0.5,
+    "FAILURE_THRESHOLD": 5,  # consecutive failures before the circuit opens
+    "RESET_TIMEOUT": 30,
+    "MESSAGE_TTL": 300,  # matches the OTP validity window
+}
+
+# Sliding-window limits for AuthView actions, per phone number and per client
+# IP. Counters live in the default cache, so they need a shared backend to
+# hold across workers.
+AUTH_THROTTLE_RATES = {
+    "register": {"phone": "3/10m", "ip": "20/h"},
+    "forgot_password": {"phone": "3/10m", "ip": "20/h"},
+    "verify_otp": {"phone": "10/10m", "ip": "60/h"},
+    "reset_password": {"phone": "10/10m", "ip": "60/h"},
+    "login": {"phone": "10/10m", "ip": "100/h"},
+}
+
+# Per-process Bloom filter in front of the token blacklist tables.
+BLACKLIST_FILTER = {
+    "ENABLED": True,
+    "CAPACITY": 100000,
+    "ERROR_RATE": 0.001,
+    "SYNC_INTERVAL": 5,  # max seconds before other workers' blacklistings apply
+    "REBUILD_INTERVAL": 3600,
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -129,6 +214,80 @@ STATIC_URL = "static/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "mediafiles/")
 MEDIA_URL = os.path.join(BASE_DIR, "media/")
 
+# Server push (notifications/stream/). Each worker fans messages out to its own
+# connections; the backplane carries them between workers.
+PUSH = {
+    "BACKPLANE": (
+        "clot.pubsub.RedisBackplane" if REDIS_URL else "clot.pubsub.LocalBackplane"
+    ),
+    "OPTIONS": {"URL": REDIS_URL} if REDIS_URL else {},
+    "QUEUE_SIZE": 100,  # messages a slow client may fall behind before cut-off
+    "HEARTBEAT": 15,  # seconds
+    "REPLAY_LIMIT": 100,
+}
+
+# In-memory facet counts for the catalog, see products/facets.py.
+PRODUCT_FACETS = {
+    "PRICE_STEP": 50,  # width of the price facet's buckets
+    "SYNC_INTERVAL": 5,  # seconds
+    "REBUILD_THRESHOLD": 5000,
+}
+
+# Catalog responses cached until any product, category, color, size or
+# image changes, plus ETag/Last-Modified validators, see products/caching.py.
+# The catalog version lives in the cache, so every worker must share it: with
+# a per-process cache, a change would only be seen by the worker that made it.
+CATALOG_CACHE = {
+    "ENABLED": bool(REDIS_URL),
+    "CACHE_ALIAS": "default",
+    "TTL": 300,  # seconds
+}
+
+# Per-user cache of wishlisted product ids, dropped on every wishlist change.
+WISHLIST = {
+    "CACHE_ALIAS": "default",
+    "TTL": 3600,
+}
+
+# Stock held for carts is taken off Product.stock at once and returned when
+# the reservation is released or expires, see products/inventory.py. Run
+# sweep_reservations periodically to return the stock of abandoned carts.
+INVENTORY = {
+    "RESERVATION_TTL": 15 * 60,  # seconds
+}
+
+# Product search backend, see products/search.py. Unset, it is the
+# database's own full-text search: FTS5 on SQLite, tsvector on PostgreSQL.
+PRODUCT_SEARCH = {
+    "BACKEND": os.getenv("PRODUCT_SEARCH_BACKEND"),
+}
+
+# Image uploads are stored once per distinct content, see media/storage.py.
+# Files unreferenced for GC_GRACE_PERIOD seconds are removed by gc_media.
+MEDIA_STORAGE = {
+    "GC_GRACE_PERIOD": 24 * 60 * 60,
+}
+
+# Uploaded images are post-processed in a thread pool after the upload commits.
+IMAGE_PROCESSING = {
+    "WORKERS": int(os.getenv("IMAGE_PROCESSING_WORKERS", 2)),
+    "EAGER": False,
+}
+
+# Width variants of product images, rendered on first request and kept on
+# disk, see products/variants.py.
+PRODUCT_IMAGES = {
+    "WIDTHS": (160, 320, 640, 1280),
+    "FORMAT": "webp",
+    "TIMEOUT": 10,  # seconds a request waits for a render before falling back
+}
+
+PROFILE_PICTURE = {
+    "MAX_SIDE": 2048,
+    "SIZES": {"thumb": 64, "small": 128, "medium": 256},
+    "FORMATS": ("webp", "jpeg"),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,178 @@
+import re
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+from slugify import slugify
+
+
+SAVE_ATTEMPTS = 5
+
+
+def _base_slug(model, value, slug_field_name):
+    max_length = model._meta.get_field(slug_field_name).max_length or 160
+    # Leave room for a "-<n>" suffix so allocated slugs always fit the column.
+    return slugify(str(value))[: max_length - 8].strip("-")
+
+
+def _reserved(model):
+    return set(getattr(model, "reserved_slugs", ()))
+
+
+def _next_suffix(model, base_slug, slug_field_name):
+    """
+    Returns 0 when ``base_slug`` itself is free, otherwise one more than the
+    highest numeric suffix in use, found with a single query. A reserved
+    ``base_slug`` is never free.
+    """
+    pattern = rf"^{re.escape(base_slug)}-[0-9]+$"
+    taken = (
+        model._default_manager.filter(
+            Q(**{slug_field_name: base_slug})
+            | Q(
+                **{
+                    f"{slug_field_name}__startswith": f"{base_slug}-",
+                    f"{slug_field_name}__regex": pattern,
+                }
+            )
+        )
+        .annotate(_slug_length=Length(slug_field_name))
+        .order_by("-_slug_length", f"-{slug_field_name}")
+        .values_list(slug_field_name, flat=True)
+        .first()
+    )
+    if taken is None:
+        return 1 if base_slug in _reserved(model) else 0
+    if taken == base_slug:
+        return 1
+    return int(taken.rsplit("-", 1)[1]) + 1
+
+
+def _with_suffix(base_slug, suffix):
+    return base_slug if suffix == 0 else f"{base_slug}-{suffix}"
+
+
+def allocate_slug(model, value, slug_field_name="slug"):
+    base_slug = _base_slug(model, value, slug_field_name)
+    return _with_suffix(base_slug, _next_suffix(model, base_slug, slug_field_name))
+
+
+def allocate_slugs(model, values, slug_field_name="slug"):
+    """
+    Allocates slugs for a bulk insert, with repeated values in ``values``
+    getting consecutive suffixes. One query finds which base slugs are in
+    use; only those, and bases repeated in ``values``, need another query
+    each for their next suffix.
+    """
+    bases = [_base_slug(model, value, slug_field_name) for value in values]
+    repeated = {base for base, count in Counter(bases).items() if count > 1}
+    taken = set(
+        model._default_manager.filter(
+            **{f"{slug_field_name}__in": set(bases)}
+        ).values_list(slug_field_name, flat=True)
+    ) | (_reserved(model) & set(bases))
+    next_suffix = {}
+    slugs = []
+    for base_slug in bases:
+        if base_slug not in next_suffix:
+            next_suffix[base_slug] = (
+                _next_suffix(model, base_slug, slug_field_name)
+                if base_slug in taken or base_slug in repeated
+                else 0
+            )
+        slug = _with_suffix(base_slug, next_suffix[base_slug])
+        # "Shirt 1" and a second "Shirt" would both be "shirt-1".
+        while slug in taken:
+            next_suffix[base_slug] += 1
+            slug = _with_suffix(base_slug, next_suffix[base_slug])
+        taken.add(slug)
+        slugs.append(slug)
+        next_suffix[base_slug] += 1
+    return slugs
+
+
+class SlugSequence:
+    """
+    Hands out ``<base>``, ``<base>-1``, ``<base>-2``... for many rows built
+    from the same slug source. The database is asked for the highest suffix
+    in use only on creation and after ``refresh()``, e.g. when a concurrent
+    insert took one of the reserved slugs.
+    """
+
+    def __init__(self, model, value, slug_field_name="slug"):
+        self.model = model
+        self.slug_field_name = slug_field_name
+        self.base_slug = _base_slug(model, value, slug_field_name)
+        self.refresh()
+
+    def refresh(self):
+        self.next_suffix = _next_suffix(
+            self.model, self.base_slug, self.slug_field_name
+        )
+
+    def take(self, count):
+        start = self.next_suffix
+        self.next_suffix += count
+        return [
+            _with_suffix(self.base_slug, suffix)
+            for suffix in range(start, start + count)
+        ]
+
+
+def bulk_create_with_slugs(model, objs, get_value, slug_field_name="slug", **kwargs):
+    """
+    ``bulk_create`` for slugged models. Slugs are allocated in batch mode and
+    re-allocated if a concurrent insert took one of them first.
+    """
+    objs = list(objs)
+    for attempt in range(SAVE_ATTEMPTS):
+        pending = [obj for obj in objs if not getattr(obj, slug_field_name)]
+        values = [get_value(obj) for obj in pending]
+        for obj, slug in zip(pending, allocate_slugs(model, values, slug_field_name)):
+            setattr(obj, slug_field_name, slug)
+        try:
+            with transaction.atomic():
+                return model._default_manager.bulk_create(objs, **kwargs)
+        except IntegrityError:
+            if attempt == SAVE_ATTEMPTS - 1:
+                raise
+            for obj in pending:
+                setattr(obj, slug_field_name, None)
+
+
+class UniqueSlugMixin:
+    """
+    Fills ``slug`` from ``get_slug_source()`` on first save, never with one
+    of ``reserved_slugs``, e.g. names of routes the slugs share a URL with.
+
+    Two concurrent inserts can be handed the same slug; the loser hits the
+    unique constraint and retries with a freshly allocated one.
+    """
+
+    slug_field_name = "slug"
+    reserved_slugs = ()
+
+    def get_slug_source(self):
+        raise NotImplementedError
+
+    def save(self, *args, **kwargs):
+        if getattr(self, self.slug_field_name):
+            return super().save(*args, **kwargs)
+
+        model = self.__class__
+        for attempt in range(SAVE_ATTEMPTS):
+            slug = allocate_slug(model, self.get_slug_source(), self.slug_field_name)
+            setattr(self, self.slug_field_name, slug)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                setattr(self, self.slug_field_name, None)
+                slug_taken = (
+                    model._default_manager.filter(**{self.slug_field_name: slug})
+                    .exclude(pk=self.pk)
+                    .exists()
+                )
+                if not slug_taken or attempt == SAVE_ATTEMPTS - 1:
+                    raise
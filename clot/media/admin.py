@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import StoredFile
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "references", "created_at", "updated_at")
+    search_fields = ("name",)
+    readonly_fields = ("name", "size", "references", "created_at", "updated_at")
@@ -0,0 +1,79 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import StoredFile
+from .storage import TEMP_PREFIX, content_addressed_storage
+
+
+def grace_period():
+    return getattr(settings, "MEDIA_STORAGE", {}).get("GC_GRACE_PERIOD", 86400)
+
+
+def collect_garbage(grace=None, storage=None, dry_run=False, batch_size=500):
+    """
+    Deletes files nobody has referenced for ``grace`` seconds, plus temporary
+    files left by interrupted uploads. Returns ``(files, bytes)`` removed.
+
+    The grace period covers uploads that are stored before the row pointing
+    at them is saved, and content that was just uploaded again.
+    """
+    grace = grace_period() if grace is None else grace
+    storage = storage or content_addressed_storage
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    removed = freed = 0
+
+    candidates = StoredFile.objects.filter(
+        references__lte=0, updated_at__lt=cutoff
+    ).order_by("pk")
+    last_pk = 0
+    while True:
+        batch = list(
+            candidates.filter(pk__gt=last_pk).values_list("pk", "name", "size")[
+                :batch_size
+            ]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        for pk, name, size in batch:
+            # Content uploaded again refreshes the file's mtime.
+            if _recently_written(storage, name, grace):
+                continue
+            if not dry_run:
+                # Re-checked in the DELETE so a concurrent retain() wins.
+                deleted, _ = StoredFile.objects.filter(
+                    pk=pk, references__lte=0, updated_at__lt=cutoff
+                ).delete()
+                if not deleted:
+                    continue
+                storage.delete(name)
+            removed, freed = removed + 1, freed + size
+
+    for path in _stale_temp_files(storage, grace):
+        removed, freed = removed + 1, freed + os.path.getsize(path)
+        if not dry_run:
+            os.remove(path)
+    return removed, freed
+
+
+def _recently_written(storage, name, seconds):
+    try:
+        return time.time() - os.path.getmtime(storage.path(name)) <= seconds
+    except FileNotFoundError:
+        return False
+
+
+def _stale_temp_files(storage, seconds):
+    if not os.path.isdir(storage.location):
+        return
+    for directory, _, filenames in os.walk(storage.location):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename.startswith(TEMP_PREFIX) and (
+                time.time() - os.path.getmtime(path) > seconds
+            ):
+                yield path
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from media.gc import collect_garbage
+from media.references import rebuild_references
+
+
+class Command(BaseCommand):
+    help = "Delete media files that are no longer referenced by any model"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=None,
+            help="Seconds a file must have been unreferenced before deletion",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recount references from the database before collecting",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            changed = rebuild_references()
+            self.stdout.write(f"Corrected {changed} reference counts")
+
+        removed, freed = collect_garbage(
+            grace=options["grace"], dry_run=options["dry_run"]
+        )
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} files ({freed} bytes)"))
@@ -0,0 +1,25 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """
+    One physical file in media storage and the number of model fields that
+    point at it. Files whose count drops to zero are removed by ``gc_media``.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    references = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
+
+    class Meta:
+        verbose_name = "stored file"
+        verbose_name_plural = "stored files"
+        db_table = "stored_file"
+        indexes = [
+            models.Index(fields=["references", "updated_at"], name="stored_file_gc_idx")
+        ]
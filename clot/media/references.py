@@ -0,0 +1,158 @@
+from collections import Counter
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.utils import timezone
+
+from .models import StoredFile
+
+
+# model -> {field attname: function(value) -> set of file names}
+_tracked = {}
+
+
+def file_name(value):
+    name = getattr(value, "name", value)
+    return {name} if name else set()
+
+
+def register(name, size=0):
+    """Records a freshly stored file; it is unreferenced until retained."""
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name, size=size)], ignore_conflicts=True
+    )
+
+
+def retain(names):
+    """Adds one reference to each file in ``names``."""
+    _adjust(names, 1)
+
+
+def release(names):
+    """Drops one reference from each file in ``names``."""
+    _adjust(names, -1)
+
+
+def _adjust(names, delta):
+    names = {name for name in names if name}
+    if not names:
+        return
+    if delta > 0:
+        # Files stored before tracking existed have no row yet.
+        StoredFile.objects.bulk_create(
+            [StoredFile(name=name) for name in names], ignore_conflicts=True
+        )
+    StoredFile.objects.filter(name__in=names).update(
+        references=F("references") + delta, updated_at=timezone.now()
+    )
+
+
+def _names(instance, fields):
+    extractors = _tracked[type(instance)]
+    names = set()
+    for attname in fields:
+        names |= extractors[attname](instance.__dict__.get(attname))
+    return names
+
+
+def _loaded(instance):
+    return [name for name in _tracked[type(instance)] if name in instance.__dict__]
+
+
+def _snapshot(sender, instance, **kwargs):
+    instance._tracked_files = {
+        attname: _names(instance, [attname]) for attname in _loaded(instance)
+    }
+
+
+def _fetch_missing(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Deferred when the instance was loaded but assigned since; the old value
+    # is read before it is overwritten.
+    snapshot = getattr(instance, "_tracked_files", {})
+    missing = [name for name in _loaded(instance) if name not in snapshot]
+    if raw or not missing or instance._state.adding:
+        return
+    row = sender._base_manager.filter(pk=instance.pk).values(*missing).first() or {}
+    for attname in missing:
+        snapshot[attname] = _tracked[sender][attname](row.get(attname))
+    instance._tracked_files = snapshot
+
+
+def _update_references(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    snapshot = getattr(instance, "_tracked_files", {})
+    old, new = set(), set()
+    for attname in _loaded(instance):
+        if update_fields is not None and attname not in update_fields:
+            continue
+        current = _names(instance, [attname])
+        old |= snapshot.get(attname, set())
+        new |= current
+        snapshot[attname] = current
+    instance._tracked_files = snapshot
+    retain(new - old)
+    release(old - new)
+
+
+def _release_all(sender, instance, **kwargs):
+    release(_names(instance, _loaded(instance)))
+
+
+def track_files(model, **extractors):
+    """
+    Keeps ``StoredFile.references`` in step with the file names held by
+    ``model``. Each keyword maps a field attname to a function returning the
+    set of names in that field's value; use ``file_name`` for file fields.
+
+    ``QuerySet.update()`` bypasses signals; callers that change tracked
+    fields that way must call ``retain``/``release`` themselves.
+    """
+    _tracked[model] = extractors
+    uid = f"media.track_files:{model._meta.label}"
+    post_init.connect(_snapshot, sender=model, dispatch_uid=uid)
+    pre_save.connect(_fetch_missing, sender=model, dispatch_uid=uid)
+    post_save.connect(_update_references, sender=model, dispatch_uid=uid)
+    post_delete.connect(_release_all, sender=model, dispatch_uid=uid)
+
+
+def count_references():
+    """Counts references to every file by scanning the tracked models."""
+    counts = Counter()
+    for model, extractors in _tracked.items():
+        fields = list(extractors)
+        rows = model._base_manager.order_by().values_list(*fields)
+        for row in rows.iterator(chunk_size=2000):
+            names = set()
+            for attname, value in zip(fields, row):
+                names |= extractors[attname](value)
+            counts.update(names)
+    return counts
+
+
+def rebuild_references(batch_size=1000):
+    """
+    Recomputes ``StoredFile.references`` from the tracked models. Returns the
+    number of rows whose count changed. Meant for repairing drift, not for
+    running alongside uploads.
+    """
+    counts = count_references()
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name) for name in counts],
+        ignore_conflicts=True,
+        batch_size=batch_size,
+    )
+    changed = []
+    for stored in (
+        StoredFile.objects.order_by()
+        .only("pk", "name", "references")
+        .iterator(chunk_size=batch_size)
+    ):
+        if stored.references != counts.get(stored.name, 0):
+            stored.references = counts.get(stored.name, 0)
+            stored.updated_at = timezone.now()
+            changed.append(stored)
+    StoredFile.objects.bulk_update(
+        changed, ["references", "updated_at"], batch_size=batch_size
+    )
+    return len(changed)
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+TEMP_PREFIX = ".upload-"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names every file by the SHA-256 of its content.
+
+    ``profile_pictures/2024/01/01/me.jpg`` is stored as
+    ``profile_pictures/<h[:2]>/<h>.jpg``: the first path component of the
+    requested name is kept so uploads of different models stay apart. The
+    digest is computed while the upload is streamed to a temporary file, so
+    content is read once, and identical uploads end up as a single file.
+
+    Saved names are registered in ``StoredFile``; files are never removed
+    here, see ``media.references`` and the ``gc_media`` command.
+    """
+
+    content_addressed = True
+
+    def get_available_name(self, name, max_length=None):
+        # Equal names mean equal content, so there is nothing to avoid.
+        return name
+
+    @staticmethod
+    def _prefix(name):
+        name = name.replace("\\", "/")
+        return name.split("/", 1)[0] if "/" in name else ""
+
+    def hashed_name(self, name, digest):
+        prefix = self._prefix(name)
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r"\.[a-z0-9]{1,5}", extension):
+            extension = ""
+        return posixpath.join(prefix, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        prefix = self._prefix(name)
+        directory = self.path(prefix) if prefix else self.location
+        os.makedirs(directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+
+            name = self.hashed_name(name, digest.hexdigest())
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                # Refresh the mtime so gc_media's grace period covers the reuse.
+                os.utime(full_path)
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        from .references import register
+
+        register(name, size)
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
@@ -0,0 +1,143 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from authentication.models import User
+from products.models import Images
+
+from .gc import collect_garbage
+from .models import StoredFile
+from .references import rebuild_references
+
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+def make_upload(color="red", name="photo.jpeg"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/jpeg")
+
+
+def references(name):
+    return StoredFile.objects.get(name=name).references
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, IMAGE_PROCESSING={"EAGER": True})
+class TestContentAddressedStorage(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def make_user(self, phone_number):
+        return User.objects.create_user(
+            phone_number=phone_number, password="secret123", first_name="Ali"
+        )
+
+    def stored_files(self):
+        return [
+            os.path.join(directory, filename)
+            for directory, _, filenames in os.walk(self.media_root)
+            for filename in filenames
+        ]
+
+    def test_files_are_named_by_content_and_stored_once(self):
+        upload = make_upload()
+        digest = hashlib.sha256(upload.read()).hexdigest()
+        first = Images.objects.create(title="Front", image=make_upload())
+        second = Images.objects.create(
+            title="Back", image=make_upload(name="other.JPEG")
+        )
+
+        self.assertEqual(first.image.name, f"product/{digest[:2]}/{digest}.jpeg")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(references(first.image.name), 2)
+
+    def test_references_follow_saves_and_deletes(self):
+        first = Images.objects.create(title="Front", image=make_upload())
+        second = Images.objects.create(title="Back", image=make_upload())
+        name = first.image.name
+
+        second.image = make_upload("blue")
+        second.save()
+        self.assertEqual(references(name), 1)
+        self.assertEqual(references(second.image.name), 1)
+
+        # Saving other fields, or a deferred instance, leaves counts alone.
+        first.title = "Front side"
+        first.save(update_fields=["title"])
+        Images.objects.only("title").get(pk=first.pk).save()
+        self.assertEqual(references(name), 1)
+
+        first.delete()
+        self.assertEqual(references(name), 0)
+
+    def test_garbage_collection_keeps_referenced_files(self):
+        kept = Images.objects.create(title="Front", image=make_upload())
+        dropped = Images.objects.create(title="Back", image=make_upload("blue"))
+        dropped_name = dropped.image.name
+        dropped.delete()
+
+        self.assertEqual(collect_garbage(grace=3600), (0, 0))
+        removed, freed = collect_garbage(grace=-1)
+
+        self.assertEqual(removed, 1)
+        self.assertGreater(freed, 0)
+        self.assertFalse(kept.image.storage.exists(dropped_name))
+        self.assertTrue(kept.image.storage.exists(kept.image.name))
+        self.assertFalse(StoredFile.objects.filter(name=dropped_name).exists())
+
+    def test_processing_swaps_references_to_processed_files(self):
+        user = self.make_user("+998901234567")
+        other = self.make_user("+998901234568")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile_picture = make_upload()
+            user.save()
+            other.profile_picture = make_upload()
+            other.save()
+        upload = User.objects.get(pk=user.pk)
+        self.assertEqual(references(upload.profile_picture_variants["source"]), 2)
+
+        # Identical uploads produce identical thumbnails, stored once.
+        thumb = upload.profile_picture_variants["thumb"]["jpeg"]
+        self.assertEqual(
+            thumb,
+            User.objects.get(pk=other.pk).profile_picture_variants["thumb"]["jpeg"],
+        )
+        self.assertEqual(references(thumb), 2)
+        # Only the raw upload is left unreferenced.
+        self.assertEqual(StoredFile.objects.filter(references=0).count(), 1)
+
+        collect_garbage(grace=-1)
+        self.assertTrue(upload.profile_picture.storage.exists(thumb))
+        self.assertTrue(
+            upload.profile_picture.storage.exists(upload.profile_picture.name)
+        )
+
+    def test_rebuild_repairs_drift(self):
+        image = Images.objects.create(title="Front", image=make_upload())
+        StoredFile.objects.filter(name=image.image.name).update(references=7)
+
+        self.assertEqual(rebuild_references(), 1)
+        self.assertEqual(references(image.image.name), 1)
+
+    def test_gc_media_command_dry_run(self):
+        Images.objects.create(title="Front", image=make_upload()).delete()
+        out = io.StringIO()
+        call_command("gc_media", "--grace=-1", "--dry-run", stdout=out)
+
+        self.assertIn("Would delete 1 files", out.getvalue())
+        self.assertEqual(len(self.stored_files()), 1)
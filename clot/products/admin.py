@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import Category, Colors, Images, Product, ProductComment, Sizes, Wishlist
+from .models import (
+    Category,
+    Colors,
+    Images,
+    Product,
+    ProductComment,
+    Sizes,
+    StockReservation,
+    Wishlist,
+)
 
 
 admin.site.register(Product)
@@ -9,3 +18,4 @@ admin.site.register(Wishlist)
 admin.site.register(Images)
 admin.site.register(Colors)
 admin.site.register(Sizes)
+admin.site.register(StockReservation)
@@ -0,0 +1,175 @@
+import hashlib
+import math
+import secrets
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlencode
+from rest_framework.response import Response
+
+from .models import Product
+
+
+VERSION_KEY = "catalog:version"
+# Parameters holding comma-separated sets, normalized so "a,b" and "b,a"
+# share a cache entry.
+SET_PARAMS = ("category", "color", "size")
+
+stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def _config():
+    return getattr(settings, "CATALOG_CACHE", {})
+
+
+def _cache():
+    return caches[_config().get("CACHE_ALIAS", "default")]
+
+
+def catalog_state():
+    """
+    Returns ``{"version", "modified"}`` for the whole catalog, the
+    validators of list responses. ``version`` changes on every
+    invalidation and names the cached responses; ``modified`` is the time
+    of the last change.
+    """
+    cache = _cache()
+    state = cache.get(VERSION_KEY)
+    if state is None:
+        # Evicted or never set: nothing says what clients have seen, so
+        # start a new version dated now.
+        state = {"version": secrets.token_hex(8), "modified": timezone.now()}
+        if not cache.add(VERSION_KEY, state, timeout=None):
+            state = cache.get(VERSION_KEY) or state
+    return state
+
+
+def product_state(slug):
+    """
+    Returns ``{"version", "modified"}`` for one product from its own
+    ``updated_at``, the validators of its detail response, or ``None`` if
+    there is no such product.
+    """
+    rows = Product.objects.filter(slug=slug).order_by().values_list("pk", "updated_at")
+    if not rows:
+        return None
+    pk, updated_at = rows[0]
+    return {"version": f"{pk}:{updated_at.isoformat()}", "modified": updated_at}
+
+
+def touch_products(product_ids):
+    """
+    Moves the ``updated_at`` of ``product_ids`` to now, for changes shown on
+    their detail pages that do not save the products themselves.
+    """
+    product_ids = list(product_ids)
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+
+
+def _bump():
+    _cache().set(
+        VERSION_KEY,
+        {"version": secrets.token_hex(8), "modified": timezone.now()},
+        timeout=None,
+    )
+
+
+def invalidate_catalog():
+    """
+    Starts a new catalog version, so every cached list response and
+    validator is stale. Bumped again on commit, since a request between the change
+    and the commit may have cached the old data under the new version.
+    """
+    _bump()
+    if connection.in_atomic_block:
+        transaction.on_commit(_bump)
+
+
+def normalized_query(params):
+    """``params`` as a canonical query string: sorted, without empty values."""
+    items = []
+    for key in sorted(params):
+        values = params.getlist(key)
+        if key in SET_PARAMS:
+            values = [value for joined in values for value in joined.split(",")]
+        items += [(key, value) for value in sorted(set(values)) if value]
+    return urlencode(items)
+
+
+def _cache_response(get, get_state):
+    @wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        if not _config().get("ENABLED", True):
+            return get(view, request, *args, **kwargs)
+
+        state = get_state(*args, **kwargs)
+        if state is None:
+            return get(view, request, *args, **kwargs)
+        variant = ":".join(
+            (
+                state["version"],
+                request.accepted_renderer.format,
+                request.get_host(),
+                request.path,
+                normalized_query(request.query_params),
+            )
+        )
+        digest = hashlib.blake2b(variant.encode(), digest_size=16).hexdigest()
+        etag = f'"{digest}"'
+        # Rounded up: HTTP dates have whole seconds, and a change later in
+        # the same second as the client's copy must not look older than it.
+        last_modified = math.ceil(state["modified"].timestamp())
+
+        if (
+            get_conditional_response(request, etag=etag, last_modified=last_modified)
+            is not None
+        ):
+            stats["not_modified"] += 1
+            response = HttpResponseNotModified()
+        else:
+            cache = _cache()
+            key = f"catalog:response:{digest}"
+            data = cache.get(key)
+            if data is not None:
+                stats["hits"] += 1
+                response = Response(data)
+            else:
+                stats["misses"] += 1
+                response = get(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response.data, timeout=_config().get("TTL", 300))
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # Anyone may store it, but must revalidate before reuse.
+        response["Cache-Control"] = "public, no-cache"
+        return response
+
+    return wrapper
+
+
+def cache_catalog_response(get):
+    """
+    Wraps a catalog list view's ``get`` with conditional GET and a shared
+    response cache. ETag and Last-Modified come from ``catalog_state()``;
+    the response data is cached under the ETag, so an unchanged catalog is
+    served without queries and revalidated without a body. The cache must
+    be shared by every worker, or one would never see another's changes.
+    """
+    return _cache_response(get, lambda *args, **kwargs: catalog_state())
+
+
+def cache_product_response(get):
+    """
+    As ``cache_catalog_response`` for the detail view of the product named
+    by the ``slug`` argument, with validators from ``product_state()``: a
+    change to one product leaves the others' responses valid.
+    """
+    return _cache_response(get, product_state)
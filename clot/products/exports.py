@@ -0,0 +1,80 @@
+from collections import defaultdict
+
+from django.db.models import F
+
+from clot.exports import Export, chunks
+
+from .importer import RELATIONS
+from .models import Product, ProductComment
+
+
+def related_names(product_ids):
+    """
+    Returns ``{column: {product_id: [names]}}`` for the ``importer.RELATIONS``
+    columns, with one query per relation.
+    """
+    names = {}
+    for column, (field_name, _, label) in RELATIONS.items():
+        field = Product._meta.get_field(field_name)
+        rows = field.remote_field.through.objects.filter(
+            **{f"{field.m2m_field_name()}_id__in": product_ids}
+        ).order_by("pk")
+        names[column] = defaultdict(list)
+        for product_id, name in rows.values_list(
+            f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}__{label}"
+        ):
+            names[column][product_id].append(name)
+    return names
+
+
+class ProductExport(Export):
+    """
+    Every product with the names of its categories, colors, sizes and
+    images: the columns ``import_catalog`` reads, plus ids and aggregates.
+    The names are fetched per chunk of products.
+    """
+
+    name = "products"
+    fields = (
+        "id",
+        "slug",
+        "title",
+        "description",
+        "price",
+        "stock",
+        "rating_average",
+        "rating_count",
+        "created_at",
+        "updated_at",
+    )
+    columns = fields + tuple(RELATIONS)
+
+    def rows(self):
+        products = Product.objects.order_by("pk").values(*self.fields)
+        for chunk in chunks(products.iterator(self.chunk_size), self.chunk_size):
+            names = related_names([product["id"] for product in chunk])
+            for product in chunk:
+                for column in RELATIONS:
+                    product[column] = names[column].get(product["id"], [])
+                yield product
+
+
+class CommentExport(Export):
+    name = "comments"
+    fields = (
+        "id",
+        "slug",
+        "product_id",
+        "user_id",
+        "rating",
+        "content",
+        "created_at",
+        "updated_at",
+    )
+    columns = fields + ("product_slug",)
+
+    def rows(self):
+        comments = ProductComment.objects.order_by("pk").values(
+            *self.fields, product_slug=F("product__slug")
+        )
+        return comments.iterator(self.chunk_size)
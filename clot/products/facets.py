@@ -0,0 +1,467 @@
+import threading
+import time
+from array import array
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import Exists, OuterRef
+from django.dispatch import receiver
+from rest_framework.exceptions import ValidationError
+
+from .models import Category, Colors, Product, ProductFacets, Sizes
+
+
+# Facet name (also the Product M2M field) -> ProductFacets column, model and
+# the model's display field.
+RELATIONS = {
+    "category": ("categories", Category, "name"),
+    "color": ("colors", Colors, "color"),
+    "size": ("sizes", Sizes, "size"),
+}
+FACETS = tuple(RELATIONS) + ("in_stock", "price")
+BATCH_SIZE = 500
+
+
+def _revision():
+    return time.time_ns() // 1000
+
+
+def _through(facet):
+    field = Product._meta.get_field(facet)
+    return (
+        field.remote_field.through,
+        f"{field.m2m_field_name()}_id",
+        f"{field.m2m_reverse_field_name()}_id",
+    )
+
+
+def related_product_ids(facet, value_id):
+    """Ids of the products linked to one category, color, size or image."""
+    through, product_column, value_column = _through(facet)
+    return list(
+        through.objects.filter(**{value_column: value_id}).values_list(
+            product_column, flat=True
+        )
+    )
+
+
+def _related_ids(facet, product_ids):
+    through, product_column, value_column = _through(facet)
+    related = defaultdict(list)
+    rows = through.objects.filter(**{f"{product_column}__in": product_ids})
+    for product_id, value_id in rows.values_list(product_column, value_column):
+        related[product_id].append(value_id)
+    return related
+
+
+def update_product_facets(product_ids, facets=None):
+    """
+    Recomputes the ``ProductFacets`` rows of ``product_ids``. With ``facets``
+    only those relations are refreshed, otherwise the whole row is, and
+    products that no longer exist are marked deleted.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        _update_batch(product_ids[start : start + BATCH_SIZE], facets)
+
+
+def _update_batch(product_ids, facets):
+    revision = _revision()
+    rows = {pk: ProductFacets(product_id=pk, revision=revision) for pk in product_ids}
+    update_fields = ["revision"]
+
+    if facets is None:
+        facets = list(RELATIONS)
+        for row in rows.values():
+            row.deleted = True
+        products = Product.objects.filter(pk__in=product_ids)
+        for pk, price, stock in products.values_list("pk", "price", "stock"):
+            rows[pk].price = price
+            rows[pk].in_stock = stock > 0
+            rows[pk].deleted = False
+        update_fields += ["price", "in_stock", "deleted"]
+
+    for facet in facets:
+        column = RELATIONS[facet][0]
+        related = _related_ids(facet, product_ids)
+        for pk, row in rows.items():
+            setattr(row, column, sorted(related.get(pk, ())))
+        update_fields.append(column)
+
+    _upsert(rows.values(), update_fields)
+
+
+def _upsert(rows, update_fields):
+    ProductFacets.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["product_id"],
+        update_fields=update_fields,
+        batch_size=BATCH_SIZE,
+    )
+
+
+def save_product_facets(product):
+    """Refreshes the price and stock facets from a saved product."""
+    row = ProductFacets(
+        product_id=product.pk,
+        price=product.price,
+        in_stock=product.stock > 0,
+        revision=_revision(),
+    )
+    _upsert([row], ["price", "in_stock", "deleted", "revision"])
+
+
+def delete_product_facets(product_id):
+    row = ProductFacets(product_id=product_id, deleted=True, revision=_revision())
+    _upsert([row], ["deleted", "revision"])
+
+
+def rebuild_product_facets(batch_size=BATCH_SIZE):
+    """Recomputes every row from the catalog and drops tombstones."""
+    ProductFacets.objects.filter(deleted=True).delete()
+    ProductFacets.objects.exclude(product_id__in=Product.objects.values("pk")).delete()
+    product_ids = Product.objects.order_by("pk").values_list("pk", flat=True)
+    batch = []
+    count = 0
+    for product_id in product_ids.iterator(chunk_size=batch_size):
+        batch.append(product_id)
+        if len(batch) >= batch_size:
+            _update_batch(batch, None)
+            count += len(batch)
+            batch = []
+    if batch:
+        _update_batch(batch, None)
+        count += len(batch)
+    return count
+
+
+def _bitset(positions, size):
+    bits = bytearray(size // 8 + 1)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _iter_bits(bitset):
+    # Scanning the binary string stays linear in the bitset's length, where
+    # clearing the lowest bit one at a time copies the whole int each step.
+    bits = bin(bitset)[:1:-1]
+    position = bits.find("1")
+    while position != -1:
+        yield position
+        position = bits.find("1", position + 1)
+
+
+class FacetIndex:
+    """
+    Per-process bitmap index over ``ProductFacets``.
+
+    Every product gets a bit position, and every facet value a Python int
+    with the bits of the products that have it. Counting a facet value for a
+    filter set is then one AND and a popcount, with no database round trip,
+    and the counts of all facets are computed together in ``counts()``.
+
+    Changed rows are pulled at most ``sync_interval`` seconds apart by
+    revision; more than ``rebuild_threshold`` rows newer than any seen so
+    far reload the whole index instead.
+    """
+
+    # A pull reads every row revised since this many microseconds before the
+    # previous pull started, so changes committed late or stamped by a skewed
+    # clock are not missed. Re-reading an unchanged row costs a comparison.
+    REVISION_OVERLAP = 60 * 1_000_000
+
+    def __init__(
+        self,
+        price_step=50,
+        sync_interval=5,
+        rebuild_threshold=5000,
+        clock=time.monotonic,
+    ):
+        self.price_step = Decimal(price_step)
+        self.sync_interval = sync_interval
+        self.rebuild_threshold = rebuild_threshold
+        self.clock = clock
+        self.stats = {"loads": 0, "pulls": 0, "applied": 0}
+        self._lock = threading.Lock()
+        self._synced_at = None
+
+    def _reset(self):
+        self._positions = {}
+        self._free = []
+        self._keys = []
+        self._prices = array("d")
+        self._bitsets = {facet: {} for facet in FACETS}
+        self._live = 0
+        self._revision = 0
+        self._pulled_at = _revision()
+
+    def _keys_for(self, categories, colors, sizes, price, in_stock):
+        return (
+            *(("category", value) for value in categories),
+            *(("color", value) for value in colors),
+            *(("size", value) for value in sizes),
+            ("in_stock", in_stock),
+            ("price", int(Decimal(price) // self.price_step)),
+        )
+
+    def _rows(self, queryset):
+        return queryset.values_list(
+            "product_id",
+            "categories",
+            "colors",
+            "sizes",
+            "price",
+            "in_stock",
+            "deleted",
+            "revision",
+        )
+
+    def _load(self):
+        self._reset()
+        members = defaultdict(list)
+        rows = self._rows(ProductFacets.objects.order_by())
+        for row in rows.iterator(chunk_size=5000):
+            product_id, *values, price, in_stock, deleted, revision = row
+            self._revision = max(self._revision, revision)
+            if deleted:
+                continue
+            position = len(self._keys)
+            keys = self._keys_for(*values, price, in_stock)
+            self._positions[product_id] = position
+            self._keys.append(keys)
+            self._prices.append(float(price))
+            for key in keys:
+                members[key].append(position)
+
+        size = len(self._keys)
+        for (facet, value), positions in members.items():
+            self._bitsets[facet][value] = _bitset(positions, size)
+        self._live = (1 << size) - 1
+        self.stats["loads"] += 1
+
+    def _pull(self):
+        changed = ProductFacets.objects.filter(revision__gt=self._revision)
+        if changed[self.rebuild_threshold : self.rebuild_threshold + 1].exists():
+            self._load()
+            return
+        queryset = ProductFacets.objects.filter(
+            revision__gt=self._pulled_at - self.REVISION_OVERLAP
+        ).order_by("revision")
+        self._pulled_at = _revision()
+        for row in self._rows(queryset).iterator(chunk_size=5000):
+            self._apply(*row)
+        self.stats["pulls"] += 1
+
+    def _apply(
+        self, product_id, categories, colors, sizes, price, in_stock, deleted, revision
+    ):
+        self._revision = max(self._revision, revision)
+        position = self._positions.get(product_id)
+        if position is None and deleted:
+            return
+        old = set(self._keys[position]) if position is not None else set()
+        new = (
+            set()
+            if deleted
+            else set(self._keys_for(categories, colors, sizes, price, in_stock))
+        )
+        if position is not None and old == new:
+            # Same buckets; the exact price may still have moved.
+            if not deleted:
+                self._prices[position] = float(price)
+            return
+
+        if position is None:
+            position = self._free.pop() if self._free else len(self._keys)
+            if position == len(self._keys):
+                self._keys.append(())
+                self._prices.append(0.0)
+            self._positions[product_id] = position
+
+        bit = 1 << position
+        for facet, value in old - new:
+            bitset = self._bitsets[facet][value] & ~bit
+            if bitset:
+                self._bitsets[facet][value] = bitset
+            else:
+                del self._bitsets[facet][value]
+        for facet, value in new - old:
+            self._bitsets[facet][value] = self._bitsets[facet].get(value, 0) | bit
+
+        if deleted:
+            self._live &= ~bit
+            self._keys[position] = ()
+            del self._positions[product_id]
+            self._free.append(position)
+        else:
+            self._live |= bit
+            self._keys[position] = tuple(new)
+            self._prices[position] = float(price)
+        self.stats["applied"] += 1
+
+    def sync(self, force=False):
+        with self._lock:
+            now = self.clock()
+            if self._synced_at is None:
+                self._load()
+            elif force or now - self._synced_at >= self.sync_interval:
+                self._pull()
+            else:
+                return
+            self._synced_at = now
+
+    def _price_range(self, min_price, max_price):
+        low = float(min_price) if min_price is not None else float("-inf")
+        high = float(max_price) if max_price is not None else float("inf")
+        step = float(self.price_step)
+        matched = 0
+        edges = []
+        for bucket, bitset in self._bitsets["price"].items():
+            start, end = bucket * step, (bucket + 1) * step
+            if end <= low or start > high:
+                continue
+            if start >= low and end <= high:
+                matched |= bitset
+                continue
+            # Only the buckets containing a bound are checked price by price.
+            edges += (
+                position
+                for position in _iter_bits(bitset)
+                if low <= self._prices[position] <= high
+            )
+        return matched | _bitset(edges, len(self._keys))
+
+    def _selections(self, filters):
+        selections = {}
+        for facet in RELATIONS:
+            if facet in filters:
+                selected = 0
+                for value in filters[facet]:
+                    selected |= self._bitsets[facet].get(value, 0)
+                selections[facet] = selected
+        if filters.get("in_stock") is not None:
+            selections["in_stock"] = self._bitsets["in_stock"].get(
+                filters["in_stock"], 0
+            )
+        if filters.get("min_price") is not None or filters.get("max_price") is not None:
+            selections["price"] = self._price_range(
+                filters.get("min_price"), filters.get("max_price")
+            )
+        return selections
+
+    def counts(self, filters):
+        """
+        Returns ``{"total": n, "facets": {facet: {value: count}}}`` for
+        ``filters`` as produced by ``parse_filters``. Each facet is counted
+        against every filter except its own, so selecting a value does not
+        hide the other values of that facet. Price values are bucket numbers
+        of width ``price_step``.
+        """
+        self.sync()
+        with self._lock:
+            selections = self._selections(filters)
+            matched = self._live
+            for selected in selections.values():
+                matched &= selected
+
+            result = {"total": matched.bit_count(), "facets": {}}
+            for facet in FACETS:
+                base = self._live
+                for other, selected in selections.items():
+                    if other != facet:
+                        base &= selected
+                result["facets"][facet] = {
+                    value: count
+                    for value, bitset in self._bitsets[facet].items()
+                    if (count := (bitset & base).bit_count())
+                }
+            return result
+
+    @property
+    def size(self):
+        return len(self._positions)
+
+
+def parse_filters(params):
+    """
+    Reads ``category``, ``color`` and ``size`` (comma-separated slugs),
+    ``in_stock`` and ``min_price``/``max_price`` from query parameters.
+    """
+    filters = {}
+    for facet, (_, model, _) in RELATIONS.items():
+        slugs = [slug for slug in params.get(facet, "").split(",") if slug]
+        if slugs:
+            filters[facet] = set(
+                model.objects.filter(slug__in=slugs).values_list("pk", flat=True)
+            )
+
+    in_stock = params.get("in_stock")
+    if in_stock in ("1", "true"):
+        filters["in_stock"] = True
+    elif in_stock in ("0", "false"):
+        filters["in_stock"] = False
+
+    for bound in ("min_price", "max_price"):
+        if params.get(bound):
+            try:
+                filters[bound] = Decimal(params[bound])
+            except InvalidOperation:
+                raise ValidationError({bound: "A valid number is required."})
+    return filters
+
+
+def filter_products(queryset, filters):
+    """Applies ``parse_filters`` output to a ``Product`` queryset in SQL."""
+    for facet in RELATIONS:
+        if facet in filters:
+            through, product_column, value_column = _through(facet)
+            queryset = queryset.filter(
+                Exists(
+                    through.objects.filter(
+                        **{
+                            product_column: OuterRef("pk"),
+                            f"{value_column}__in": filters[facet],
+                        }
+                    )
+                )
+            )
+    if filters.get("in_stock") is True:
+        queryset = queryset.filter(stock__gt=0)
+    elif filters.get("in_stock") is False:
+        queryset = queryset.filter(stock=0)
+    if filters.get("min_price") is not None:
+        queryset = queryset.filter(price__gte=filters["min_price"])
+    if filters.get("max_price") is not None:
+        queryset = queryset.filter(price__lte=filters["max_price"])
+    return queryset
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_facet_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                config = getattr(settings, "PRODUCT_FACETS", {})
+                _index = FacetIndex(
+                    **{key.lower(): value for key, value in config.items()}
+                )
+    return _index
+
+
+def reset_facet_index():
+    global _index
+    _index = None
+
+
+@receiver(setting_changed)
+def _reset_facet_index_on_setting_change(setting, **kwargs):
+    if setting == "PRODUCT_FACETS":
+        reset_facet_index()
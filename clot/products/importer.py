@@ -0,0 +1,238 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from clot.exports import LIST_SEPARATOR
+from clot.slugs import bulk_create_with_slugs
+
+from .caching import invalidate_catalog
+from .facets import update_product_facets
+from .models import CatalogImport, Category, Colors, Images, Product, Sizes
+from .search import index_products
+
+
+BATCH_SIZE = 1000
+# Import column -> Product M2M field, the related model and the field its
+# names are matched on, ignoring case.
+RELATIONS = {
+    "categories": ("category", Category, "name"),
+    "colors": ("color", Colors, "color"),
+    "sizes": ("size", Sizes, "size"),
+    "images": ("image", Images, "title"),
+}
+# Images need an uploaded file, so unknown image names are left out rather
+# than created.
+CREATED_RELATIONS = ("categories", "colors", "sizes")
+
+
+def read_csv(stream):
+    """Yields ``(line, record)``; list columns hold ``|``-separated names."""
+    reader = csv.DictReader(stream)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def read_jsonl(stream):
+    """Yields ``(line, record)`` for each non-blank line of JSON objects."""
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text)
+        except ValueError:
+            yield line, None
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def _names(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    names = (str(name).strip() for name in value)
+    return list(dict.fromkeys(name for name in names if name))
+
+
+# The largest stock the database can store: 2**31 - 1 on PostgreSQL.
+MAX_STOCK = connection.ops.integer_field_range(
+    Product._meta.get_field("stock").get_internal_type()
+)[1]
+
+
+def parse_record(record):
+    """Validates one record; raises ``ValueError`` with the reason."""
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object")
+    title = str(record.get("title") or "").strip()
+    if not title:
+        raise ValueError("title is required")
+    if len(title) > Product._meta.get_field("title").max_length:
+        raise ValueError("title is too long")
+    try:
+        price = Decimal(str(record.get("price")).strip())
+        # NaN passes quantize() but fails any comparison.
+        if not price.is_finite():
+            raise InvalidOperation
+        price = price.quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"invalid price {record.get('price')!r}")
+    if not 0 <= price < 10**8:
+        raise ValueError(f"price {price} out of range")
+    stock = record.get("stock") or 0
+    try:
+        # int() would truncate a JSON 2.9 to 2.
+        if isinstance(stock, float) and not stock.is_integer():
+            raise ValueError
+        stock = int(stock)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid stock {record.get('stock')!r}")
+    if stock < 0:
+        raise ValueError("stock cannot be negative")
+    if stock > MAX_STOCK:
+        raise ValueError(f"stock {stock} out of range")
+    return {
+        "title": title,
+        "description": str(record.get("description") or ""),
+        "price": price,
+        "stock": stock,
+        "relations": {column: _names(record.get(column)) for column in RELATIONS},
+    }
+
+
+class CatalogImporter:
+    """
+    Imports product records in batches: the products of a batch with one
+    ``bulk_create``, their categories, colors, sizes and images resolved by
+    name through maps loaded once, and the links written as bulk through
+    rows. Each batch commits together with its ``CatalogImport`` checkpoint,
+    so with ``resume`` a failed import picks up after the last batch it
+    committed, and no record is imported twice.
+    """
+
+    def __init__(self, name, batch_size=BATCH_SIZE, resume=False, on_skip=None):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.name = name
+        self.batch_size = batch_size
+        self.resume = resume
+        self.on_skip = on_skip or (lambda line, error: None)
+        self.unknown_images = 0
+        self.maps = {}
+
+    def _load_maps(self):
+        for column, (_, model, field) in RELATIONS.items():
+            names = {}
+            values = model.objects.order_by("pk").values_list(field, "pk")
+            for name, pk in values.iterator(chunk_size=self.batch_size):
+                names.setdefault(name.casefold(), pk)
+            self.maps[column] = names
+
+    def _checkpoint(self):
+        progress, created = CatalogImport.objects.get_or_create(name=self.name)
+        if not created and not self.resume:
+            progress.records = progress.imported = progress.skipped = 0
+            progress.started_at = timezone.now()
+            progress.finished_at = None
+            progress.save()
+        return progress
+
+    def run(self, records):
+        """Imports ``(line, record)`` pairs; returns the ``CatalogImport``."""
+        progress = self._checkpoint()
+        self._load_maps()
+        # A resumed import skips what is already in; only parsing is repeated.
+        records = islice(records, progress.records, None)
+        while batch := list(islice(records, self.batch_size)):
+            self._import_batch(progress, batch)
+        if progress.finished_at is None:
+            progress.finished_at = timezone.now()
+            progress.save(update_fields=["finished_at", "updated_at"])
+        return progress
+
+    def _import_batch(self, progress, batch):
+        rows = []
+        for line, record in batch:
+            try:
+                rows.append(parse_record(record))
+            except ValueError as error:
+                self.on_skip(line, error)
+        with transaction.atomic():
+            self._create_missing(rows)
+            products = bulk_create_with_slugs(
+                Product,
+                [
+                    Product(
+                        title=row["title"],
+                        description=row["description"],
+                        price=row["price"],
+                        stock=row["stock"],
+                    )
+                    for row in rows
+                ],
+                lambda product: product.title,
+            )
+            self._link(products, rows)
+            # bulk_create sends no signals: refresh what they would have.
+            product_ids = [product.pk for product in products]
+            if product_ids:
+                update_product_facets(product_ids)
+                index_products(product_ids)
+                invalidate_catalog()
+            progress.records += len(batch)
+            progress.imported += len(rows)
+            progress.skipped += len(batch) - len(rows)
+            progress.save(
+                update_fields=["records", "imported", "skipped", "updated_at"]
+            )
+
+    def _create_missing(self, rows):
+        for column in CREATED_RELATIONS:
+            _, model, field = RELATIONS[column]
+            names = self.maps[column]
+            missing = {}
+            for row in rows:
+                for name in row["relations"][column]:
+                    if name.casefold() not in names:
+                        missing.setdefault(name.casefold(), name)
+            if not missing:
+                continue
+            created = bulk_create_with_slugs(
+                model,
+                [model(**{field: name}) for name in missing.values()],
+                lambda obj: getattr(obj, field),
+            )
+            for key, obj in zip(missing, created):
+                names[key] = obj.pk
+
+    def _link(self, products, rows):
+        # Plain executemany: through rows built as model instances cost more
+        # than everything else in a batch.
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for column, (field_name, _, _) in RELATIONS.items():
+                field = Product._meta.get_field(field_name)
+                source = f"{field.m2m_field_name()}_id"
+                target = f"{field.m2m_reverse_field_name()}_id"
+                names = self.maps[column]
+                links = []
+                for product, row in zip(products, rows):
+                    related = set()
+                    for name in row["relations"][column]:
+                        pk = names.get(name.casefold())
+                        if pk is None:
+                            self.unknown_images += 1
+                        elif pk not in related:
+                            related.add(pk)
+                            links.append((product.pk, pk))
+                if links:
+                    cursor.executemany(
+                        f"INSERT INTO {quote(field.m2m_db_table())} "
+                        f"({quote(source)}, {quote(target)}) VALUES (%s, %s)",
+                        links,
+                    )
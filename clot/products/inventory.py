@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import invalidate_catalog
+from .facets import update_product_facets
+from .models import Product, StockReservation, StockReservationItem
+
+
+BATCH_SIZE = 100
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Insufficient stock for products {self.product_ids}")
+
+
+class ReservationNotActive(Exception):
+    """The reservation was already committed, released or has expired."""
+
+
+def _config():
+    return getattr(settings, "INVENTORY", {})
+
+
+def take_stock(product_id, quantity):
+    """
+    Takes ``quantity`` off the product's stock with one conditional
+    ``UPDATE ... SET stock = stock - n WHERE stock >= n``; returns whether
+    there was enough. The check and the decrement are a single statement,
+    so concurrent buyers cannot both see the last unit.
+    """
+    return bool(
+        Product.objects.filter(pk=product_id, stock__gte=quantity).update(
+            stock=F("stock") - quantity, updated_at=timezone.now()
+        )
+    )
+
+
+def return_stock(product_id, quantity):
+    Product.objects.filter(pk=product_id).update(
+        stock=F("stock") + quantity, updated_at=timezone.now()
+    )
+
+
+def _stock_changed(items, returned):
+    """
+    Refreshes what caches the stock of ``{product_id: quantity}``: the
+    catalog list responses always, and the in-stock facet of the products
+    that just ran out or came back. Detail responses follow ``updated_at``,
+    which the stock updates move.
+    """
+    stocks = Product.objects.filter(pk__in=items).values_list("pk", "stock")
+    crossed = [pk for pk, stock in stocks if stock == (items[pk] if returned else 0)]
+    if crossed:
+        update_product_facets(crossed)
+    invalidate_catalog()
+
+
+def _short_products(items):
+    stocks = dict(Product.objects.filter(pk__in=items).values_list("pk", "stock"))
+    return [pk for pk, quantity in items.items() if stocks.get(pk, 0) < quantity]
+
+
+def reserve_stock(items, user=None, ttl=None):
+    """
+    Reserves ``{product_id: quantity}`` for ``ttl`` seconds, all or nothing,
+    and returns the ``StockReservation``. Raises ``InsufficientStock`` with
+    every product short of its quantity; nothing is taken then.
+    """
+    if not items or any(quantity < 1 for quantity in items.values()):
+        raise ValueError("Expected at least one product and positive quantities.")
+    ttl = _config().get("RESERVATION_TTL", 900) if ttl is None else ttl
+    try:
+        with transaction.atomic():
+            # Products are decremented, and so locked, in primary key order:
+            # two carts sharing products queue on the first one they share
+            # instead of each holding a row the other waits for.
+            for product_id in sorted(items):
+                if not take_stock(product_id, items[product_id]):
+                    raise InsufficientStock([product_id])
+            reservation = StockReservation.objects.create(
+                user=user, expires_at=timezone.now() + timedelta(seconds=ttl)
+            )
+            StockReservationItem.objects.bulk_create(
+                StockReservationItem(
+                    reservation=reservation, product_id=product_id, quantity=quantity
+                )
+                for product_id, quantity in sorted(items.items())
+            )
+            _stock_changed(items, returned=False)
+    except InsufficientStock as error:
+        # Rolled back; report every short product, not just the first.
+        raise InsufficientStock(_short_products(items) or error.product_ids) from None
+    return reservation
+
+
+def _end(reservation_id, status):
+    with transaction.atomic():
+        # Flipping the status claims the reservation: of a release, a commit
+        # and the sweep racing on it, exactly one changes the row.
+        claimed = StockReservation.objects.filter(
+            pk=reservation_id, status=StockReservation.ACTIVE
+        ).update(status=status)
+        if not claimed:
+            return False
+        items = dict(
+            StockReservationItem.objects.filter(
+                reservation_id=reservation_id
+            ).values_list("product_id", "quantity")
+        )
+        for product_id in sorted(items):
+            return_stock(product_id, items[product_id])
+        if items:
+            _stock_changed(items, returned=True)
+    return True
+
+
+def release_reservation(reservation):
+    """Puts the reserved stock back, e.g. when the cart is abandoned."""
+    if not _end(reservation.pk, StockReservation.RELEASED):
+        raise ReservationNotActive(reservation.token)
+    reservation.status = StockReservation.RELEASED
+
+
+def commit_reservation(reservation):
+    """
+    Marks the reserved stock sold, at checkout. Raises
+    ``ReservationNotActive`` once the reservation was released or has
+    expired, even if the sweep has not returned its stock yet.
+    """
+    committed = StockReservation.objects.filter(
+        pk=reservation.pk,
+        status=StockReservation.ACTIVE,
+        expires_at__gt=timezone.now(),
+    ).update(status=StockReservation.COMMITTED)
+    if not committed:
+        raise ReservationNotActive(reservation.token)
+    reservation.status = StockReservation.COMMITTED
+
+
+def sweep_expired_reservations(now=None, batch_size=BATCH_SIZE):
+    """
+    Returns the stock of active reservations past their expiry, one
+    transaction per reservation so no lock is held across a batch. Safe to
+    run from several workers at once. Returns the number expired.
+    """
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        ids = list(
+            StockReservation.objects.filter(
+                status=StockReservation.ACTIVE, expires_at__lte=now
+            )
+            .order_by("expires_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return expired
+        for reservation_id in ids:
+            expired += _end(reservation_id, StockReservation.EXPIRED)
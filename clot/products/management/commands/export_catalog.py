@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from clot.exports import CHUNK_SIZE, ENCODERS, export_filename, write_export
+from products.exports import CommentExport, ProductExport
+
+
+EXPORTS = {"products": ProductExport, "comments": CommentExport}
+
+
+class Command(BaseCommand):
+    help = "Stream every product or product comment to an NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(EXPORTS))
+        parser.add_argument("--format", choices=sorted(ENCODERS), default="ndjson")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--output", help="Defaults to <dataset>.<format>[.gz]")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options["dataset"]](chunk_size=options["chunk_size"])
+        fmt, gzip = options["format"], options["gzip"]
+        path = options["output"] or export_filename(export, fmt, gzip)
+        written = write_export(export, path, fmt, gzip)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {written / 2**20:.1f} MiB to {path}")
+        )
@@ -0,0 +1,87 @@
+import gzip
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import BATCH_SIZE, READERS, CatalogImporter
+from products.models import CatalogImport
+
+
+def guess_format(path):
+    stem = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(stem)[1].lstrip(".").lower()
+    return {"ndjson": "jsonl"}.get(extension, extension)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import products from a CSV or JSONL file (optionally gzipped, or - for"
+        " stdin) in batches; rerun with --resume after a failure"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source")
+        parser.add_argument("--format", choices=sorted(READERS))
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--name",
+            help="Checkpoint name; defaults to the source's absolute path",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue after the last batch a previous run committed",
+        )
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        fmt = options["format"] or guess_format(source)
+        if fmt not in READERS:
+            raise CommandError(f"Unknown format of {source}; pass --format.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if source == "-":
+            name = options["name"] or "stdin"
+        else:
+            name = options["name"] or os.path.abspath(source)
+
+        def skip(line, error):
+            self.stderr.write(f"Skipped record at line {line}: {error}")
+
+        importer = CatalogImporter(
+            name,
+            batch_size=options["batch_size"],
+            resume=options["resume"],
+            on_skip=skip,
+        )
+        try:
+            stream = self.open(source)
+        except OSError as error:
+            raise CommandError(error)
+        started = time.perf_counter()
+        try:
+            with stream:
+                progress = importer.run(READERS[fmt](stream))
+        except Exception as error:
+            done = CatalogImport.objects.filter(name=name).first()
+            raise CommandError(
+                f"Import failed after {done.records if done else 0} records: "
+                f"{error}. Rerun with --resume to continue."
+            ) from error
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {progress.imported} products, skipped"
+                f" {progress.skipped} records, {importer.unknown_images} unknown"
+                f" images in {elapsed:.1f}s"
+            )
+        )
+
+    def open(self, source):
+        if source == "-":
+            return open(sys.stdin.fileno(), encoding="utf-8", closefd=False)
+        if source.endswith(".gz"):
+            return gzip.open(source, "rt", encoding="utf-8", newline="")
+        return open(source, encoding="utf-8", newline="")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.variants import prune_variants
+
+
+class Command(BaseCommand):
+    help = "Delete rendered product image variants whose source file is gone"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        removed = prune_variants(dry_run=options["dry_run"])
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} variants"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.facets import rebuild_product_facets
+
+
+class Command(BaseCommand):
+    help = "Recompute the product_facets table and drop rows of deleted products"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_product_facets(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed facets of {count} products"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from products.search import BATCH_SIZE, get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text index used by product search"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        indexed = backend.rebuild(batch_size=options["batch_size"])
+        name = type(backend).__name__
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} products with {name}"))
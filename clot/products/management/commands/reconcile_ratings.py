@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute product rating aggregates from the comments and fix drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        corrected = reconcile_ratings(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Corrected {corrected} products"))
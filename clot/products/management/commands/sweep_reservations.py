@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.inventory import sweep_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Return the stock of expired reservations"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        expired = sweep_expired_reservations(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} reservations"))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:34
+
+import media.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="images",
+            name="image",
+            field=models.ImageField(
+                storage=media.storage.ContentAddressedStorage(), upload_to="product/"
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:46
+
+import time
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_facets(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductFacets = apps.get_model("products", "ProductFacets")
+    related = {}
+    for field, column in (
+        ("category", "categories"),
+        ("color", "colors"),
+        ("size", "sizes"),
+    ):
+        m2m = Product._meta.get_field(field)
+        values = defaultdict(list)
+        rows = m2m.remote_field.through.objects.values_list(
+            f"{m2m.m2m_field_name()}_id", f"{m2m.m2m_reverse_field_name()}_id"
+        )
+        for product_id, value_id in rows.iterator(chunk_size=5000):
+            values[product_id].append(value_id)
+        related[column] = values
+
+    revision = time.time_ns() // 1000
+    products = Product.objects.values_list("pk", "price", "stock")
+    ProductFacets.objects.bulk_create(
+        (
+            ProductFacets(
+                product_id=pk,
+                price=price,
+                in_stock=stock > 0,
+                revision=revision,
+                **{
+                    column: sorted(values.get(pk, ()))
+                    for column, values in related.items()
+                },
+            )
+            for pk, price, stock in products.iterator(chunk_size=5000)
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_product_catalog_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductFacets",
+            fields=[
+                (
+                    "product_id",
+                    models.BigIntegerField(primary_key=True, serialize=False),
+                ),
+                ("categories", models.JSONField(default=list)),
+                ("colors", models.JSONField(default=list)),
+                ("sizes", models.JSONField(default=list)),
+                (
+                    "price",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("in_stock", models.BooleanField(default=False)),
+                ("deleted", models.BooleanField(default=False)),
+                ("revision", models.BigIntegerField(db_index=True)),
+            ],
+            options={
+                "verbose_name": "product facets",
+                "verbose_name_plural": "product facets",
+                "db_table": "product_facets",
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:05
+
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5("
+        "title, description, categories, colors, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO product_search "
+        "(rowid, title, description, categories, colors) "
+        "SELECT p.id, p.title, p.description, "
+        "COALESCE((SELECT group_concat(c.name, ' ') FROM product_category pc "
+        "JOIN category c ON c.id = pc.category_id WHERE pc.product_id = p.id), ''), "
+        "COALESCE((SELECT group_concat(c.color, ' ') FROM product_color pc "
+        "JOIN colors c ON c.id = pc.colors_id WHERE pc.product_id = p.id), '') "
+        "FROM product p"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_facets"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:01
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductComment = apps.get_model("products", "ProductComment")
+    rows = (
+        ProductComment.objects.order_by()
+        .values("product_id")
+        .annotate(
+            rating_count=Count("pk"),
+            rating_sum=Sum("rating"),
+            **{
+                f"rating_{rating}": Count("pk", filter=Q(rating=rating))
+                for rating in range(1, 6)
+            },
+        )
+    )
+    for row in rows.iterator(chunk_size=2000):
+        product_id = row.pop("product_id")
+        Product.objects.filter(pk=product_id).update(
+            rating_average=row["rating_sum"] / row["rating_count"], **row
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_product_updated_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_1",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_2",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_3",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_4",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_5",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_average",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["rating_average", "id"], name="product_rating_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_catalog_import"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_updated_idx",
+        ),
+    ]
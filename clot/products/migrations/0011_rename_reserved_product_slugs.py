@@ -0,0 +1,34 @@
+from django.db import migrations
+
+from clot.slugs import allocate_slug
+
+# Product.reserved_slugs when this migration was written.
+RESERVED_SLUGS = (
+    "comments",
+    "export",
+    "facets",
+    "images",
+    "reservations",
+    "search",
+    "wishlist",
+)
+
+
+def rename_reserved_slugs(apps, schema_editor):
+    # Products saved before the slugs were reserved are unreachable at
+    # /products/<slug>/; the base slug is taken, so they get a suffix.
+    Product = apps.get_model("products", "Product")
+    for product in Product.objects.filter(slug__in=RESERVED_SLUGS):
+        product.slug = allocate_slug(Product, product.slug)
+        product.save(update_fields=["slug"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_remove_product_updated_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_reserved_slugs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_rename_reserved_product_slugs"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productcomment",
+            index=models.Index(
+                fields=["product", "created_at", "id"],
+                name="comment_product_created_idx",
+            ),
+        ),
+    ]
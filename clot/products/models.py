@@ -1,13 +1,16 @@
+import uuid
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
-from .extensions import generate_unique_slug
+from clot.slugs import UniqueSlugMixin
+from media.storage import content_addressed_storage
 
 
 User = get_user_model()
 
 
-class Category(models.Model):
+class Category(UniqueSlugMixin, models.Model):
     name = models.CharField(max_length=100)
     description = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -22,15 +25,13 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.slug = generate_unique_slug(self, self.name)
-        super().save(*args, **kwargs)
+    def get_slug_source(self):
+        return self.name
 
 
-class Images(models.Model):
+class Images(UniqueSlugMixin, models.Model):
     title = models.CharField(max_length=200)
-    image = models.ImageField(upload_to="product/")
+    image = models.ImageField(upload_to="product/", storage=content_addressed_storage)
     description = models.CharField(blank=True, null=True, max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     slug = models.CharField(unique=True, blank=True, null=True, max_length=160)
@@ -38,10 +39,8 @@ class Images(models.Model):
     def __str__(self):
         return self.slug
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(self, self.title)
-        super().save(*args, **kwargs)
+    def get_slug_source(self):
+        return self.title
 
     class Meta:
         verbose_name_plural = "images"
@@ -50,7 +49,7 @@ class Images(models.Model):
         ordering = ["-created_at"]
 
 
-class Colors(models.Model):
+class Colors(UniqueSlugMixin, models.Model):
     color = models.CharField(max_length=100)
     description = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -59,10 +58,8 @@ class Colors(models.Model):
     def __str__(self):
         return self.color
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(self, self.color)
-        super().save(*args, **kwargs)
+    def get_slug_source(self):
+        return self.color
 
     class Meta:
         verbose_name_plural = "colors"
@@ -71,7 +68,7 @@ class Colors(models.Model):
         ordering = ["created_at"]
 
 
-class Sizes(models.Model):
+class Sizes(UniqueSlugMixin, models.Model):
     size = models.CharField(max_length=100)
     description = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -80,10 +77,8 @@ class Sizes(models.Model):
     def __str__(self):
         return self.size
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.slug = generate_unique_slug(self, self.size)
-        super().save(*args, **kwargs)
+    def get_slug_source(self):
+        return self.size
 
     class Meta:
         verbose_name_plural = "sizes"
@@ -92,7 +87,7 @@ class Sizes(models.Model):
         ordering = ["created_at"]
 
 
-class Product(models.Model):
+class Product(UniqueSlugMixin, models.Model):
     title = models.CharField(max_length=200)
     category = models.ManyToManyField(Category, related_name="products")
     description = models.TextField()
@@ -106,22 +101,166 @@ class Product(models.Model):
     color = models.ManyToManyField(Colors, related_name="colors")
     size = models.ManyToManyField(Sizes, related_name="sizes")
 
+    # Aggregates of the product's comments, kept by ratings.py.
+    rating_count = models.IntegerField(default=0, editable=False)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
+    rating_1 = models.IntegerField(default=0, editable=False)
+    rating_2 = models.IntegerField(default=0, editable=False)
+    rating_3 = models.IntegerField(default=0, editable=False)
+    rating_4 = models.IntegerField(default=0, editable=False)
+    rating_5 = models.IntegerField(default=0, editable=False)
+
+    # Product detail is /products/<slug>/, next to these routes in urls.py.
+    reserved_slugs = (
+        "comments",
+        "export",
+        "facets",
+        "images",
+        "reservations",
+        "search",
+        "wishlist",
+    )
+
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.slug = generate_unique_slug(self, self.title)
-        super().save(*args, **kwargs)
+    def get_slug_source(self):
+        return self.title
 
     class Meta:
         verbose_name_plural = "products"
         verbose_name = "product"
         db_table = "product"
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination orderings, see pagination.py.
+            models.Index(fields=["created_at", "id"], name="product_created_idx"),
+            models.Index(fields=["price", "id"], name="product_price_idx"),
+            models.Index(fields=["rating_average", "id"], name="product_rating_idx"),
+        ]
+
+
+class ProductFacets(models.Model):
+    """
+    Facet values of one product, denormalized for ``facets.FacetIndex``.
+
+    Kept up to date by the signals in ``signals.py``. Rows of deleted
+    products stay behind as tombstones (``deleted``) so that other workers'
+    indexes see the deletion; ``rebuild_product_facets`` clears them.
+    """
+
+    product_id = models.BigIntegerField(primary_key=True)
+    categories = models.JSONField(default=list)
+    colors = models.JSONField(default=list)
+    sizes = models.JSONField(default=list)
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    in_stock = models.BooleanField(default=False)
+    deleted = models.BooleanField(default=False)
+    # Microseconds since the epoch at the last change, see facets.py.
+    revision = models.BigIntegerField(db_index=True)
 
+    def __str__(self):
+        return f"Facets of product {self.product_id}"
+
+    class Meta:
+        verbose_name_plural = "product facets"
+        verbose_name = "product facets"
+        db_table = "product_facets"
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for a cart until checkout, see ``inventory.py``. The reserved
+    quantities are already taken off ``Product.stock``; releasing or
+    expiring the reservation puts them back, committing keeps them sold.
+    """
+
+    ACTIVE = "active"
+    COMMITTED = "committed"
+    RELEASED = "released"
+    EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (ACTIVE, "Active"),
+        (COMMITTED, "Committed"),
+        (RELEASED, "Released"),
+        (EXPIRED, "Expired"),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="stock_reservations",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=ACTIVE)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Reservation {self.token} ({self.status})"
 
-class ProductComment(models.Model):
+    class Meta:
+        verbose_name_plural = "stock reservations"
+        verbose_name = "stock reservation"
+        db_table = "stock_reservation"
+        indexes = [
+            # The expiry sweep, see inventory.sweep_expired_reservations().
+            models.Index(
+                fields=["status", "expires_at"], name="reservation_expiry_idx"
+            ),
+        ]
+
+
+class StockReservationItem(models.Model):
+    reservation = models.ForeignKey(
+        StockReservation, on_delete=models.CASCADE, related_name="items"
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="reservation_items"
+    )
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id}"
+
+    class Meta:
+        verbose_name_plural = "stock reservation items"
+        verbose_name = "stock reservation item"
+        db_table = "stock_reservation_item"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["reservation", "product"], name="reservation_product_unique"
+            ),
+        ]
+
+
+class CatalogImport(models.Model):
+    """
+    Progress of an ``import_catalog`` run. Saved in the transaction of each
+    batch, so a failed run resumes right after the last batch it committed.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    records = models.PositiveBigIntegerField(default=0)  # read from the source
+    imported = models.PositiveBigIntegerField(default=0)
+    skipped = models.PositiveBigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Import {self.name}: {self.records} records"
+
+    class Meta:
+        verbose_name_plural = "catalog imports"
+        verbose_name = "catalog import"
+        db_table = "catalog_import"
+
+
+class ProductComment(UniqueSlugMixin, models.Model):
     content = models.TextField()
     rating = models.PositiveSmallIntegerField(choices=[(i, i) for i in range(1, 6)])
     created_at = models.DateTimeField(auto_now_add=True)
@@ -133,12 +272,8 @@ class ProductComment(models.Model):
     )
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(
-                self, str(self.user.phone_number).replace("+", "")
-            )
-        super().save(*args, **kwargs)
+    def get_slug_source(self):
+        return str(self.user.phone_number).replace("+", "")
 
     def __str__(self):
         return f"{self.user.username} - {self.product.title} - {self.rating} - {self.content[:20]}"
@@ -148,23 +283,27 @@ class ProductComment(models.Model):
         verbose_name = "product comment"
         db_table = "product_comment"
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pages of one product's comments, see CommentPagination.
+            models.Index(
+                fields=["product", "created_at", "id"],
+                name="comment_product_created_idx",
+            ),
+        ]
 
 
-class Wishlist(models.Model):
+class Wishlist(UniqueSlugMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     products = models.ManyToManyField(Product)
     created_at = models.DateTimeField(auto_now_add=True)
     slug = models.CharField(unique=True, blank=True, null=True, max_length=160)
 
     def __str__(self):
-        return f"Wishlist - {self.user.phone_number} - {self.products.count()} items"
-
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(
-                self, str(self.user.phone_number).replace("+", "")
-            )
-        super().save(*args, **kwargs)
+        # No products.count() here: admin lists would run it once per row.
+        return f"Wishlist {self.slug}"
+
+    def get_slug_source(self):
+        return str(self.user.phone_number).replace("+", "")
 
     class Meta:
         verbose_name_plural = "wishlists"
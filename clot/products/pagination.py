@@ -0,0 +1,13 @@
+from clot.pagination import KeysetPagination
+
+
+class ProductPagination(KeysetPagination):
+    ordering_fields = ("created_at", "price", "rating_average")
+    default_ordering = "-created_at"
+    page_size = 20
+
+
+class CommentPagination(KeysetPagination):
+    ordering_fields = ("created_at",)
+    default_ordering = "-created_at"
+    page_size = 20
@@ -0,0 +1,62 @@
+from django.db.models import Prefetch
+
+from .models import Category, Colors, Images, Product, ProductComment, Sizes
+
+
+# Columns each endpoint actually serializes; everything else stays deferred.
+LIST_FIELDS = (
+    "id",
+    "slug",
+    "title",
+    "price",
+    "stock",
+    "created_at",
+    "rating_count",
+    "rating_average",
+)
+DETAIL_FIELDS = LIST_FIELDS + (
+    "description",
+    "updated_at",
+    *(f"rating_{rating}" for rating in range(1, 6)),
+)
+DETAIL_COMMENTS = 20
+
+
+def _relation_prefetches():
+    return [
+        Prefetch("category", queryset=Category.objects.only("id", "slug", "name")),
+        Prefetch("color", queryset=Colors.objects.only("id", "slug", "color")),
+        Prefetch("size", queryset=Sizes.objects.only("id", "slug", "size")),
+        Prefetch("image", queryset=Images.objects.only("id", "slug", "title", "image")),
+    ]
+
+
+def catalog_queryset():
+    """
+    Products for the catalog list: one query for the page plus one per
+    relation, however many products the page holds.
+    """
+    return Product.objects.only(*LIST_FIELDS).prefetch_related(*_relation_prefetches())
+
+
+def product_comments_queryset():
+    """Comments with just the fields ``ProductCommentSerializer`` renders."""
+    return ProductComment.objects.select_related("user").only(
+        "id",
+        "slug",
+        "content",
+        "rating",
+        "created_at",
+        "product_id",
+        "user__id",
+        "user__first_name",
+    )
+
+
+def product_detail_queryset():
+    """``catalog_queryset`` plus the description and the latest comments."""
+    comments = product_comments_queryset().order_by("-created_at")[:DETAIL_COMMENTS]
+    return Product.objects.only(*DETAIL_FIELDS).prefetch_related(
+        *_relation_prefetches(),
+        Prefetch("comments", queryset=comments, to_attr="latest_comments"),
+    )
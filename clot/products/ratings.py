@@ -0,0 +1,118 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import Product, ProductComment
+
+
+RATINGS = range(1, 6)
+HISTOGRAM_FIELDS = tuple(f"rating_{rating}" for rating in RATINGS)
+RATING_FIELDS = ("rating_count", "rating_sum", "rating_average") + HISTOGRAM_FIELDS
+
+
+def _average(count_delta, sum_delta):
+    # Every right-hand side of an UPDATE sees the row as it was, so this is
+    # the average after the counts in the same statement change.
+    return Case(
+        When(
+            rating_count__gt=-count_delta,
+            then=Cast(F("rating_sum") + sum_delta, FloatField())
+            / (F("rating_count") + count_delta),
+        ),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def adjust_ratings(deltas):
+    """
+    Applies ``{product_id: {rating: delta}}`` to the products' rating
+    aggregates, with one UPDATE of ``F()`` expressions per product so
+    concurrent comments never overwrite each other's counts.
+    """
+    for product_id, by_rating in deltas.items():
+        by_rating = {rating: delta for rating, delta in by_rating.items() if delta}
+        if not by_rating:
+            continue
+        count = sum(by_rating.values())
+        total = sum(rating * delta for rating, delta in by_rating.items())
+        Product.objects.filter(pk=product_id).update(
+            rating_count=F("rating_count") + count,
+            rating_sum=F("rating_sum") + total,
+            rating_average=_average(count, total),
+            **{
+                f"rating_{rating}": F(f"rating_{rating}") + delta
+                for rating, delta in by_rating.items()
+            },
+        )
+
+
+def comment_deltas(changes):
+    """
+    Folds ``(product_id, rating, delta)`` triples into the argument of
+    ``adjust_ratings``.
+    """
+    deltas = defaultdict(Counter)
+    for product_id, rating, delta in changes:
+        deltas[product_id][rating] += delta
+    return deltas
+
+
+def actual_ratings(product_ids):
+    """Aggregates computed from ``product_comment``, by product id."""
+    rows = (
+        ProductComment.objects.filter(product_id__in=product_ids)
+        .order_by()
+        .values("product_id")
+        .annotate(
+            rating_count=Count("pk"),
+            rating_sum=Sum("rating"),
+            **{
+                f"rating_{rating}": Count("pk", filter=Q(rating=rating))
+                for rating in RATINGS
+            },
+        )
+    )
+    return {row.pop("product_id"): row for row in rows}
+
+
+def reconcile_ratings(batch_size=500):
+    """
+    Recomputes the rating aggregates from the comments and corrects the
+    products that drifted. Returns the number of products corrected.
+
+    Each batch locks its product rows first: a comment written meanwhile
+    either is counted here or applies its ``F()`` update after the fix.
+    """
+    corrected = 0
+    last_pk = 0
+    empty = dict.fromkeys(("rating_count", "rating_sum") + HISTOGRAM_FIELDS, 0)
+    while True:
+        with transaction.atomic():
+            products = list(
+                Product.objects.select_for_update()
+                .filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", *RATING_FIELDS)[:batch_size]
+            )
+            if not products:
+                break
+            last_pk = products[-1].pk
+            actual = actual_ratings([product.pk for product in products])
+
+            drifted = []
+            for product in products:
+                values = actual.get(product.pk, empty)
+                count, total = values["rating_count"], values["rating_sum"]
+                values = {**values, "rating_average": total / count if count else 0}
+                if any(
+                    getattr(product, name) != value for name, value in values.items()
+                ):
+                    for name, value in values.items():
+                        setattr(product, name, value)
+                    drifted.append(product)
+            Product.objects.bulk_update(drifted, RATING_FIELDS)
+            corrected += len(drifted)
+    return corrected
@@ -0,0 +1,282 @@
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+
+SEARCH_TABLE = "product_search"
+# Related names that are part of a product's search document: Product M2M
+# field -> the related model's name field.
+SEARCH_RELATIONS = {"category": "name", "color": "color"}
+# Best matches returned per query, before search_products applies filters.
+MAX_CANDIDATES = 500
+BATCH_SIZE = 1000
+
+
+def _terms(query):
+    return re.findall(r"\w+", query or "")
+
+
+def product_documents(product_ids):
+    """
+    Yields ``(pk, title, description, categories, colors)`` for
+    ``product_ids``, with the related names joined by spaces.
+    """
+    names = {field: defaultdict(list) for field in SEARCH_RELATIONS}
+    for field, label in SEARCH_RELATIONS.items():
+        m2m = Product._meta.get_field(field)
+        rows = m2m.remote_field.through.objects.filter(product_id__in=product_ids)
+        related = f"{m2m.m2m_reverse_field_name()}__{label}"
+        for product_id, name in rows.values_list("product_id", related):
+            names[field][product_id].append(name)
+
+    products = Product.objects.filter(pk__in=product_ids).order_by()
+    for pk, title, description in products.values_list("pk", "title", "description"):
+        yield (
+            pk,
+            title,
+            description,
+            *(" ".join(names[field][pk]) for field in SEARCH_RELATIONS),
+        )
+
+
+class BaseSearchBackend:
+    """
+    Full-text search over products. ``search()`` returns product ids, best
+    match first; the last query term is matched as a prefix for type-ahead.
+    """
+
+    def index(self, product_ids):
+        """Brings the index up to date for ``product_ids``."""
+
+    def remove(self, product_id):
+        pass
+
+    def rebuild(self, batch_size=BATCH_SIZE):
+        """Recreates the whole index; returns the number of products indexed."""
+        return 0
+
+    def search(self, query, limit=MAX_CANDIDATES):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    An FTS5 table keyed by product id and ranked by BM25, with title matches
+    weighted above category and color names, and those above descriptions.
+    """
+
+    WEIGHTS = (10.0, 1.0, 4.0, 2.0)  # title, description, categories, colors
+
+    def create_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                "title, description, categories, colors, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+
+    def _insert(self, cursor, documents):
+        documents = list(documents)
+        if documents:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {SEARCH_TABLE} "
+                "(rowid, title, description, categories, colors) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                documents,
+            )
+        return len(documents)
+
+    def index(self, product_ids):
+        product_ids = list(product_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(product_ids), BATCH_SIZE):
+                batch = product_ids[start : start + BATCH_SIZE]
+                self._insert(cursor, product_documents(batch))
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [product_id])
+
+    def rebuild(self, batch_size=BATCH_SIZE):
+        self.create_index()
+        indexed = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            product_ids = Product.objects.order_by("pk").values_list("pk", flat=True)
+            batch = []
+            for product_id in product_ids.iterator(chunk_size=batch_size):
+                batch.append(product_id)
+                if len(batch) >= batch_size:
+                    indexed += self._insert(cursor, product_documents(batch))
+                    batch = []
+            indexed += self._insert(cursor, product_documents(batch))
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"
+            )
+        return indexed
+
+    @staticmethod
+    def match_expression(query):
+        # Every term must match; the last one as a prefix for type-ahead.
+        quoted = [f'"{term}"' for term in _terms(query)]
+        if quoted:
+            quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def search(self, query, limit=MAX_CANDIDATES):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        weights = ", ".join(str(weight) for weight in self.WEIGHTS)
+        with connection.cursor() as cursor:
+            # Every match is scored, so the cost of a very common term grows
+            # with the number of products containing it.
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s",
+                [expression, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL's own text search, computed from the product tables at query
+    time, so there is nothing to keep in sync. ``CONFIG`` is the text search
+    configuration. There is no index on the vector: each query builds it
+    for every product, which suits catalogs of moderate size.
+    """
+
+    def __init__(self, config="simple"):
+        self.config = config
+
+    def search(self, query, limit=MAX_CANDIDATES):
+        from django.contrib.postgres.aggregates import StringAgg
+        from django.contrib.postgres.search import (
+            SearchQuery,
+            SearchRank,
+            SearchVector,
+        )
+
+        terms = _terms(query)
+        if not terms:
+            return []
+        terms[-1] += ":*"
+        search_query = SearchQuery(
+            " & ".join(terms), search_type="raw", config=self.config
+        )
+        # The related names are aggregated, so each product is one row.
+        vector = (
+            SearchVector("title", weight="A", config=self.config)
+            + SearchVector(
+                StringAgg("category__name", " ", distinct=True),
+                weight="B",
+                config=self.config,
+            )
+            + SearchVector(
+                StringAgg("color__color", " ", distinct=True),
+                weight="C",
+                config=self.config,
+            )
+            + SearchVector("description", weight="D", config=self.config)
+        )
+        rows = (
+            Product.objects.annotate(document=vector)
+            .filter(document=search_query)
+            .annotate(rank=SearchRank(vector, search_query))
+            .order_by("-rank", "pk")
+            .values_list("pk", flat=True)
+        )
+        return list(rows[:limit])
+
+
+class BasicSearchBackend(BaseSearchBackend):
+    """``icontains`` matching for databases without full-text search."""
+
+    def search(self, query, limit=MAX_CANDIDATES):
+        terms = _terms(query)
+        if not terms:
+            return []
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(title__icontains=term)
+                | Q(description__icontains=term)
+                | Q(category__name__icontains=term)
+                | Q(color__color__icontains=term)
+            )
+        rows = Product.objects.filter(condition).order_by("-created_at", "-pk")
+        # Joining the M2M relations repeats a product once per related row.
+        return list(rows.values_list("pk", flat=True).distinct()[:limit])
+
+
+DEFAULT_BACKENDS = {
+    "sqlite": "products.search.SQLiteSearchBackend",
+    "postgresql": "products.search.PostgresSearchBackend",
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """
+    The backend named by ``PRODUCT_SEARCH['BACKEND']``, by default the
+    database's own full-text search.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = dict(getattr(settings, "PRODUCT_SEARCH", {}))
+                path = config.pop("BACKEND", None) or DEFAULT_BACKENDS.get(
+                    connection.vendor, "products.search.BasicSearchBackend"
+                )
+                _backend = import_string(path)(
+                    **{key.lower(): value for key, value in config.items()}
+                )
+    return _backend
+
+
+def reset_search_backend():
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+@receiver(setting_changed)
+def _reset_search_backend_on_setting_change(setting, **kwargs):
+    if setting == "PRODUCT_SEARCH":
+        reset_search_backend()
+
+
+def index_products(product_ids):
+    get_search_backend().index(product_ids)
+
+
+def unindex_product(product_id):
+    get_search_backend().remove(product_id)
+
+
+def search_products(query, queryset=None, limit=20):
+    """
+    Returns up to ``limit`` products of ``queryset`` matching ``query``,
+    best match first.
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    ranked = get_search_backend().search(query, limit=MAX_CANDIDATES)
+    if not ranked:
+        return []
+    matching = set(queryset.filter(pk__in=ranked).values_list("pk", flat=True))
+    top = [pk for pk in ranked if pk in matching][:limit]
+    products = queryset.in_bulk(top)
+    return [products[pk] for pk in top]
@@ -0,0 +1,144 @@
+from rest_framework import serializers
+
+from .models import (
+    Category,
+    Colors,
+    Images,
+    Product,
+    ProductComment,
+    Sizes,
+    StockReservation,
+)
+from .variants import variant_urls
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ["slug", "name"]
+
+
+class ColorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Colors
+        fields = ["slug", "color"]
+
+
+class SizeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Sizes
+        fields = ["slug", "size"]
+
+
+class ImageSerializer(serializers.ModelSerializer):
+    """
+    ``srcset`` lists WebP variants by width; variants not rendered yet point
+    at the view that renders them on first request.
+    """
+
+    srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Images
+        fields = ["slug", "title", "image", "srcset"]
+
+    def get_srcset(self, obj):
+        urls = variant_urls(obj.image, self.context.get("request"))
+        return ", ".join(f"{url} {width}w" for width, url in urls)
+
+
+class ProductCommentSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source="user.first_name")
+
+    class Meta:
+        model = ProductComment
+        fields = ["slug", "user", "content", "rating", "created_at"]
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """Expects products from ``queries.catalog_queryset()``."""
+
+    categories = CategorySerializer(source="category", many=True)
+    colors = ColorSerializer(source="color", many=True)
+    sizes = SizeSerializer(source="size", many=True)
+    images = ImageSerializer(source="image", many=True)
+    # Every comment carries a rating, so the two counts are the same.
+    comment_count = serializers.IntegerField(source="rating_count")
+    rating = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "slug",
+            "title",
+            "price",
+            "stock",
+            "categories",
+            "colors",
+            "sizes",
+            "images",
+            "comment_count",
+            "rating",
+            "created_at",
+        ]
+
+    def get_rating(self, obj):
+        return {"average": round(obj.rating_average, 2), "count": obj.rating_count}
+
+
+class ProductDetailSerializer(ProductListSerializer):
+    """Expects products from ``queries.product_detail_queryset()``."""
+
+    comments = ProductCommentSerializer(source="latest_comments", many=True)
+
+    class Meta(ProductListSerializer.Meta):
+        fields = ProductListSerializer.Meta.fields + [
+            "description",
+            "updated_at",
+            "comments",
+        ]
+
+    def get_rating(self, obj):
+        return {
+            **super().get_rating(obj),
+            "histogram": {
+                str(rating): getattr(obj, f"rating_{rating}") for rating in range(1, 6)
+            },
+        }
+
+
+class WishlistUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500
+    )
+
+
+class ReservationItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class StockReservationCreateSerializer(serializers.Serializer):
+    items = ReservationItemSerializer(many=True, allow_empty=False, max_length=50)
+
+    def validate_items(self, items):
+        """``{product_id: quantity}``, with repeated products added up."""
+        quantities = {}
+        for item in items:
+            quantities[item["id"]] = quantities.get(item["id"], 0) + item["quantity"]
+        return quantities
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    items = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StockReservation
+        fields = ["token", "status", "expires_at", "created_at", "items"]
+
+    def get_items(self, obj):
+        return [
+            {"id": item.product_id, "quantity": item.quantity}
+            for item in obj.items.all()
+        ]
@@ -0,0 +1,232 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from media.references import file_name, track_files
+
+from .caching import invalidate_catalog, touch_products
+from .facets import (
+    RELATIONS,
+    delete_product_facets,
+    related_product_ids,
+    save_product_facets,
+    update_product_facets,
+)
+from .models import (
+    Category,
+    Colors,
+    Images,
+    Product,
+    ProductComment,
+    Sizes,
+    Wishlist,
+)
+from .ratings import adjust_ratings, comment_deltas
+from .search import SEARCH_RELATIONS, index_products, unindex_product
+from .wishlists import WishlistItem, invalidate_wishlists
+
+
+track_files(Images, image=file_name)
+
+
+@receiver(post_save, sender=Product)
+def update_saved_product_facets(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"price", "stock"} & set(update_fields):
+        save_product_facets(instance)
+
+
+@receiver(post_delete, sender=Product)
+def mark_product_facets_deleted(sender, instance, **kwargs):
+    delete_product_facets(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"title", "description"} & set(update_fields):
+        index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_for_search(sender, instance, **kwargs):
+    unindex_product(instance.pk)
+
+
+@receiver(post_init, sender=ProductComment)
+def remember_rating(sender, instance, **kwargs):
+    instance._saved_rating = (
+        instance.__dict__.get("product_id"),
+        instance.__dict__.get("rating"),
+    )
+
+
+@receiver(post_save, sender=ProductComment)
+def count_saved_rating(sender, instance, created, **kwargs):
+    changes = [(instance.product_id, instance.rating, 1)]
+    if not created:
+        product_id, rating = instance._saved_rating
+        if rating is None:
+            # Loaded without its rating; reconcile_ratings covers the edit.
+            changes = []
+        else:
+            changes.append((product_id, rating, -1))
+    instance._saved_rating = (instance.product_id, instance.rating)
+    adjust_ratings(comment_deltas(changes))
+
+
+@receiver(post_delete, sender=ProductComment)
+def count_deleted_rating(sender, instance, **kwargs):
+    product_id, rating = instance._saved_rating
+    if rating is not None:
+        adjust_ratings(comment_deltas([(product_id, rating, -1)]))
+
+
+def _connect_relation(facet, model):
+    through = Product._meta.get_field(facet).remote_field.through
+    label = SEARCH_RELATIONS.get(facet)
+
+    def refresh(product_ids):
+        update_product_facets(product_ids, facets=[facet])
+        if label:
+            index_products(product_ids)
+
+    def relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+        if not reverse:
+            if action in ("post_add", "post_remove", "post_clear"):
+                refresh([instance.pk])
+            return
+        # Changed from the category/color/size side: pk_set holds products,
+        # except on clear, where they are collected beforehand.
+        if action == "pre_clear":
+            instance._related_products = related_product_ids(facet, instance.pk)
+        elif action in ("post_add", "post_remove"):
+            refresh(pk_set)
+        elif action == "post_clear":
+            refresh(instance._related_products)
+
+    def value_renamed(sender, instance, created=False, update_fields=None, **kwargs):
+        # Names are part of the search documents of the linked products.
+        if not label or created:
+            return
+        if update_fields is None or label in update_fields:
+            index_products(related_product_ids(facet, instance.pk))
+
+    def value_deleting(sender, instance, **kwargs):
+        instance._related_products = related_product_ids(facet, instance.pk)
+
+    def value_deleted(sender, instance, **kwargs):
+        refresh(instance._related_products)
+
+    uid = f"products.relations.{facet}"
+    m2m_changed.connect(relation_changed, sender=through, weak=False, dispatch_uid=uid)
+    post_save.connect(value_renamed, sender=model, weak=False, dispatch_uid=uid)
+    pre_delete.connect(value_deleting, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(value_deleted, sender=model, weak=False, dispatch_uid=uid)
+
+
+for facet, (_, model, _) in RELATIONS.items():
+    _connect_relation(facet, model)
+
+
+def invalidate_cached_catalog(sender, **kwargs):
+    invalidate_catalog()
+
+
+for model in (Product, Category, Colors, Sizes, Images, ProductComment):
+    uid = f"products.caching.{model.__name__}"
+    post_save.connect(invalidate_cached_catalog, sender=model, dispatch_uid=uid)
+    post_delete.connect(invalidate_cached_catalog, sender=model, dispatch_uid=uid)
+for field in ("category", "color", "size", "image"):
+    m2m_changed.connect(
+        invalidate_cached_catalog,
+        sender=Product._meta.get_field(field).remote_field.through,
+        dispatch_uid=f"products.caching.{field}",
+    )
+
+
+def _connect_detail_relation(field, model):
+    # Detail responses are validated by the product's updated_at, which a
+    # change to its links or to the linked names does not move by itself.
+    through = Product._meta.get_field(field).remote_field.through
+
+    def relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+        if not reverse:
+            if action in ("post_add", "post_remove", "post_clear"):
+                touch_products([instance.pk])
+        elif action == "pre_clear":
+            instance._detail_products = related_product_ids(field, instance.pk)
+        elif action in ("post_add", "post_remove"):
+            touch_products(pk_set)
+        elif action == "post_clear":
+            touch_products(instance._detail_products)
+
+    def value_saved(sender, instance, created, **kwargs):
+        if not created:
+            touch_products(related_product_ids(field, instance.pk))
+
+    def value_deleting(sender, instance, **kwargs):
+        instance._detail_products = related_product_ids(field, instance.pk)
+
+    def value_deleted(sender, instance, **kwargs):
+        touch_products(instance._detail_products)
+
+    uid = f"products.caching.detail.{field}"
+    m2m_changed.connect(relation_changed, sender=through, weak=False, dispatch_uid=uid)
+    post_save.connect(value_saved, sender=model, weak=False, dispatch_uid=uid)
+    pre_delete.connect(value_deleting, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(value_deleted, sender=model, weak=False, dispatch_uid=uid)
+
+
+for field, model in (
+    ("category", Category),
+    ("color", Colors),
+    ("size", Sizes),
+    ("image", Images),
+):
+    _connect_detail_relation(field, model)
+
+
+@receiver(post_save, sender=ProductComment)
+@receiver(post_delete, sender=ProductComment)
+def touch_commented_product(sender, instance, **kwargs):
+    touch_products([instance.product_id])
+
+
+@receiver(m2m_changed, sender=WishlistItem)
+def invalidate_changed_wishlists(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith("post_"):
+            invalidate_wishlists([instance.user_id])
+        return
+    # Changed from the product side: pk_set holds wishlists, except on clear.
+    if action == "pre_clear":
+        instance._wishlist_users = _wishlist_users(product=instance)
+    elif action == "post_clear":
+        invalidate_wishlists(instance._wishlist_users)
+    elif action in ("post_add", "post_remove"):
+        invalidate_wishlists(
+            Wishlist.objects.filter(pk__in=pk_set).values_list("user_id", flat=True)
+        )
+
+
+def _wishlist_users(**filters):
+    return list(
+        WishlistItem.objects.filter(**filters).values_list(
+            "wishlist__user_id", flat=True
+        )
+    )
+
+
+@receiver(pre_delete, sender=Product)
+def invalidate_wishlists_of_deleted_product(sender, instance, **kwargs):
+    # The cascade removes the through rows without m2m_changed.
+    invalidate_wishlists(_wishlist_users(product=instance))
+
+
+@receiver(post_delete, sender=Wishlist)
+def invalidate_deleted_wishlist(sender, instance, **kwargs):
+    invalidate_wishlists([instance.user_id])
@@ -1,6 +1,1044 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import User
+from clot.exports import stream_export
+from media.models import StoredFile
+
+from clot.slugs import allocate_slug, bulk_create_with_slugs
+
+from .caching import catalog_state, normalized_query
+from .exports import ProductExport
+from .facets import (
+    RELATIONS,
+    FacetIndex,
+    filter_products,
+    rebuild_product_facets,
+    reset_facet_index,
+)
+from .importer import CatalogImporter, parse_record, read_jsonl
+from .inventory import (
+    InsufficientStock,
+    ReservationNotActive,
+    commit_reservation,
+    release_reservation,
+    reserve_stock,
+    sweep_expired_reservations,
+)
+from .models import (
+    CatalogImport,
+    Category,
+    Colors,
+    Images,
+    Product,
+    ProductComment,
+    ProductFacets,
+    Sizes,
+    StockReservation,
+    Wishlist,
+)
+from .ratings import reconcile_ratings
+from .search import get_search_backend, reset_search_backend, search_products
+from .serializers import ImageSerializer
+from . import variants
+from .variants import ensure_variant, prune_variants, variant_path
+from .wishlists import wishlisted_ids
 
 
 class TestProduct(TestCase):
     def test_product(self):
         self.assertEqual(1, 1)
+
+
+class TestSlugAllocation(TestCase):
+    def test_repeated_names_get_increasing_suffixes(self):
+        slugs = [Category.objects.create(name="Summer Shirts").slug for _ in range(3)]
+        self.assertEqual(slugs, ["summer-shirts", "summer-shirts-1", "summer-shirts-2"])
+
+    def test_next_slug_is_found_in_one_query(self):
+        for _ in range(12):
+            Category.objects.create(name="Hoodies")
+        Category.objects.create(name="Hoodies Sale")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug(Category, "Hoodies"), "hoodies-12")
+
+    def test_batch_mode(self):
+        Category.objects.create(name="Shoes")
+        categories = bulk_create_with_slugs(
+            Category,
+            [Category(name="Shoes"), Category(name="Shoes"), Category(name="Hats")],
+            lambda category: category.name,
+        )
+        self.assertEqual(
+            [category.slug for category in categories], ["shoes-1", "shoes-2", "hats"]
+        )
+
+    def test_route_names_are_never_product_slugs(self):
+        product = Product.objects.create(title="Search", price=5, stock=1)
+        self.assertEqual(product.slug, "search-1")
+        products = bulk_create_with_slugs(
+            Product,
+            [Product(title=title, price=5, stock=1) for title in ("Export", "Export")],
+            lambda product: product.title,
+        )
+        self.assertEqual([p.slug for p in products], ["export-1", "export-2"])
+        response = self.client.get("/api/v1/products/search-1/")
+        self.assertEqual(response.json()["title"], "Search")
+
+    def test_save_retries_when_slug_is_taken(self):
+        Category.objects.create(name="Jackets")
+        # The first allocation loses the race to a concurrent insert.
+        with mock.patch(
+            "clot.slugs.allocate_slug", side_effect=["jackets", "jackets-1"]
+        ) as allocate:
+            category = Category.objects.create(name="Jackets")
+
+        self.assertEqual(allocate.call_count, 2)
+        self.assertEqual(category.slug, "jackets-1")
+
+
+def make_catalog(count):
+    categories = [Category.objects.create(name=name) for name in ("Shirts", "Jeans")]
+    colors = [Colors.objects.create(color=color) for color in ("Red", "Blue")]
+    sizes = [Sizes.objects.create(size=size) for size in ("S", "M", "L")]
+    user = User.objects.create_user(
+        phone_number="+998901234567", password="secret123", first_name="Ali"
+    )
+    products = []
+    for i in range(count):
+        product = Product.objects.create(
+            title=f"Product {i}", description="...", price=10 + i, stock=i % 3
+        )
+        product.category.set(categories[: i % 2 + 1])
+        product.color.set(colors)
+        product.size.set(sizes[: i % 3 + 1])
+        product.image.add(
+            Images.objects.create(title=f"Photo {i}", image=f"product/{i}.jpg")
+        )
+        ProductComment.objects.create(
+            product=product, user=user, content="Nice", rating=5
+        )
+        products.append(product)
+    return products
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class TestCatalogAPI(APITestCase):
+    def test_list_costs_the_same_for_any_page_size(self):
+        make_catalog(12)
+        # The page, then one query per relation: categories, colors, sizes, images.
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/v1/products/?page_size=2")
+        self.assertEqual(len(response.data["results"]), 2)
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/v1/products/?page_size=12")
+        self.assertEqual(len(response.data["results"]), 12)
+
+        product = response.data["results"][0]
+        self.assertEqual(product["title"], "Product 11")
+        self.assertEqual(len(product["categories"]), 2)
+        self.assertEqual(len(product["sizes"]), 3)
+        self.assertEqual(product["comment_count"], 1)
+        self.assertTrue(product["images"][0]["image"].endswith("product/11.jpg"))
+
+    def test_list_orders_by_price_across_pages(self):
+        make_catalog(5)
+        response = self.client.get("/api/v1/products/?ordering=price&page_size=3")
+        prices = [item["price"] for item in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        prices += [item["price"] for item in response.data["results"]]
+        self.assertEqual(prices, ["10.00", "11.00", "12.00", "13.00", "14.00"])
+
+    def test_detail_includes_comments_in_constant_queries(self):
+        product = make_catalog(2)[0]
+        # Product, four relations, comments with their users.
+        with self.assertNumQueries(6):
+            response = self.client.get(f"/api/v1/products/{product.slug}/")
+        self.assertEqual(response.data["description"], "...")
+        self.assertEqual(response.data["comments"][0]["user"], "Ali")
+
+        response = self.client.get("/api/v1/products/missing/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_comments_page_through_ties_on_created_at(self):
+        product = make_catalog(1)[0]
+        user = User.objects.get()
+        ProductComment.objects.bulk_create(
+            ProductComment(product=product, user=user, content=str(i), rating=4)
+            for i in range(4)
+        )
+        ProductComment.objects.update(created_at=timezone.now())
+        expected = list(
+            ProductComment.objects.order_by("-id").values_list("content", flat=True)
+        )
+
+        url = f"/api/v1/products/{product.slug}/comments/?page_size=2"
+        contents = []
+        while url:
+            # The product, then the page of comments with their users.
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            contents += [comment["content"] for comment in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(contents, expected)
+
+        response = self.client.get("/api/v1/products/missing/comments/")
+        self.assertEqual(response.status_code, 404)
+
+
+def naive_counts(filters, price_step=50):
+    """Facet counts the slow way: one query per facet over the M2M tables."""
+
+    def matching(excluded):
+        remaining = {
+            key: value for key, value in filters.items() if key not in excluded
+        }
+        return filter_products(Product.objects.all(), remaining)
+
+    facets = {}
+    for facet in RELATIONS:
+        field = Product._meta.get_field(facet)
+        rows = field.remote_field.through.objects.filter(
+            **{f"{field.m2m_field_name()}__in": matching({facet})}
+        )
+        facets[facet] = dict(
+            Counter(rows.values_list(f"{field.m2m_reverse_field_name()}_id", flat=True))
+        )
+    facets["in_stock"] = dict(
+        Counter(
+            stock > 0
+            for stock in matching({"in_stock"}).values_list("stock", flat=True)
+        )
+    )
+    facets["price"] = dict(
+        Counter(
+            int(price // price_step)
+            for price in matching({"min_price", "max_price"}).values_list(
+                "price", flat=True
+            )
+        )
+    )
+    return {"total": matching(set()).count(), "facets": facets}
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class TestFacets(APITestCase):
+    def setUp(self):
+        reset_facet_index()
+        self.products = make_catalog(12)
+        for i, product in enumerate(self.products):
+            product.price = 25 * i
+            product.save()
+        self.shirts, self.jeans = Category.objects.order_by("pk")
+        self.red, self.blue = Colors.objects.order_by("pk")
+        self.small, self.medium, self.large = Sizes.objects.order_by("pk")
+
+    def filter_sets(self):
+        return [
+            {},
+            {"category": {self.jeans.pk}},
+            {"category": {self.jeans.pk}, "size": {self.large.pk, self.medium.pk}},
+            {"in_stock": True, "min_price": Decimal(40), "max_price": Decimal(130)},
+            {"color": {self.red.pk}, "in_stock": False, "max_price": Decimal(75)},
+            {"category": set()},
+        ]
+
+    def assertMatchesNaive(self, index):
+        for filters in self.filter_sets():
+            with self.subTest(filters=filters):
+                self.assertEqual(index.counts(filters), naive_counts(filters))
+
+    def test_counts_match_group_by_queries(self):
+        index = FacetIndex()
+        self.assertMatchesNaive(index)
+        with self.assertNumQueries(0):
+            index.counts({"category": {self.jeans.pk}})
+
+    def test_index_follows_saves_relation_changes_and_deletes(self):
+        index = FacetIndex()
+        index.sync()
+
+        first, second, third = self.products[:3]
+        first.stock = 0
+        first.price = 149
+        first.save()
+        second.category.remove(self.shirts)
+        self.jeans.products.add(third)
+        self.large.sizes.clear()
+        self.products[4].delete()
+        self.blue.delete()
+        Product.objects.create(title="New", description=".", price=5, stock=1)
+
+        index.sync(force=True)
+        self.assertEqual(index.size, Product.objects.count())
+        self.assertMatchesNaive(index)
+        self.assertEqual(index.stats["loads"], 1)
+
+    def test_rebuild_drops_tombstones(self):
+        self.products[0].delete()
+        self.assertTrue(ProductFacets.objects.filter(deleted=True).exists())
+
+        self.assertEqual(rebuild_product_facets(), 11)
+        self.assertFalse(ProductFacets.objects.filter(deleted=True).exists())
+        self.assertMatchesNaive(FacetIndex())
+
+    def test_facets_endpoint_and_filtered_list_agree(self):
+        query = f"category={self.jeans.slug}&in_stock=1&max_price=200"
+        response = self.client.get(f"/api/v1/products/facets/?{query}")
+        facets = response.data["facets"]
+
+        category = {item["slug"]: item for item in facets["category"]}
+        self.assertTrue(category[self.jeans.slug]["selected"])
+        self.assertFalse(category[self.shirts.slug]["selected"])
+        self.assertEqual(facets["price"][0], {"min": 0, "max": 50, "count": 1})
+
+        listed = self.client.get(f"/api/v1/products/?{query}&page_size=100")
+        self.assertEqual(len(listed.data["results"]), response.data["total"])
+        self.assertEqual(response.data["total"], 3)
+
+        response = self.client.get("/api/v1/products/?min_price=abc")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestProductSearch(APITestCase):
+    def setUp(self):
+        reset_search_backend()
+        self.jeans = Category.objects.create(name="Jeans")
+        self.jackets = Category.objects.create(name="Jackets")
+        self.blue = Colors.objects.create(color="Blue")
+        self.red = Colors.objects.create(color="Red")
+        self.slim = self.create("Slim denim jeans", "Stretch cotton", self.jeans)
+        self.jacket = self.create("Denim jacket", "Boxy fit", self.jackets, self.blue)
+        self.shirt = self.create("Cotton shirt", "Goes with denim", None, self.red)
+
+    @staticmethod
+    def create(title, description, category, color=None):
+        product = Product.objects.create(
+            title=title, description=description, price=20, stock=1
+        )
+        if category:
+            product.category.add(category)
+        if color:
+            product.color.add(color)
+        return product
+
+    def test_ranks_title_matches_first_and_matches_prefixes(self):
+        results = search_products("denim")
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[-1], self.shirt)
+        self.assertEqual(search_products("DEN"), results)
+        self.assertEqual(search_products("denim jack"), [self.jacket])
+        self.assertEqual(search_products("blue"), [self.jacket])
+        self.assertEqual(search_products("   "), [])
+
+    def test_ranks_every_match(self):
+        for i in range(50):
+            self.create(f"Shirt {i}", "Linen blend", None)
+        best = self.create("Linen shirt", "Linen blend", None)
+        self.assertEqual(get_search_backend().search("linen", limit=1), [best.pk])
+
+    def test_index_follows_relation_and_name_changes(self):
+        self.jeans.products.add(self.shirt)
+        self.assertEqual(set(search_products("jeans")), {self.slim, self.shirt})
+        self.red.color = "Crimson"
+        self.red.save()
+        self.assertEqual(search_products("crims"), [self.shirt])
+        self.assertEqual(search_products("red"), [])
+
+        self.jackets.delete()
+        self.assertEqual(search_products("jackets"), [])
+        self.shirt.delete()
+        self.assertEqual(search_products("cotton"), [self.slim])
+
+    def test_rebuild_command(self):
+        out = io.StringIO()
+        call_command("rebuild_product_search", stdout=out)
+        self.assertIn("Indexed 3 products", out.getvalue())
+        self.assertEqual(search_products("jacket"), [self.jacket])
+
+    def test_search_endpoint_applies_filters(self):
+        response = self.client.get("/api/v1/products/search/?q=den&limit=10")
+        self.assertEqual(len(response.data["results"]), 3)
+        response = self.client.get(
+            f"/api/v1/products/search/?q=den&category={self.jeans.slug}"
+        )
+        self.assertEqual(
+            [product["title"] for product in response.data["results"]],
+            ["Slim denim jeans"],
+        )
+
+    @override_settings(PRODUCT_SEARCH={"BACKEND": "products.search.BasicSearchBackend"})
+    def test_basic_backend_fallback(self):
+        self.assertEqual(search_products("denim jack"), [self.jacket])
+        self.assertEqual(set(search_products("cotton")), {self.slim, self.shirt})
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    CATALOG_CACHE={"ENABLED": True},
+)
+class TestCatalogCache(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(3)
+
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.client.get("/api/v1/products/?category=jeans,shirts")
+        self.assertEqual(first["Cache-Control"], "public, no-cache")
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/v1/products/?category=shirts,jeans&size=")
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(again.content, first.content)
+
+    def test_conditional_requests_get_304(self):
+        response = self.client.get(f"/api/v1/products/{self.products[0].slug}/")
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        url = f"/api/v1/products/{self.products[0].slug}/"
+
+        # Only the product's updated_at is read.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate(self):
+        product = self.products[0]
+        url = f"/api/v1/products/{product.slug}/"
+        etag = self.client.get(url)["ETag"]
+
+        product.price = 99
+        product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["price"], "99.00")
+
+        etag = response["ETag"]
+        product.size.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["sizes"], [])
+
+    def test_changes_shown_on_details_invalidate_them(self):
+        product = self.products[0]
+        url = f"/api/v1/products/{product.slug}/"
+        etag = self.client.get(url)["ETag"]
+
+        Category.objects.filter(name="Shirts").update(name="Tops")
+        Category.objects.get(name="Tops").save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["categories"][0]["name"], "Tops")
+
+        etag = response["ETag"]
+        ProductComment.objects.create(
+            product=product, user=User.objects.get(), content="Great", rating=4
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["comments"][0]["content"], "Great")
+
+    def test_a_product_change_leaves_other_details_valid(self):
+        reserved, other = self.products[2], self.products[1]
+        urls = [f"/api/v1/products/{p.slug}/" for p in (reserved, other)]
+        etags = [self.client.get(url)["ETag"] for url in urls]
+        list_etag = self.client.get("/api/v1/products/")["ETag"]
+
+        reserve_stock({reserved.pk: 1})
+        response = self.client.get(urls[0], HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["stock"], 1)
+        response = self.client.get(urls[1], HTTP_IF_NONE_MATCH=etags[1])
+        self.assertEqual(response.status_code, 304)
+        # Lists show the stock of every product.
+        response = self.client.get("/api/v1/products/", HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_catalog_version_outlives_the_response_ttl(self):
+        state = catalog_state()
+        with mock.patch("time.time", return_value=time.time() + 3600):
+            self.assertEqual(catalog_state(), state)
+
+    def test_lost_version_is_dated_now(self):
+        url = "/api/v1/products/"
+        last_modified = self.client.get(url)["Last-Modified"]
+        self.products[0].delete()
+        cache.clear()
+
+        later = timezone.now() + timedelta(seconds=5)
+        with mock.patch("products.caching.timezone.now", return_value=later):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_errors_and_disabled_cache_carry_no_validators(self):
+        response = self.client.get("/api/v1/products/missing/")
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response)
+        with self.settings(CATALOG_CACHE={"ENABLED": False}):
+            response = self.client.get("/api/v1/products/")
+        self.assertNotIn("ETag", response)
+
+    def test_normalized_query(self):
+        self.assertEqual(
+            normalized_query(QueryDict("size=m,s&color=&category=b&category=a")),
+            "category=a&category=b&size=m&size=s",
+        )
+
+
+def make_upload(size=(400, 300), content=None):
+    if content is None:
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "red").save(buffer, "JPEG")
+        content = buffer.getvalue()
+    return SimpleUploadedFile("photo.jpg", content, "image/jpeg")
+
+
+@override_settings(
+    IMAGE_PROCESSING={"EAGER": True},
+    PRODUCT_IMAGES={"WIDTHS": (160, 320, 640), "FORMAT": "webp"},
+)
+class TestImageVariants(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.photo = Images.objects.create(title="Front", image=make_upload())
+        self.name = self.photo.image.name
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def variant_url(self, width, name=None):
+        return f"/api/v1/products/images/{width}/{name or self.name}"
+
+    def test_variants_are_rendered_once_and_then_linked_directly(self):
+        srcset = ImageSerializer(self.photo).data["srcset"]
+        self.assertIn(f"{self.variant_url(160)} 160w", srcset)
+        self.assertEqual(srcset.count("w, "), 2)
+
+        response = self.client.get(self.variant_url(160))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("immutable", response["Cache-Control"])
+        path = self.photo.image.storage.path(variant_path(self.name, 160))
+        with Image.open(path) as variant:
+            self.assertEqual((variant.format, variant.size), ("WEBP", (160, 120)))
+
+        # Wider than the source: not upscaled.
+        self.client.get(self.variant_url(640))
+        with Image.open(path.replace("_w160", "_w640")) as variant:
+            self.assertEqual(variant.size, (400, 300))
+
+        srcset = ImageSerializer(self.photo).data["srcset"]
+        self.assertIn(f"{variant_path(self.name, 160)} 160w", srcset)
+        self.assertIn(f"{self.variant_url(320)} 320w", srcset)
+
+    def test_rejects_unknown_widths_and_files(self):
+        self.assertEqual(self.client.get(self.variant_url(100)).status_code, 404)
+        missing = "product/00/missing.jpg"
+        self.assertEqual(
+            self.client.get(self.variant_url(160, missing)).status_code, 404
+        )
+        other = "profile_pictures/00/someone.jpg"
+        self.assertEqual(self.client.get(self.variant_url(160, other)).status_code, 404)
+
+    @override_settings(IMAGE_PROCESSING={"WORKERS": 2})
+    def test_unreadable_source_falls_back_to_original(self):
+        broken = Images.objects.create(
+            title="Broken", image=make_upload(content=b"not an image")
+        )
+        with self.assertLogs("products.variants", "ERROR") as logs:
+            response = self.client.get(self.variant_url(160, broken.image.name))
+        self.assertIn(variant_path(broken.image.name, 160), logs.output[0])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], broken.image.url)
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+    @override_settings(IMAGE_PROCESSING={"WORKERS": 2})
+    def test_concurrent_requests_share_one_render(self):
+        release = threading.Event()
+        calls = []
+        render = variants._render
+
+        def slow_render(*args):
+            calls.append(args)
+            release.wait(5)
+            render(*args)
+
+        with mock.patch("products.variants._render", side_effect=slow_render):
+            self.assertIsNone(ensure_variant(self.name, 160, timeout=0.05))
+            self.assertIsNone(ensure_variant(self.name, 160, timeout=0.05))
+            release.set()
+            self.assertEqual(
+                ensure_variant(self.name, 160), variant_path(self.name, 160)
+            )
+        self.assertEqual(len(calls), 1)
+
+    def test_prune_removes_variants_of_collected_sources(self):
+        ensure_variant(self.name, 160)
+        ensure_variant(self.name, 320)
+        self.assertEqual(prune_variants(), 0)
+
+        StoredFile.objects.filter(name=self.name).delete()
+        self.assertEqual(prune_variants(dry_run=True), 2)
+        out = io.StringIO()
+        call_command("prune_image_variants", stdout=out)
+        self.assertIn("Removed 2 variants", out.getvalue())
+        path = self.photo.image.storage.path(variant_path(self.name, 160))
+        self.assertFalse(os.path.exists(path))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class TestRatings(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number="+998901234567", password="secret123", first_name="Ali"
+        )
+        self.first, self.second = (
+            Product.objects.create(title=title, description=".", price=10, stock=1)
+            for title in ("First", "Second")
+        )
+
+    def comment(self, product, rating):
+        return ProductComment.objects.create(
+            product=product, user=self.user, content="...", rating=rating
+        )
+
+    def assertRatings(self, product, count, total, histogram):
+        product.refresh_from_db()
+        self.assertEqual((product.rating_count, product.rating_sum), (count, total))
+        self.assertEqual(
+            [getattr(product, f"rating_{rating}") for rating in range(1, 6)],
+            histogram,
+        )
+        self.assertEqual(product.rating_average, total / count if count else 0)
+
+    def test_aggregates_follow_comment_changes(self):
+        comment = self.comment(self.first, 5)
+        self.comment(self.first, 4)
+        self.assertRatings(self.first, 2, 9, [0, 0, 0, 1, 1])
+
+        comment.rating = 2
+        comment.save()
+        self.assertRatings(self.first, 2, 6, [0, 1, 0, 1, 0])
+
+        comment.product = self.second
+        comment.save()
+        self.assertRatings(self.first, 1, 4, [0, 0, 0, 1, 0])
+        self.assertRatings(self.second, 1, 2, [0, 1, 0, 0, 0])
+
+        ProductComment.objects.get(pk=comment.pk).delete()
+        self.assertRatings(self.second, 0, 0, [0, 0, 0, 0, 0])
+
+    def test_reconcile_repairs_drift(self):
+        self.comment(self.first, 3)
+        self.comment(self.second, 1)
+        ProductComment.objects.filter(product=self.second).update(rating=5)
+        Product.objects.filter(pk=self.first.pk).update(rating_count=7)
+
+        out = io.StringIO()
+        call_command("reconcile_ratings", "--batch-size=1", stdout=out)
+        self.assertIn("Corrected 2 products", out.getvalue())
+        self.assertRatings(self.first, 1, 3, [0, 0, 1, 0, 0])
+        self.assertRatings(self.second, 1, 5, [0, 0, 0, 0, 1])
+        self.assertEqual(reconcile_ratings(), 0)
+
+    def test_catalog_sorts_by_rating(self):
+        self.comment(self.first, 2)
+        self.comment(self.second, 4)
+        self.comment(self.second, 5)
+
+        response = self.client.get("/api/v1/products/?ordering=-rating_average")
+        results = response.data["results"]
+        self.assertEqual([product["title"] for product in results], ["Second", "First"])
+        self.assertEqual(results[0]["rating"], {"average": 4.5, "count": 2})
+
+        response = self.client.get(f"/api/v1/products/{self.second.slug}/")
+        self.assertEqual(
+            response.data["rating"]["histogram"],
+            {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1},
+        )
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class TestWishlist(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(4)
+        self.user = User.objects.get()
+        self.client.force_authenticate(self.user)
+        self.ids = [product.pk for product in self.products]
+
+    def contains(self, ids):
+        query = ",".join(str(pk) for pk in ids)
+        return self.client.get(f"/api/v1/products/wishlist/contains/?ids={query}")
+
+    def test_bulk_add_remove_and_list(self):
+        response = self.client.post(
+            "/api/v1/products/wishlist/", {"ids": self.ids[:3] + [999]}, format="json"
+        )
+        self.assertEqual(response.data["added"], self.ids[:3])
+        response = self.client.delete(
+            "/api/v1/products/wishlist/", {"ids": [self.ids[0]]}, format="json"
+        )
+        self.assertEqual(response.data["removed"], 1)
+
+        response = self.client.get("/api/v1/products/wishlist/")
+        self.assertEqual(
+            {product["id"] for product in response.data["results"]}, set(self.ids[1:3])
+        )
+        response = self.client.post(
+            "/api/v1/products/wishlist/", {"ids": []}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_membership_is_one_query_then_cached(self):
+        self.client.post(
+            "/api/v1/products/wishlist/", {"ids": self.ids[:2]}, format="json"
+        )
+        with self.assertNumQueries(1):
+            response = self.contains(self.ids)
+        self.assertEqual(response.data["wishlisted"], self.ids[:2])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.contains(self.ids[1:]).data["wishlisted"], self.ids[1:2]
+            )
+
+        self.client.delete(
+            "/api/v1/products/wishlist/", {"ids": self.ids[:1]}, format="json"
+        )
+        self.assertEqual(self.contains(self.ids).data["wishlisted"], self.ids[1:2])
+        self.assertEqual(self.contains(["x"]).status_code, 400)
+
+    def test_cache_follows_changes_from_either_side(self):
+        wishlist = Wishlist.objects.create(user=self.user)
+        wishlist.products.add(self.products[0])
+        self.assertEqual(wishlisted_ids(self.user.pk), {self.ids[0]})
+
+        self.products[1].wishlist_set.add(wishlist)
+        self.assertEqual(wishlisted_ids(self.user.pk), set(self.ids[:2]))
+        self.products[1].wishlist_set.clear()
+        self.assertEqual(wishlisted_ids(self.user.pk), {self.ids[0]})
+        self.products[0].delete()
+        self.assertEqual(wishlisted_ids(self.user.pk), set())
+
+        wishlist.products.add(self.products[2])
+        wishlist.delete()
+        self.assertEqual(wishlisted_ids(self.user.pk), set())
+        with self.assertNumQueries(0):
+            str(wishlist)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.contains(self.ids).status_code, 401)
+
+
+class TestStockReservations(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(3)
+        Product.objects.update(stock=2)
+        rebuild_product_facets()
+        self.user = User.objects.get()
+        self.client.force_authenticate(self.user)
+        self.a, self.b, self.c = (product.pk for product in self.products)
+
+    def stock(self):
+        return dict(Product.objects.values_list("pk", "stock"))
+
+    def test_reserves_all_or_nothing(self):
+        reservation = reserve_stock({self.a: 2, self.b: 1}, user=self.user)
+        self.assertEqual(self.stock(), {self.a: 0, self.b: 1, self.c: 2})
+        self.assertEqual(reservation.items.count(), 2)
+
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock({self.a: 1, self.b: 1, self.c: 1})
+        self.assertEqual(raised.exception.product_ids, [self.a])
+        self.assertEqual(self.stock(), {self.a: 0, self.b: 1, self.c: 2})
+        with self.assertRaises(ValueError):
+            reserve_stock({self.c: 0})
+
+    def test_release_commit_and_expiry(self):
+        released = reserve_stock({self.a: 1})
+        committed = reserve_stock({self.a: 1, self.b: 2})
+        expired = reserve_stock({self.c: 2}, ttl=0)
+        self.assertEqual(self.stock(), {self.a: 0, self.b: 0, self.c: 0})
+
+        release_reservation(released)
+        commit_reservation(committed)
+        with self.assertRaises(ReservationNotActive):
+            release_reservation(committed)
+        with self.assertRaises(ReservationNotActive):
+            commit_reservation(expired)
+
+        self.assertEqual(sweep_expired_reservations(), 1)
+        self.assertEqual(sweep_expired_reservations(), 0)
+        self.assertEqual(self.stock(), {self.a: 1, self.b: 0, self.c: 2})
+        self.assertEqual(
+            dict(StockReservation.objects.values_list("pk", "status")),
+            {
+                released.pk: StockReservation.RELEASED,
+                committed.pk: StockReservation.COMMITTED,
+                expired.pk: StockReservation.EXPIRED,
+            },
+        )
+
+    def test_keeps_facets_and_catalog_cache_current(self):
+        version = catalog_state()["version"]
+        reservation = reserve_stock({self.a: 2, self.b: 1})
+        self.assertNotEqual(catalog_state()["version"], version)
+        self.assertEqual(
+            dict(ProductFacets.objects.values_list("product_id", "in_stock")),
+            {self.a: False, self.b: True, self.c: True},
+        )
+        release_reservation(reservation)
+        self.assertTrue(ProductFacets.objects.get(product_id=self.a).in_stock)
+
+    def test_api(self):
+        url = "/api/v1/products/reservations/"
+        items = [{"id": self.a, "quantity": 1}, {"id": self.a, "quantity": 1}]
+        response = self.client.post(url, {"items": items}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["items"], [{"id": self.a, "quantity": 2}])
+        detail = f"{url}{response.data['token']}/"
+
+        response = self.client.post(
+            url, {"items": [{"id": self.a, "quantity": 1}]}, format="json"
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["products"], [self.a])
+        response = self.client.post(url, {"items": []}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.client.get(detail).data["status"], "active")
+        self.assertEqual(self.client.delete(detail).status_code, 204)
+        self.assertEqual(self.client.delete(detail).status_code, 409)
+        self.assertEqual(self.stock()[self.a], 2)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(detail).status_code, 401)
+
+
+class TestCatalogImport(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shirts = Category.objects.create(name="Shirts")
+        self.photo = Images.objects.create(title="Front", image="product/front.jpg")
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def import_catalog(self, path, **options):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("import_catalog", path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv(self):
+        path = self.write(
+            "catalog.csv",
+            "title,description,price,stock,categories,colors,sizes,images\n"
+            "Linen shirt,Light,19.90,3,shirts|Summer,Red,S|M,Front|Back\n"
+            "Linen shirt,,25,0,Summer,red|Blue,,\n"
+            "Broken,,free,1,,,,\n",
+        )
+        stdout, stderr = self.import_catalog(path, batch_size=2)
+        self.assertIn("Imported 2 products, skipped 1 records, 1 unknown", stdout)
+        self.assertIn("line 4: invalid price", stderr)
+
+        first, second = Product.objects.order_by("pk")
+        self.assertEqual((first.slug, second.slug), ("linen-shirt", "linen-shirt-1"))
+        self.assertEqual(first.price, Decimal("19.90"))
+        self.assertEqual(
+            set(first.category.values_list("name", flat=True)), {"Shirts", "Summer"}
+        )
+        self.assertEqual(list(first.image.all()), [self.photo])
+        self.assertEqual(
+            set(second.color.values_list("color", flat=True)), {"Red", "Blue"}
+        )
+        self.assertEqual(Category.objects.filter(name="Summer").count(), 1)
+        self.assertEqual(
+            dict(ProductFacets.objects.values_list("product_id", "in_stock")),
+            {first.pk: True, second.pk: False},
+        )
+        self.assertEqual(set(search_products("linen")), {first, second})
+
+    def test_jsonl_resumes_after_failure(self):
+        lines = [
+            json.dumps({"title": f"Hoodie {i}", "price": 30, "sizes": ["L", "XL"]})
+            for i in range(5)
+        ]
+        path = self.write("catalog.jsonl", "\n".join(lines) + "\n\n{oops\n")
+        calls = []
+
+        def index_once(product_ids):
+            calls.append(product_ids)
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+
+        with mock.patch("products.importer.index_products", index_once):
+            with self.assertRaisesMessage(CommandError, "after 2 records"):
+                self.import_catalog(path, batch_size=2)
+        self.assertEqual(Product.objects.count(), 2)
+
+        stdout, stderr = self.import_catalog(path, batch_size=2, resume=True)
+        self.assertIn("Imported 5 products, skipped 1 records", stdout)
+        self.assertIn("line 7", stderr)
+        self.assertEqual(
+            sorted(Product.objects.values_list("title", flat=True)),
+            [f"Hoodie {i}" for i in range(5)],
+        )
+        self.assertEqual(Product.size.through.objects.count(), 10)
+        self.assertIsNotNone(CatalogImport.objects.get().finished_at)
+
+        # Resuming a finished import has nothing left to do.
+        self.import_catalog(path, resume=True)
+        self.assertEqual(Product.objects.count(), 5)
+
+    def test_rejects_non_numeric_prices_and_fractional_stock(self):
+        for price in ("NaN", "-nan", "sNaN", "Infinity", None):
+            with self.assertRaisesMessage(ValueError, "invalid price"):
+                parse_record({"title": "Cap", "price": price})
+        for stock in (2.9, "2.9", "many", float("inf"), [1], 10**20):
+            with self.assertRaisesRegex(ValueError, "invalid stock|out of range"):
+                parse_record({"title": "Cap", "price": 5, "stock": stock})
+        self.assertEqual(
+            parse_record({"title": "Cap", "price": 5, "stock": 2.0})["stock"], 2
+        )
+
+        records = read_jsonl(
+            ['{"title": "Cap", "price": "NaN"}', '{"title": "Hat", "price": 5}']
+        )
+        progress = CatalogImporter("caps").run(records)
+        self.assertEqual((progress.imported, progress.skipped), (1, 1))
+
+    def test_rejects_batch_sizes_below_one(self):
+        path = self.write("catalog.jsonl", '{"title": "Cap", "price": 5}\n')
+        for batch_size in (0, -1):
+            with self.assertRaisesMessage(CommandError, "--batch-size"):
+                self.import_catalog(path, batch_size=batch_size)
+        self.assertFalse(CatalogImport.objects.exists())
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        Colors.objects.create(color="Red")
+
+        def run(count):
+            records = read_jsonl(
+                json.dumps({"title": f"Cap {count}-{i}", "price": 5, "colors": ["Red"]})
+                for i in range(count)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                CatalogImporter(f"caps-{count}", batch_size=100).run(records)
+            return len(queries)
+
+        self.assertEqual(run(10), run(60))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class TestExports(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(3)
+        self.staff = User.objects.create_user(
+            phone_number="+998900000000",
+            password="secret123",
+            first_name="Staff",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.staff)
+
+    def download(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_ndjson_with_related_names(self):
+        lines = self.download("/api/v1/products/export/").splitlines()
+        products = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [product["id"] for product in products], [p.pk for p in self.products]
+        )
+        self.assertEqual(products[1]["categories"], ["Shirts", "Jeans"])
+        self.assertEqual(products[1]["sizes"], ["S", "M"])
+        self.assertEqual(products[1]["images"], ["Photo 1"])
+        self.assertEqual(products[1]["price"], "11.00")
+
+    def test_gzipped_csv_imports_back(self):
+        content = self.download("/api/v1/products/export/?output=csv&gzip=1")
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(content).decode())))
+        self.assertEqual(rows[1]["categories"], "Shirts|Jeans")
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "products.csv.gz")
+        with open(path, "wb") as f:
+            f.write(content)
+        call_command("import_catalog", path, stdout=io.StringIO())
+        copy = Product.objects.get(slug=f"{self.products[1].slug}-1")
+        self.assertEqual(
+            list(copy.category.values_list("name", flat=True)), ["Shirts", "Jeans"]
+        )
+        self.assertEqual(list(copy.image.all()), list(self.products[1].image.all()))
+
+    async def test_streams_piece_by_piece_under_asgi(self):
+        token = await sync_to_async(AccessToken.for_user)(self.staff)
+        with mock.patch("clot.exports.BUFFER_SIZE", 100):
+            response = await self.async_client.get(
+                "/api/v1/products/export/", headers={"Authorization": f"Bearer {token}"}
+            )
+            self.assertTrue(response.is_async)
+            pieces = [piece async for piece in response]
+        self.assertGreater(len(pieces), 1)
+        lines = b"".join(pieces).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])["id"], self.products[0].pk)
+
+    def test_queries_per_chunk(self):
+        # The products in one query read in chunks, then one query per
+        # relation for each chunk of two.
+        with self.assertNumQueries(1 + 4 * 2):
+            b"".join(stream_export(ProductExport(chunk_size=2)))
+
+    def test_comments_and_errors(self):
+        content = self.download("/api/v1/products/comments/export/?output=csv")
+        header, *rows = content.decode().splitlines()
+        self.assertTrue(header.endswith(",product_slug"))
+        self.assertEqual(len(rows), 3)
+
+        self.assertEqual(
+            self.client.get("/api/v1/products/export/?output=xml").status_code, 400
+        )
+        self.client.force_authenticate(User.objects.get(first_name="Ali"))
+        self.assertEqual(self.client.get("/api/v1/products/export/").status_code, 403)
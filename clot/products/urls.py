@@ -1,4 +1,48 @@
 from django.urls import path
 
+from .views import (
+    CommentExportView,
+    ProductCommentListView,
+    ImageVariantView,
+    ProductDetailView,
+    ProductExportView,
+    ProductFacetsView,
+    ProductListView,
+    ProductSearchView,
+    StockReservationDetailView,
+    StockReservationView,
+    WishlistMembershipView,
+    WishlistView,
+)
 
-urlpatterns = []
+
+urlpatterns = [
+    path("", ProductListView.as_view(), name="product-list"),
+    path("facets/", ProductFacetsView.as_view(), name="product-facets"),
+    path("search/", ProductSearchView.as_view(), name="product-search"),
+    path("export/", ProductExportView.as_view(), name="product-export"),
+    path("comments/export/", CommentExportView.as_view(), name="comment-export"),
+    path("reservations/", StockReservationView.as_view(), name="stock-reservations"),
+    path(
+        "reservations/<uuid:token>/",
+        StockReservationDetailView.as_view(),
+        name="stock-reservation-detail",
+    ),
+    path("wishlist/", WishlistView.as_view(), name="wishlist"),
+    path(
+        "wishlist/contains/",
+        WishlistMembershipView.as_view(),
+        name="wishlist-contains",
+    ),
+    path(
+        "images/<int:width>/<path:name>",
+        ImageVariantView.as_view(),
+        name="product-image-variant",
+    ),
+    path("<str:slug>/", ProductDetailView.as_view(), name="product-detail"),
+    path(
+        "<str:slug>/comments/",
+        ProductCommentListView.as_view(),
+        name="product-comments",
+    ),
+]
@@ -0,0 +1,160 @@
+import logging
+import os
+import posixpath
+import tempfile
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.urls import reverse
+from PIL import UnidentifiedImageError
+
+from clot.images import encode, get_executor, make_variant, open_image
+from media.models import StoredFile
+from media.storage import TEMP_PREFIX, content_addressed_storage
+
+
+# Variants live beside the uploads, named after the content-addressed source,
+# so a variant never changes once written.
+VARIANT_DIR = "variants"
+UPLOAD_PREFIX = "product/"
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+logger = logging.getLogger(__name__)
+
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def _config():
+    return getattr(settings, "PRODUCT_IMAGES", {})
+
+
+def variant_widths():
+    return tuple(sorted(_config().get("WIDTHS", (160, 320, 640, 1280))))
+
+
+def variant_path(source, width):
+    fmt = _config().get("FORMAT", "webp")
+    stem = os.path.splitext(source)[0]
+    return posixpath.join(VARIANT_DIR, f"{stem}_w{width}.{EXTENSIONS[fmt]}")
+
+
+def _render(storage, source, width, name):
+    image = make_variant(open_image(storage, source), width)
+    content = encode(image, _config().get("FORMAT", "webp"))
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written under a temporary name first, so a half-written variant is
+    # never served; gc_media clears temporaries left by a crash.
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(temp_path, storage.file_permissions_mode or 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _render_job(storage, source, width, name):
+    # Logged here: once its waiters have timed out, nobody reads the future.
+    try:
+        _render(storage, source, width, name)
+    except Exception:
+        logger.exception("Rendering image variant %s failed", name)
+        raise
+
+
+def _forget(name, future):
+    with _pending_lock:
+        if _pending.get(name) is future:
+            del _pending[name]
+
+
+def ensure_variant(source, width, storage=None, timeout=None):
+    """
+    Returns the name of the ``width`` variant of ``source``, rendering it in
+    the image worker pool if it does not exist yet. Concurrent requests for
+    the same variant wait on a single job. Returns ``None`` when the source
+    cannot be read or rendering takes longer than ``timeout`` seconds.
+    """
+    storage = storage or content_addressed_storage
+    name = variant_path(source, width)
+    if os.path.exists(storage.path(name)):
+        return name
+
+    timeout = _config().get("TIMEOUT", 10) if timeout is None else timeout
+    try:
+        if getattr(settings, "IMAGE_PROCESSING", {}).get("EAGER"):
+            _render(storage, source, width, name)
+            return name
+        with _pending_lock:
+            future = _pending.get(name)
+            if future is None:
+                future = get_executor().submit(
+                    _render_job, storage, source, width, name
+                )
+                _pending[name] = future
+                future.add_done_callback(lambda done: _forget(name, done))
+        future.result(timeout)
+    except FutureTimeoutError:
+        # Still rendering; it is on disk for whoever asks next.
+        return None
+    except (OSError, UnidentifiedImageError):
+        return None
+    return name
+
+
+def variant_urls(image, request=None):
+    """
+    Returns ``[(width, url)]`` for an ``Images.image`` file: the file itself
+    once rendered, otherwise the view that renders it on first request.
+    """
+    if not image:
+        return []
+    storage = image.storage
+    urls = []
+    for width in variant_widths():
+        name = variant_path(image.name, width)
+        if os.path.exists(storage.path(name)):
+            url = storage.url(name)
+        else:
+            url = reverse(
+                "product-image-variant", kwargs={"width": width, "name": image.name}
+            )
+        urls.append((width, request.build_absolute_uri(url) if request else url))
+    return urls
+
+
+def prune_variants(storage=None, dry_run=False):
+    """
+    Deletes variants whose source file is gone, e.g. removed by gc_media.
+    Sources are looked up one two-character hash directory at a time.
+    Returns the number of files removed.
+    """
+    storage = storage or content_addressed_storage
+    root = storage.path(posixpath.join(VARIANT_DIR, UPLOAD_PREFIX))
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    for directory, _, filenames in os.walk(root):
+        relative = os.path.relpath(directory, storage.path(VARIANT_DIR))
+        prefix = relative.replace(os.sep, "/") + "/"
+        stems = {
+            os.path.splitext(name)[0]
+            for name in StoredFile.objects.filter(name__startswith=prefix).values_list(
+                "name", flat=True
+            )
+        }
+        for filename in filenames:
+            if filename.startswith(TEMP_PREFIX):
+                continue
+            stem = prefix + filename.rsplit("_w", 1)[0]
+            if stem not in stems:
+                removed += 1
+                if not dry_run:
+                    os.remove(os.path.join(directory, filename))
+    return removed
@@ -1,3 +1,292 @@
-from django.shortcuts import render
+from django.http import Http404, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.views import View
+from rest_framework import status, views
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
-# Create your views here.
+from clot.exports import ExportView
+
+from .caching import cache_catalog_response, cache_product_response
+from .exports import CommentExport, ProductExport
+from .facets import (
+    RELATIONS,
+    filter_products,
+    get_facet_index,
+    parse_filters,
+)
+from .inventory import (
+    InsufficientStock,
+    ReservationNotActive,
+    release_reservation,
+    reserve_stock,
+)
+from .pagination import CommentPagination, ProductPagination
+from .models import Images, Product, StockReservation
+from .queries import (
+    catalog_queryset,
+    product_comments_queryset,
+    product_detail_queryset,
+)
+from .search import search_products
+from .serializers import (
+    ProductCommentSerializer,
+    ProductDetailSerializer,
+    ProductListSerializer,
+    StockReservationCreateSerializer,
+    StockReservationSerializer,
+    WishlistUpdateSerializer,
+)
+from .variants import UPLOAD_PREFIX, ensure_variant, variant_widths
+from .wishlists import add_products, remove_products, wishlisted_subset
+
+
+class ProductListView(views.APIView):
+    permission_classes = [AllowAny]
+
+    @cache_catalog_response
+    def get(self, request):
+        queryset = filter_products(
+            catalog_queryset(), parse_filters(request.query_params)
+        )
+        paginator = ProductPagination()
+        products = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ProductListSerializer(
+            products, many=True, context={"request": request}
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ProductSearchView(views.APIView):
+    """
+    Products matching ``?q=``, best match first, narrowed by the same
+    filters as the list. The last word matches as a prefix, for type-ahead.
+    """
+
+    permission_classes = [AllowAny]
+    max_limit = 50
+
+    @cache_catalog_response
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError:
+            limit = 20
+        limit = max(1, min(limit, self.max_limit))
+
+        queryset = filter_products(
+            catalog_queryset(), parse_filters(request.query_params)
+        )
+        products = search_products(
+            request.query_params.get("q", ""), queryset, limit=limit
+        )
+        serializer = ProductListSerializer(
+            products, many=True, context={"request": request}
+        )
+        return Response({"results": serializer.data})
+
+
+class ProductDetailView(views.APIView):
+    permission_classes = [AllowAny]
+
+    @cache_product_response
+    def get(self, request, slug):
+        product = get_object_or_404(product_detail_queryset(), slug=slug)
+        serializer = ProductDetailSerializer(product, context={"request": request})
+        return Response(serializer.data)
+
+
+class ProductCommentListView(views.APIView):
+    """
+    All of a product's comments, newest first. The detail view embeds only
+    the latest few; this pages through the rest by ``(created_at, id)``.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, slug):
+        product = get_object_or_404(Product.objects.only("id"), slug=slug)
+        queryset = product_comments_queryset().filter(product=product)
+        paginator = CommentPagination()
+        comments = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ProductCommentSerializer(comments, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ProductFacetsView(views.APIView):
+    """
+    Value counts of every facet for the filters in the query string, taken
+    from the in-memory facet index rather than one GROUP BY per facet.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        filters = parse_filters(request.query_params)
+        index = get_facet_index()
+        counts = index.counts(filters)
+
+        facets = {}
+        for facet, (_, model, label) in RELATIONS.items():
+            values = counts["facets"][facet]
+            objects = model.objects.filter(pk__in=values).only("pk", "slug", label)
+            facets[facet] = sorted(
+                (
+                    {
+                        "slug": obj.slug,
+                        "name": getattr(obj, label),
+                        "count": values[obj.pk],
+                        "selected": obj.pk in filters.get(facet, ()),
+                    }
+                    for obj in objects
+                ),
+                key=lambda item: (-item["count"], item["name"]),
+            )
+
+        step = index.price_step
+        facets["price"] = [
+            {"min": bucket * step, "max": (bucket + 1) * step, "count": count}
+            for bucket, count in sorted(counts["facets"]["price"].items())
+        ]
+        in_stock = counts["facets"]["in_stock"]
+        facets["in_stock"] = {
+            "true": in_stock.get(True, 0),
+            "false": in_stock.get(False, 0),
+        }
+        return Response({"total": counts["total"], "facets": facets})
+
+
+class ImageVariantView(View):
+    """
+    Redirects to a width variant of a product image, rendering it in the
+    image worker pool on first request. Variants are named after the
+    content-addressed source, so the redirect never changes; if rendering
+    is slow or fails, it points at the original for now instead.
+    """
+
+    def get(self, request, width, name):
+        if width not in variant_widths() or not name.startswith(UPLOAD_PREFIX):
+            raise Http404
+        if not Images.objects.filter(image=name).exists():
+            raise Http404
+
+        storage = Images._meta.get_field("image").storage
+        variant = ensure_variant(name, width, storage)
+        if variant is None:
+            response = HttpResponseRedirect(storage.url(name))
+            response["Cache-Control"] = "no-cache"
+        else:
+            response = HttpResponseRedirect(storage.url(variant))
+            response["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+class WishlistView(views.APIView):
+    """
+    The current user's wishlisted products. ``POST`` adds and ``DELETE``
+    removes ``{"ids": [...]}`` in bulk.
+    """
+
+    def get(self, request):
+        queryset = catalog_queryset().filter(wishlist__user=request.user).distinct()
+        paginator = ProductPagination()
+        products = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ProductListSerializer(
+            products, many=True, context={"request": request}
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    def post(self, request):
+        serializer = WishlistUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        added = add_products(request.user, serializer.validated_data["ids"])
+        return Response({"added": added})
+
+    def delete(self, request):
+        serializer = WishlistUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        removed = remove_products(request.user, serializer.validated_data["ids"])
+        return Response({"removed": removed})
+
+
+class WishlistMembershipView(views.APIView):
+    """
+    Which of ``?ids=1,2,3`` the current user has wishlisted, e.g. for the
+    hearts on a catalog page: at most one query, none while cached.
+    """
+
+    max_ids = 500
+
+    def get(self, request):
+        try:
+            ids = {
+                int(value)
+                for value in request.query_params.get("ids", "").split(",")
+                if value
+            }
+        except ValueError:
+            raise ValidationError({"ids": "Expected comma-separated product ids."})
+        if len(ids) > self.max_ids:
+            raise ValidationError({"ids": f"At most {self.max_ids} ids."})
+        return Response({"wishlisted": wishlisted_subset(request.user.pk, ids)})
+
+
+class StockReservationView(views.APIView):
+    """
+    Holds stock for the current user's cart: ``{"items": [{"id", "quantity"}]}``
+    is reserved all or nothing until ``expires_at``. Answers 409 with the
+    short ``products`` when any item is out of stock.
+    """
+
+    def post(self, request):
+        serializer = StockReservationCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reservation = reserve_stock(
+                serializer.validated_data["items"], user=request.user
+            )
+        except InsufficientStock as error:
+            return Response(
+                {"detail": "Insufficient stock.", "products": error.product_ids},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(
+            StockReservationSerializer(reservation).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class StockReservationDetailView(views.APIView):
+    """One of the current user's reservations; ``DELETE`` releases it."""
+
+    def get_object(self, request, token):
+        return get_object_or_404(
+            StockReservation.objects.prefetch_related("items"),
+            token=token,
+            user=request.user,
+        )
+
+    def get(self, request, token):
+        return Response(
+            StockReservationSerializer(self.get_object(request, token)).data
+        )
+
+    def delete(self, request, token):
+        reservation = self.get_object(request, token)
+        try:
+            release_reservation(reservation)
+        except ReservationNotActive:
+            return Response(
+                {"detail": f"Reservation is {reservation.status}."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProductExportView(ExportView):
+    export_class = ProductExport
+
+
+class CommentExportView(ExportView):
+    export_class = CommentExport
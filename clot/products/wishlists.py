@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from .models import Product, Wishlist
+
+
+WishlistItem = Wishlist.products.through
+
+wishlist_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _config():
+    return getattr(settings, "WISHLIST", {})
+
+
+def _cache():
+    return caches[_config().get("CACHE_ALIAS", "default")]
+
+
+def _cache_key(user_id):
+    return f"wishlist:ids:{user_id}"
+
+
+def invalidate_wishlists(user_ids):
+    """
+    Drops the cached id sets of ``user_ids``, now and again on commit, so a
+    read racing the transaction cannot cache the old set for the TTL.
+    """
+    keys = [_cache_key(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+    wishlist_cache_stats["invalidations"] += len(keys)
+    _cache().delete_many(keys)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def wishlisted_ids(user_id):
+    """The ids of every product in the user's wishlists, cached per user."""
+    key = _cache_key(user_id)
+    ids = _cache().get(key)
+    if ids is None:
+        wishlist_cache_stats["misses"] += 1
+        ids = frozenset(
+            WishlistItem.objects.filter(wishlist__user_id=user_id).values_list(
+                "product_id", flat=True
+            )
+        )
+        _cache().set(key, ids, _config().get("TTL", 3600))
+    else:
+        wishlist_cache_stats["hits"] += 1
+    return ids
+
+
+def wishlisted_subset(user_id, product_ids):
+    """
+    Returns which of ``product_ids`` the user has wishlisted: no query when
+    the id set is cached, one otherwise.
+    """
+    return sorted(wishlisted_ids(user_id).intersection(product_ids))
+
+
+def get_wishlist(user):
+    """The user's oldest wishlist, created on first use."""
+    wishlist = Wishlist.objects.filter(user=user).order_by("pk").first()
+    if wishlist is None:
+        wishlist = Wishlist.objects.create(user=user)
+    return wishlist
+
+
+def add_products(user, product_ids):
+    """Adds the existing products among ``product_ids``; returns their ids."""
+    ids = list(Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True))
+    if ids:
+        get_wishlist(user).products.add(*ids)
+    return sorted(ids)
+
+
+def remove_products(user, product_ids):
+    """Removes ``product_ids`` from every wishlist of the user."""
+    removed, _ = WishlistItem.objects.filter(
+        wishlist__user=user, product_id__in=product_ids
+    ).delete()
+    # A queryset delete() of through rows sends no m2m_changed.
+    invalidate_wishlists([user.pk])
+    return removed